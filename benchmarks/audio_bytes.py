@@ -0,0 +1,91 @@
+"""Bytes per clip and per quiz before and after ``cefr.audio_process``.
+
+Synthesizes the clips of one default quiz per page with the configured TTS
+backends (no cache, so gTTS needs the network), runs each clip through the
+processing stage and reports size and duration before and after:
+
+    python benchmarks/audio_bytes.py [--level c1] [--mode trim] [--output bytes.json]
+
+``--mode`` compares a processing mode other than the one this machine would
+use (``transcode`` needs ffmpeg). ``--clips`` lists every clip.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# page -> (dataset kind, texts of the default quiz: first SIDs of the level)
+QUIZZES = {
+    "listen_and_spell": ("words", lambda df: list(df["WORD"][:20])),
+    "listening": ("words", lambda df: [f"Number {sid}, {word}" for sid, word in zip(df["SID"][:20], df["WORD"][:20])]),
+    "quiz_practice": ("wic", lambda df: list(df["Context"].dropna()[:20])),
+    "quiz_random": ("wic", lambda df: list(df["Context"].dropna()[:10])),
+}
+
+
+def duration(clip):
+    from cefr.mp3 import split_frames
+
+    return sum(header.duration for header, _ in split_frames(clip))
+
+
+def measure(texts, mode, cache):
+    from cefr import audio_process, tts
+
+    clips = []
+    for text in texts:
+        if text not in cache:
+            cache[text] = tts.synthesize(text)[1]
+        before = cache[text]
+        after = audio_process.process(before, mode)
+        clips.append({
+            "text": text,
+            "bytes_before": len(before),
+            "bytes_after": len(after),
+            "seconds_before": round(duration(before), 2),
+            "seconds_after": round(duration(after), 2),
+        })
+    return clips
+
+
+def main(argv=None):
+    from cefr import audio_process
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--level", choices=["b2", "c1"], default="b2")
+    parser.add_argument("--mode", choices=["trim", "transcode"], default=None,
+                        help=f"processing mode (default: {audio_process.MODE})")
+    parser.add_argument("--clips", action="store_true", help="print every clip")
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    from cefr.datasets import load_dataset
+
+    mode = args.mode or audio_process.MODE
+    cache, report = {}, {}
+    print(f"mode {mode}, level {args.level}")
+    print(f"{'page':17} {'clips':>5} {'before KiB':>10} {'after KiB':>10} {'per clip':>15} {'saved':>6}")
+    for page, (kind, texts_of) in QUIZZES.items():
+        clips = measure(texts_of(load_dataset(f"{args.level}_{kind}")), mode, cache)
+        before = sum(c["bytes_before"] for c in clips)
+        after = sum(c["bytes_after"] for c in clips)
+        report[page] = {"bytes_before": before, "bytes_after": after, "clips": clips}
+        print(f"{page:17} {len(clips):5d} {before / 1024:10.1f} {after / 1024:10.1f} "
+              f"{before // len(clips):6d} -> {after // len(clips):5d} {1 - after / max(before, 1):6.0%}")
+        if args.clips:
+            for c in clips:
+                print(f"    {c['bytes_before']:6d} -> {c['bytes_after']:6d} B  "
+                      f"{c['seconds_before']:5.2f} -> {c['seconds_after']:5.2f} s  {c['text'][:50]}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"mode": mode, "level": args.level, "pages": report}, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Teacher analytics queries as the answer history grows (``cefr.answer_log``).
+
+For each ``--answers`` size, fills a fresh log with that many quiz answers
+(``--learners`` users over the four quiz datasets, spread over ``--weeks``
+weeks ending now), builds the running totals and times, median of
+``--repeat`` runs:
+
+* ``hardest`` -- the 20 hardest C1 WIC SIDs this week, from the totals
+* ``students`` -- C1 WIC accuracy per learner this week, from the totals
+* ``scan`` -- the same "hardest" answer grouped from the raw ``answers`` rows,
+  as a page without the totals would compute it on every rerun
+
+Also reports the cost the totals add to the writer (rows/s with and without
+them). Exits 1 if a totals query at the largest size is more than 3x slower
+than at the smallest.
+
+    python benchmarks/bench_analytics.py [--answers 10000 100000 1000000]
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DATASETS = {"b2_wic": 725, "c1_wic": 1380, "b2_words": 725, "c1_words": 1380}   # dataset -> SIDs
+
+
+def answers(count, learners, weeks, rng):
+    """``count`` random ``answers`` rows, each check of 20 sharing a timestamp."""
+    now = time.time()
+    names = list(DATASETS)
+    rows = []
+    while len(rows) < count:
+        user = f"learner{rng.randrange(learners):03d}"
+        dataset = rng.choice(names)
+        ts = now - rng.random() * weeks * 7 * 86400
+        for _ in range(min(20, count - len(rows))):
+            sid = rng.randint(1, DATASETS[dataset])
+            rows.append((user, "quiz_random", dataset, sid, "answer", int(rng.random() > sid / 2000), ts))
+    return rows
+
+
+def median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def scan_hardest(path, dataset, since, limit=20):
+    from cefr.answer_log import connect
+
+    with contextlib.closing(connect(path)) as conn:
+        return conn.execute(
+            "SELECT sid, COUNT(*) AS n, SUM(correct) AS right FROM answers WHERE dataset = ? AND ts >= ? "
+            "GROUP BY sid ORDER BY (n - right + 1.0) / (n + 2.0) DESC LIMIT ?",
+            (dataset, since, limit)).fetchall()
+
+
+def scores(rows):
+    """Error rates of ``(sid, attempts, correct)`` rows (SIDs with equal rates may come in any order)."""
+    return [(attempts - correct + 1) / (attempts + 2) for _, attempts, correct in rows]
+
+
+def write_rate(folder, rows, totals):
+    """Rows/s of the writer's transactions (batches of 500), with or without the totals."""
+    from cefr import answer_log
+
+    path = os.path.join(folder, f"rate-{totals}.sqlite3")
+    with contextlib.closing(answer_log.connect(path)) as conn:
+        conn.executescript(answer_log.SCHEMA)
+        start = time.perf_counter()
+        for lo in range(0, len(rows), 500):
+            with conn:
+                conn.executemany("INSERT INTO answers (user, page, dataset, sid, answer, correct, ts) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?)", rows[lo:lo + 500])
+                if totals:
+                    answer_log._add_to_totals(conn, rows[lo:lo + 500])
+        return len(rows) / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    from cefr.answer_log import AnswerLog, connect, week_of
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--answers", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--learners", type=int, default=300)
+    parser.add_argument("--weeks", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+    rng = random.Random(0)
+    week = week_of(time.time())
+    since = time.mktime(time.strptime(week + "-1", "%G-W%V-%u"))   # Monday 00:00 of this week
+
+    print(f"{'answers':>10} {'build s':>8} {'hardest ms':>11} {'students ms':>12} {'scan ms':>9}")
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for count in args.answers:
+            path = os.path.join(folder, f"answers-{count}.sqlite3")
+            with contextlib.closing(connect(path)) as conn:
+                conn.executescript("CREATE TABLE answers (id INTEGER PRIMARY KEY, user TEXT NOT NULL, "
+                                   "page TEXT NOT NULL, dataset TEXT NOT NULL, sid INTEGER NOT NULL, "
+                                   "answer TEXT NOT NULL, correct INTEGER NOT NULL, ts REAL NOT NULL)")
+                with conn:
+                    conn.executemany("INSERT INTO answers (user, page, dataset, sid, answer, correct, ts) "
+                                     "VALUES (?, ?, ?, ?, ?, ?, ?)", answers(count, args.learners, args.weeks, rng))
+            start = time.perf_counter()
+            log = AnswerLog(path)   # an existing log: the totals are built once, here
+            build = time.perf_counter() - start
+            hardest = median_ms(lambda: log.hardest("c1_wic", week), args.repeat)
+            students = median_ms(lambda: log.students("c1_wic", week), args.repeat)
+            scan = median_ms(lambda: scan_hardest(path, "c1_wic", since), max(3, args.repeat // 4))
+            assert scores(log.hardest("c1_wic", week)) == scores(scan_hardest(path, "c1_wic", since))
+            results.append((hardest, students))
+            print(f"{count:10d} {build:8.2f} {hardest:11.2f} {students:12.2f} {scan:9.2f}")
+
+        rows = answers(50_000, args.learners, args.weeks, rng)
+        plain, with_totals = write_rate(folder, rows, False), write_rate(folder, rows, True)
+        print(f"\nwriter: {plain:,.0f} rows/s without the totals, {with_totals:,.0f} rows/s with them")
+
+    first, last = results[0], results[-1]
+    return 1 if any(b > a * 3 for a, b in zip(first, last)) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Write throughput and grading latency of the answer log (``cefr.answer_log``).
+
+Three scenarios on a fresh database in a temporary folder:
+
+* class      -- ``--learners`` threads each check ``--checks`` quizzes of
+  ``--items`` answers, all at the same moment (the end of an exercise);
+  reports how long ``record_many`` holds up the grading code (p50/p99/max)
+  and how long until every row is on disk
+* sync       -- the same class writing each check in its own transaction
+  from the grading code, the way a handler without the log would
+* saturation -- one producer queuing ``--rows`` rows as fast as it can;
+  reports sustained rows/s and batches
+
+    python benchmarks/bench_answer_log.py [--learners 40] [--checks 5] [--items 20]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def quiz_rows(learner, check, items):
+    user = f"learner{learner:03d}"
+    return [(user, "quiz_random", "b2_wic", check * items + i + 1, "answer", i % 3 == 0) for i in range(items)]
+
+
+def run_class(write, learners, checks, items):
+    """Start every learner at once; return per-check call latencies (seconds)."""
+    barrier = threading.Barrier(learners)
+    latencies = []
+    lock = threading.Lock()
+
+    def learner(number):
+        barrier.wait()
+        for check in range(checks):
+            rows = quiz_rows(number, check, items)
+            start = time.perf_counter()
+            write(rows)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=learner, args=(n,)) for n in range(learners)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def report(name, latencies, rows, seconds):
+    print(f"{name:10} p50 {percentile(latencies, 50) * 1e6:9.0f} us  p99 {percentile(latencies, 99) * 1e6:9.0f} us  "
+          f"max {max(latencies) * 1e6:9.0f} us  {rows} rows on disk in {seconds:6.3f} s ({rows / seconds:9.0f} rows/s)")
+
+
+def main(argv=None):
+    from cefr.answer_log import SCHEMA, AnswerLog, connect
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--learners", type=int, default=40)
+    parser.add_argument("--checks", type=int, default=5, help="checks per learner")
+    parser.add_argument("--items", type=int, default=20, help="answers per check")
+    parser.add_argument("--rows", type=int, default=200_000, help="rows for the saturation run")
+    args = parser.parse_args(argv)
+    rows = args.learners * args.checks * args.items
+
+    with tempfile.TemporaryDirectory() as folder:
+        log = AnswerLog(os.path.join(folder, "batched.sqlite3"))
+        start = time.perf_counter()
+        latencies = run_class(log.record_many, args.learners, args.checks, args.items)
+        log.flush()
+        report("batched", latencies, rows, time.perf_counter() - start)
+
+        path = os.path.join(folder, "sync.sqlite3")
+        conn = connect(path)
+        conn.executescript(SCHEMA)
+        lock = threading.Lock()   # one connection shared by the handlers, like a module-level one
+
+        def write_sync(batch):
+            now = time.time()
+            with lock, conn:
+                conn.executemany("INSERT INTO answers (user, page, dataset, sid, answer, correct, ts) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?)", [row + (now,) for row in batch])
+
+        start = time.perf_counter()
+        latencies = run_class(write_sync, args.learners, args.checks, args.items)
+        report("sync", latencies, rows, time.perf_counter() - start)
+        conn.close()
+
+        log = AnswerLog(os.path.join(folder, "saturation.sqlite3"), max_pending=args.rows)
+        batch = quiz_rows(0, 0, args.items)
+        start = time.perf_counter()
+        for _ in range(args.rows // args.items):
+            log.record_many(batch)
+        queued = time.perf_counter() - start
+        log.flush()
+        elapsed = time.perf_counter() - start
+        stats = log.snapshot()
+        print(f"saturation {stats['written']} rows in {elapsed:.2f} s ({stats['written'] / elapsed:,.0f} rows/s), "
+              f"{stats['batches']} batches, queued in {queued:.2f} s, dropped {stats['dropped']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Audio bytes a learner's browser downloads: static clip URLs vs ``st.audio(bytes)``.
+
+Drives the "Practice Words in Context" page through Streamlit's AppTest with
+the TTS stub: ``--visits`` fresh sessions (the learner reopens the page or
+comes back from another one) each generate the same ``--sids`` sentences,
+then press Generate again ``--reruns`` times. A simulated browser loads every
+audio element that is new to its page:
+
+* ``url`` -- the clip URLs of ``cefr.audio_server`` through a real HTTP
+  cache: a clip fetched once is fresh for a year (``immutable``), so later
+  loads download nothing
+* ``bytes`` -- ``st.audio(bytes)`` (``CEFR_AUDIO_PORT=0``): Streamlit's
+  ``/media`` responses carry no ``ETag``, ``Last-Modified`` or
+  ``Cache-Control``, so every load downloads the clip again
+
+Reports downloaded bytes on the first visit and on each later one, then
+checks a ``Range`` and an ``If-None-Match`` request against the server.
+Exits 1 if a later visit downloads any audio in ``url`` mode.
+
+    python benchmarks/bench_audio_urls.py [--visits 5] [--reruns 3] [--sids 20]
+"""
+
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+PAGE = os.path.join(ROOT, "pages", "🌱_App:_Practice_Words_in_Context.py")
+MEDIA_SIZES = {}   # Streamlit media file id -> bytes
+
+
+class Browser:
+    """Counts downloads of audio elements, with an HTTP cache for cacheable responses."""
+
+    def __init__(self):
+        self.cache = {}   # url -> etag of a response that is fresh for good
+        self.downloaded = self.requests = 0
+
+    def load(self, url):
+        if url in self.cache:
+            return
+        self.requests += 1
+        if url.startswith("http"):
+            with urllib.request.urlopen(url) as response:
+                self.downloaded += len(response.read())
+                if "immutable" in response.headers.get("Cache-Control", ""):
+                    self.cache[url] = response.headers["ETag"]
+        else:   # /media/<id>: nothing to validate or cache
+            self.downloaded += MEDIA_SIZES[url.rsplit("/", 1)[1]]
+
+
+def record_media_sizes():
+    """Remember the size of every file Streamlit's media store is handed, by file id."""
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    load = MemoryMediaFileStorage.load_and_get_id
+
+    def load_and_get_id(self, path_or_data, *args, **kwargs):
+        file_id = load(self, path_or_data, *args, **kwargs)
+        MEDIA_SIZES[file_id] = len(path_or_data)
+        return file_id
+    MemoryMediaFileStorage.load_and_get_id = load_and_get_id
+
+
+def visit(browser, sids, reruns):
+    """One session pressing Generate ``1 + reruns`` times; the browser loads audio elements new to the page."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(PAGE, default_timeout=120)
+    at.run()
+    at.number_input[0].set_value(1)
+    at.number_input[1].set_value(sids)
+    shown = set()
+    for _ in range(1 + reruns):
+        next(button for button in at.button if "Generate" in button.label).click()
+        at.run()
+        urls = [element.proto.url for element in at.get("audio")]
+        assert len(urls) == sids, f"{len(urls)} audio elements"
+        for url in urls:
+            if url not in shown:   # an unchanged element keeps its audio across reruns
+                browser.load(url)
+        shown = set(urls)
+
+
+def check_server(url):
+    """Status and size of a byte range and of a revalidation of ``url``."""
+    with urllib.request.urlopen(urllib.request.Request(url, headers={"Range": "bytes=0-999"})) as response:
+        ranged = f"{response.status} {response.headers['Content-Range']} ({len(response.read())} bytes)"
+        etag = response.headers["ETag"]
+    try:
+        urllib.request.urlopen(urllib.request.Request(url, headers={"If-None-Match": etag}))
+        revalidated = "200"
+    except urllib.error.HTTPError as e:
+        revalidated = f"{e.code} ({len(e.read())} bytes)"
+    return ranged, revalidated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--visits", type=int, default=5)
+    parser.add_argument("--reruns", type=int, default=3, help="further Generate presses per visit")
+    parser.add_argument("--sids", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    with socket.socket() as probe:   # a free port for this run's server
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    state = tempfile.mkdtemp()
+    os.environ.update(CEFR_STATE_DIR=state, CEFR_AUDIO_BUNDLE=os.path.join(state, "no-bundle"),
+                      CEFR_AUDIO_PORT=str(port), CEFR_AUDIO_URL=f"http://127.0.0.1:{port}",
+                      CEFR_PREFETCH="0", STREAMLIT_LOGGER_LEVEL="error")
+
+    import stub_tts
+    from cefr.audio_server import get_audio_server
+
+    stub_tts.install(0.0)
+    record_media_sizes()
+    server = get_audio_server()
+    print(f"{'mode':6} {'1st visit':>12} {'later visits':>14} {'requests':>9}")
+    status = 0
+    for mode in ("url", "bytes"):
+        server.public_url = f"http://127.0.0.1:{port}" if mode == "url" else ""   # no URL: pages pass bytes
+        browser = Browser()
+        visit(browser, args.sids, args.reruns)
+        first = browser.downloaded
+        for _ in range(args.visits - 1):
+            visit(browser, args.sids, args.reruns)
+        later = (browser.downloaded - first) / max(1, args.visits - 1)
+        print(f"{mode:6} {first / 1024:8.1f} KiB {later / 1024:10.1f} KiB {browser.requests:9d}")
+        if mode == "url":
+            status = int(later > 0)
+            clip = next(iter(browser.cache))
+
+    ranged, revalidated = check_server(clip)
+    print(f"\nRange bytes=0-999: {ranged}; If-None-Match: {revalidated}")
+    print("server:", server.snapshot())
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""TTS requests and time to generate a range of WIC sentences, one by one vs in bulk.
+
+Runs ``generate_audio_batch`` over the ``Context`` sentences of the first
+``--sentences`` SIDs of a WIC dataset against the stub TTS (``--tts-latency``
+seconds per request, empty cache), once with ``bulk=1`` (one request per
+sentence) and once per ``--bulk`` size. Reports requests, wall time, bulk
+outcomes (``split``/``mismatch``/``failed``) and checks that every sentence
+got exactly one clip, each spoken length matching the sentence.
+
+    python benchmarks/bench_bulk_tts.py [--sentences 20 60] [--bulk 10 20] [--tts-latency 0.3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+
+def run(texts, bulk, latency):
+    import stub_tts
+    from cefr import metrics
+    from cefr.mp3 import _quiet, split_frames
+    from cefr.tts import generate_audio_batch
+
+    texts = [f"{text} ({len(texts)}/{bulk})" for text in texts]   # new texts per run: nothing cached yet
+    stub = stub_tts.install(latency)
+    before = metrics.BULK_REQUESTS.series()
+
+    start = time.perf_counter()
+    results = list(generate_audio_batch(texts, bulk=bulk))
+    elapsed = time.perf_counter() - start
+
+    outcomes = {labels[0]: count - before.get(labels, 0) for labels, count in metrics.BULK_REQUESTS.series().items()}
+    errors = [error for _, _, error in results if error is not None]
+    wrong = 0
+    for index, clip, _ in results:
+        # Only clips cut from a bulk answer sound; they must hold exactly what the stub spoke for the text
+        spoken = sum(not _quiet(frame, header) for header, frame in split_frames(clip or b""))
+        expected = sum(2 + len(phrase) // 2 for phrase in texts[index].replace("...", ",").split(","))
+        wrong += bool(spoken) and spoken != expected
+    return {"requests": stub.calls, "seconds": elapsed, "clips": len({i for i, _, _ in results}),
+            "errors": len(errors), "outcomes": outcomes, "wrong": wrong}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dataset", default="b2_wic")
+    parser.add_argument("--sentences", type=int, nargs="+", default=[20, 60])
+    parser.add_argument("--bulk", type=int, nargs="+", default=[10, 20])
+    parser.add_argument("--tts-latency", type=float, default=0.3, help="seconds per stub TTS request")
+    args = parser.parse_args(argv)
+
+    state = tempfile.mkdtemp()
+    os.environ["CEFR_STATE_DIR"] = state
+    os.environ["CEFR_AUDIO_BUNDLE"] = os.path.join(state, "no-bundle")
+    from cefr.index import get_index
+
+    index = get_index(args.dataset)
+    print(f"{'sentences':>9} {'bulk':>5} {'requests':>8} {'seconds':>8} {'clips':>6}  outcomes")
+    status = 0
+    for count in args.sentences:
+        texts = list(dict.fromkeys(index.frame["Context"].astype(str)))[:count]
+        for bulk in [1] + args.bulk:
+            result = run(texts, bulk, args.tts_latency)
+            outcomes = ", ".join(f"{name} {n}" for name, n in result["outcomes"].items() if n) or "-"
+            print(f"{len(texts):9d} {bulk:5d} {result['requests']:8d} {result['seconds']:8.2f} {result['clips']:6d}  {outcomes}"
+                  + (f"  ERRORS {result['errors']}" if result["errors"] else "")
+                  + (f"  MISALIGNED {result['wrong']}" if result["wrong"] else ""))
+            if result["clips"] != len(texts) or result["errors"] or result["wrong"]:
+                status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""A class generating the same range at once: upstream TTS requests and fairness.
+
+Two scenarios against the stub TTS (``--tts-latency`` seconds per request,
+empty cache), with the rate limiter at ``--rate`` requests/s and bursts of
+``--burst``:
+
+* ``class``: ``--learners`` sessions call ``generate_audio_batch`` on the same
+  ``--sentences`` texts at the same moment, one request per text and in bulk.
+  Reports upstream requests (vs learners x sentences without coalescing),
+  coalesced requests and the slowest learner.
+* ``fairness``: one session has 40 requests for new texts waiting for the
+  limiter (e.g. several tabs generating and prefetching), then 5 other
+  sessions ask for one new text each. Reports how long those 5 waited with
+  the per-session fair queue and with a single FIFO queue.
+
+    python benchmarks/bench_coalesce.py [--learners 10 30] [--rate 5] [--burst 10]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+ARRIVAL = 1.0   # seconds after the big session starts
+
+
+def run_together(jobs):
+    """Run ``(session, fn)`` jobs on one thread each, started together; return seconds per job."""
+    from cefr.limiter import bind_session
+
+    barrier = threading.Barrier(len(jobs))
+    seconds = [None] * len(jobs)
+
+    def worker(position, fn):
+        barrier.wait()
+        start = time.perf_counter()
+        fn()
+        seconds[position] = time.perf_counter() - start
+
+    threads = [threading.Thread(target=bind_session(worker, session), args=(position, fn))
+               for position, (session, fn) in enumerate(jobs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return seconds
+
+
+def classroom(learners, sentences, bulk, args):
+    import stub_tts
+    from cefr import metrics, tts
+    from cefr.limiter import FairLimiter
+
+    stub = stub_tts.install(args.tts_latency)
+    tts.get_router().limiter = FairLimiter(args.rate, args.burst)
+    texts = [f"Learner sentence {n} for the class burst ({learners}/{bulk})." for n in range(sentences)]
+    before = sum(metrics.COALESCED.series().values())
+
+    def learner():
+        results = list(tts.generate_audio_batch(texts, bulk=bulk))
+        assert all(error is None for _, _, error in results), results
+
+    seconds = run_together([(f"learner-{n}", learner) for n in range(learners)])
+    return {"requests": stub.calls, "coalesced": sum(metrics.COALESCED.series().values()) - before,
+            "slowest": max(seconds)}
+
+
+def fairness(fair, args):
+    import stub_tts
+    from cefr import tts
+    from cefr.limiter import FairLimiter, bind_session
+
+    stub_tts.install(args.tts_latency)
+    limiter = tts.get_router().limiter = FairLimiter(args.rate, args.burst)
+    if not fair:
+        limiter.acquire = lambda session=None, acquire=limiter.acquire: acquire("everyone")
+    tag = "fair" if fair else "fifo"
+
+    def big():
+        generate = bind_session(tts.generate_audio)
+        with ThreadPoolExecutor(max_workers=40) as pool:
+            list(pool.map(generate, [f"Long range item {n} ({tag})." for n in range(40)]))
+
+    def small(n):
+        time.sleep(ARRIVAL)   # arrive once the burst is spent and the big session is queued
+        tts.generate_audio(f"One quick word {n} ({tag}).")
+
+    seconds = run_together([("big", big)] + [(f"small-{n}", lambda n=n: small(n)) for n in range(5)])
+    waits = [s - ARRIVAL for s in seconds[1:]]
+    return {"big": seconds[0], "small_p50": statistics.median(waits), "small_max": max(waits)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--learners", type=int, nargs="+", default=[10, 30])
+    parser.add_argument("--sentences", type=int, default=20)
+    parser.add_argument("--bulk", type=int, nargs="+", default=[1, 20])
+    parser.add_argument("--tts-latency", type=float, default=0.3, help="seconds per stub TTS request")
+    parser.add_argument("--rate", type=float, default=5, help="limiter tokens per second")
+    parser.add_argument("--burst", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    state = tempfile.mkdtemp()
+    os.environ["CEFR_STATE_DIR"] = state
+    os.environ["CEFR_AUDIO_BUNDLE"] = os.path.join(state, "no-bundle")
+
+    print(f"{'learners':>8} {'bulk':>5} {'requests':>9} {'uncoalesced':>12} {'coalesced':>10} {'slowest s':>10}")
+    status = 0
+    for learners in args.learners:
+        for bulk in args.bulk:
+            result = classroom(learners, args.sentences, bulk, args)
+            print(f"{learners:8d} {bulk:5d} {result['requests']:9d} {learners * args.sentences:12d} "
+                  f"{result['coalesced']:10d} {result['slowest']:10.2f}")
+            if result["requests"] > args.sentences:
+                status = 1   # some text was synthesized twice
+
+    print(f"\n{'queue':6} {'40-clip session s':>18} {'1-clip sessions p50 s':>22} {'max s':>7}")
+    for fair in (True, False):
+        result = fairness(fair, args)
+        print(f"{'fair' if fair else 'fifo':6} {result['big']:18.2f} {result['small_p50']:22.2f} {result['small_max']:7.2f}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
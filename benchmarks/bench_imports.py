@@ -0,0 +1,145 @@
+"""Cold-start budget per page: import time, first run and heavy modules loaded.
+
+Every page runs in a fresh interpreter: ``streamlit`` is imported first (the
+same for every page, reported separately), then the page's own top-level
+imports are timed, then the whole script is run once in bare mode (no
+server, widgets return their defaults). The report lists the heavy
+third-party modules each page pulled in.
+
+    python benchmarks/bench_imports.py [--pages home about] [--repeat 5]
+    python benchmarks/bench_imports.py --write-thresholds   # accept current numbers
+
+Budgets live in ``benchmarks/import_thresholds.json``. The script exits with
+status 1 when a page is over budget, raises, or when one of the light pages
+(home, about, voca_applications) loads pandas, numpy, gTTS or pydub. The
+home page's ``st.image`` is the one exception: Streamlit imports numpy
+whenever it marshals an image, even from a URL.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+THRESHOLDS = os.path.join(ROOT, "benchmarks", "import_thresholds.json")
+
+PAGES = {
+    "home": "CEFR_Home.py",
+    "about": "pages/About.py",
+    "voca_applications": "pages/III._Voca_Applications.py",
+    "wordlist": "pages/I._Wordlist.py",
+    "listening": "pages/II._Listening_wordlist.py",
+    "listen_and_spell": "pages/🌱_App:_Listen_and_Spell.py",
+    "practice_wic": "pages/🌱_App:_Practice_Words_in_Context.py",
+    "quiz_practice": "pages/🌱_App:_WIC_Quiz_Practice.py",
+    "quiz_random": "pages/🌱_App:_WIC_Quiz_Random.py",
+    "teacher_analytics": "pages/IV._Teacher_Analytics.py",
+}
+
+HEAVY = ["pandas", "numpy", "gtts", "pydub", "requests", "matplotlib"]
+LIGHT_PAGES = {"home", "about", "voca_applications"}
+FORBIDDEN_ON_LIGHT_PAGES = ["pandas", "numpy", "gtts", "pydub"]
+ALLOWED = {"home": {"numpy"}}   # streamlit.elements.lib.image_utils.marshall_images imports numpy
+
+# Budget = measurement * factor when writing thresholds
+SLACK = 3.0
+
+CHILD = r"""
+import ast, json, runpy, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import streamlit
+streamlit_ms = (time.perf_counter() - start) * 1000
+
+with open({script!r}, encoding="utf-8") as f:
+    tree = ast.parse(f.read())
+imports = ast.Module([node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))], [])
+start = time.perf_counter()
+exec(compile(imports, {script!r}, "exec"), {{}})
+import_ms = (time.perf_counter() - start) * 1000
+
+error = None
+start = time.perf_counter()
+try:
+    runpy.run_path({script!r}, run_name="__main__")
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+run_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({{"streamlit_ms": round(streamlit_ms, 1), "import_ms": round(import_ms, 1), "run_ms": round(run_ms, 1),
+                  "heavy": [name for name in {heavy!r} if name in sys.modules], "error": error}}))
+"""
+
+
+def run_page(name):
+    with tempfile.TemporaryDirectory() as state:
+        env = dict(os.environ, CEFR_STATE_DIR=state, STREAMLIT_LOGGER_LEVEL="error")
+        env.pop("CEFR_DATA_SYNC", None)
+        code = CHILD.format(root=ROOT, script=os.path.join(ROOT, PAGES[name]), heavy=HEAVY)
+        out = subprocess.run([sys.executable, "-c", code], env=env, cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def measure(name, repeat):
+    runs = [run_page(name) for _ in range(repeat)]
+    result = {metric: round(statistics.median(r[metric] for r in runs), 1)
+              for metric in ("streamlit_ms", "import_ms", "run_ms")}
+    result["heavy"] = sorted({module for r in runs for module in r["heavy"]})
+    result["errors"] = sorted({r["error"] for r in runs if r["error"]})
+    return result
+
+
+def problems_in(report, thresholds):
+    problems = []
+    for page, result in report.items():
+        if result["errors"]:
+            problems.append(f"{page}: raised {result['errors']}")
+        if page in LIGHT_PAGES:
+            loaded = [module for module in FORBIDDEN_ON_LIGHT_PAGES
+                      if module in result["heavy"] and module not in ALLOWED.get(page, ())]
+            if loaded:
+                problems.append(f"{page}: loads {', '.join(loaded)}")
+        for metric, budget in thresholds.get(page, {}).items():
+            if result[metric] > budget:
+                problems.append(f"{page}: {metric} {result[metric]} > {budget}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", choices=sorted(PAGES), default=list(PAGES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--write-thresholds", action="store_true", help=f"store budgets in {os.path.relpath(THRESHOLDS, ROOT)}")
+    args = parser.parse_args(argv)
+
+    report = {}
+    print(f"{'page':17} {'streamlit':>9} {'imports':>9} {'1st run':>9}  heavy modules")
+    for name in args.pages:
+        result = report[name] = measure(name, args.repeat)
+        print(f"{name:17} {result['streamlit_ms']:7.1f}ms {result['import_ms']:7.1f}ms {result['run_ms']:7.1f}ms  "
+              f"{', '.join(result['heavy']) or '-'}" + ("  RAISED" if result["errors"] else ""))
+
+    thresholds = {}
+    if os.path.exists(THRESHOLDS):
+        with open(THRESHOLDS) as f:
+            thresholds = json.load(f)
+    if args.write_thresholds:
+        for name, result in report.items():
+            thresholds[name] = {metric: round(max(result[metric], 1.0) * SLACK, 1) for metric in ("import_ms", "run_ms")}
+        with open(THRESHOLDS, "w") as f:
+            json.dump(thresholds, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"thresholds written: {THRESHOLDS}")
+
+    problems = problems_in(report, thresholds)
+    for problem in problems:
+        print("REGRESSION", problem)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
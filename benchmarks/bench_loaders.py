@@ -0,0 +1,71 @@
+"""Compare dataset load time and memory: CSV/TSV parsing vs compiled tables.
+
+Each measurement runs in a fresh interpreter so RSS numbers are not polluted
+by earlier loads. pandas/numpy are imported before the clock starts; the
+figures are for loading all registered datasets.
+
+    python benchmarks/bench_loaders.py [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, {root!r})
+import numpy, pandas
+
+def rss_kib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+
+from cefr.datasets import DATASETS, dataset_path, load_source
+from cefr.columnar import load_compiled
+
+before = rss_kib()
+start = time.perf_counter()
+frames = []
+for name in DATASETS:
+    if {mode!r} == "csv":
+        frames.append(load_source(name))
+    else:
+        frames.append(load_compiled(name, dataset_path(name)))
+        assert frames[-1] is not None, f"{{name}} is not compiled or is stale"
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "rss_kib": rss_kib() - before}}))
+"""
+
+
+def measure(mode):
+    out = subprocess.run([sys.executable, "-c", CHILD.format(root=ROOT, mode=mode)],
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ("csv", "compiled"):
+        runs = [measure(mode) for _ in range(args.repeat)]
+        results[mode] = {
+            "best_ms": round(min(r["seconds"] for r in runs) * 1000, 2),
+            "median_ms": round(sorted(r["seconds"] for r in runs)[len(runs) // 2] * 1000, 2),
+            "rss_delta_kib": sorted(r["rss_kib"] for r in runs)[len(runs) // 2],
+        }
+    for mode, r in results.items():
+        print(f"{mode:9} best {r['best_ms']:8.2f} ms   median {r['median_ms']:8.2f} ms   RSS +{r['rss_delta_kib']} KiB")
+    print(f"speed-up (median): {results['csv']['median_ms'] / results['compiled']['median_ms']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Latency of the cross-level word lookup (``cefr.lookup``) against a DataFrame scan.
+
+Builds the index once (datasets already loaded, so only the index itself is
+timed), then replays typing: every prefix of each query word, one keystroke
+at a time, with and without filters. The baseline concatenates the same
+wordlists into one DataFrame and filters it with ``str.startswith`` and
+boolean masks per keystroke, the way a page would without the index.
+
+    python benchmarks/bench_lookup.py [--words 50] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+QUERIES = {
+    "prefix": {},
+    "prefix + C1": {"level": "C1"},
+    "prefix + verb": {"pos": "v"},
+    "C1 verbs, /ɔ/": {"level": "C1", "pos": "v", "stressed_vowel": "ɔ"},
+}
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def scan_frame():
+    """All wordlists as one DataFrame, with the level of each row."""
+    import pandas as pd
+
+    from cefr.datasets import load_dataset
+    from cefr.lookup import APPENDED, SOURCES
+
+    frames = []
+    for dataset, level in SOURCES:
+        df = load_dataset(dataset)
+        if dataset in APPENDED:   # the appended copy of another list is that list's rows
+            other = load_dataset(APPENDED[dataset])
+            appended = set(zip(other["WORD"].str.lower(), other["SID"]))
+            df = df[[pair not in appended for pair in zip(df["WORD"].str.lower(), df["SID"])]]
+        frame = pd.DataFrame({"WORD": df["WORD"].astype(str), "POS": df["POS"].astype(str),
+                              "Stressed_Vowel": df["Stressed_Vowel"].astype(str) if "Stressed_Vowel" in df else ""})
+        frame["Level"] = level
+        frames.append(frame)
+    frame = pd.concat(frames, ignore_index=True)
+    frame["key"] = frame["WORD"].str.lower()
+    return frame
+
+
+def scan(frame, prefix, level=None, pos=None, stressed_vowel=None):
+    mask = frame["key"].str.startswith(prefix)
+    if level:
+        mask &= frame["Level"] == level
+    if pos:
+        mask &= frame["POS"].str.contains(rf"\b{pos}\.", regex=True)
+    if stressed_vowel:
+        mask &= frame["Stressed_Vowel"].str.replace("/", "").str.strip() == stressed_vowel
+    return frame[mask]
+
+
+def keystrokes(words):
+    return [word[:n] for word in words for n in range(1, len(word) + 1)]
+
+
+def timed(fn, inputs, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for value in inputs:
+            start = time.perf_counter()
+            fn(value)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main(argv=None):
+    from cefr.datasets import load_dataset
+    from cefr.lookup import SOURCES, LookupIndex
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=50, help="query words typed letter by letter")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for dataset, _ in SOURCES:
+        load_dataset(dataset)
+    start = time.perf_counter()
+    index = LookupIndex.build()
+    print(f"index: {len(index)} entries built in {(time.perf_counter() - start) * 1000:.1f} ms")
+    frame = scan_frame()
+
+    rng = random.Random(args.seed)
+    inputs = keystrokes(rng.sample(index.keys, min(args.words, len(index.keys))))
+    print(f"{len(inputs)} keystrokes x {args.repeat}\n")
+    print(f"{'query':16} {'index p50':>10} {'index p99':>10} {'scan p50':>10} {'scan p99':>10} {'speedup':>8}")
+    for name, filters in QUERIES.items():
+        for prefix in inputs[:20]:
+            found = sorted((e.word.lower(), e.level) for e in index.search(prefix, **filters))
+            rows = scan(frame, prefix, **filters)
+            expected = sorted(set(zip(rows["key"], rows["Level"])))
+            if found != expected:
+                print(f"MISMATCH {name} {prefix!r}: {len(found)} vs {len(expected)}")
+                return 1
+        fast = timed(lambda prefix: index.search(prefix, **filters), inputs, args.repeat)
+        slow = timed(lambda prefix: scan(frame, prefix, **filters), inputs, args.repeat)
+        print(f"{name:16} {percentile(fast, 50) * 1e6:8.1f}us {percentile(fast, 99) * 1e6:8.1f}us "
+              f"{percentile(slow, 50) * 1e6:8.0f}us {percentile(slow, 99) * 1e6:8.0f}us "
+              f"{percentile(slow, 50) / percentile(fast, 50):7.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
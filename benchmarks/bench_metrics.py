@@ -0,0 +1,102 @@
+"""Overhead of the always-on instrumentation (``cefr.metrics``).
+
+Reports, in nanoseconds per call:
+
+* ``observe``/``inc`` alone, from one thread and from ``--threads`` threads
+* the hot paths that carry hooks (SID slicing and sampling, a cached
+  ``generate_audio``, ``page_run`` around an empty script) with the
+  metrics on and with ``CEFR_METRICS=0``
+* rendering the Prometheus text (milliseconds and bytes)
+
+    python benchmarks/bench_metrics.py [--calls 200000] [--threads 8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+
+def per_call_ns(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def threaded_ns(fn, calls, threads):
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        barrier.wait()
+        for _ in range(calls // threads):
+            fn()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker_thread in workers:
+        worker_thread.start()
+    for worker_thread in workers:
+        worker_thread.join()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    os.environ["CEFR_STATE_DIR"] = tempfile.mkdtemp()
+    import stub_tts
+    from cefr import metrics
+    from cefr.index import get_index
+    from cefr.tts import generate_audio
+
+    stub_tts.install(latency=0)
+    histogram = metrics.Histogram("bench_seconds", "", ("op",))
+    counter = metrics.Counter("bench", "", ("op",))
+    print(f"{'primitive':28} {'1 thread':>10} {f'{args.threads} threads':>11}")
+    for name, fn in (("Histogram.observe", lambda: histogram.observe(0.0003, "x")),
+                     ("Counter.inc", lambda: counter.inc("x"))):
+        print(f"{name:28} {per_call_ns(fn, args.calls):8.0f}ns {threaded_ns(fn, args.calls, args.threads):9.0f}ns")
+
+    index = get_index("b2_wic")
+    generate_audio("warm the cache")
+
+    def empty_page():
+        with metrics.page_run("bench"):
+            pass
+
+    paths = {
+        "WordlistIndex.slice": lambda: index.slice(100, 119),
+        "WordlistIndex.sample_positions": lambda: index.sample_positions(1, 725, 10),
+        "generate_audio (cached)": lambda: generate_audio("warm the cache"),
+        "page_run (empty script)": empty_page,
+    }
+    print(f"\n{'hot path':32} {'metrics on':>11} {'off':>9} {'overhead':>9}")
+    for name, fn in paths.items():
+        calls = max(1, args.calls // 10)
+        fn()   # first call may import (page_run: streamlit's runtime)
+        metrics.ENABLED = True
+        on = per_call_ns(fn, calls)
+        metrics.ENABLED = False
+        off = per_call_ns(fn, calls)
+        metrics.ENABLED = True
+        print(f"{name:32} {on:9.0f}ns {off:7.0f}ns {on - off:7.0f}ns")
+
+    start = time.perf_counter()
+    text = metrics.render_prometheus()
+    print(f"\nrender_prometheus: {(time.perf_counter() - start) * 1000:.1f} ms, {len(text)} bytes, "
+          f"{sum(not line.startswith('#') for line in text.splitlines())} samples")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""Headless per-page benchmark: drives every page through Streamlit's AppTest.
+
+Each page runs in a fresh interpreter with an empty audio cache, no offline
+bundle, no background prefetch (see ``bench_prefetch.py``) and the
+deterministic TTS stub from ``stub_tts.py``, through a fixed sequence of
+steps (cold start, login or passcode, rerun, SID range change, Generate, Check).
+For every step the report records wall time, tracemalloc peak and the number
+of TTS calls; times are the median over ``--repeat`` runs.
+
+    python benchmarks/bench_pages.py [--pages home quiz_random] [--repeat 3]
+    python benchmarks/bench_pages.py --write-thresholds   # accept current numbers
+
+The JSON report goes to ``.cefr/bench/pages.json`` (``--output``). Every
+measurement is compared with ``benchmarks/page_thresholds.json``; the script
+exits with status 1 when a step is slower, bigger or makes more TTS calls
+than its budget, or raises. Time budgets are 3x the median of the baseline
+run and never below ``MIN_MS`` so that short steps survive scheduler noise.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+THRESHOLDS = os.path.join(ROOT, "benchmarks", "page_thresholds.json")
+
+# page name -> (script, steps after the cold start)
+PAGES = {
+    "home": ("CEFR_Home.py", ["rerun"]),
+    "wordlist": ("pages/I._Wordlist.py", ["rerun", "range", "generate"]),
+    "listening": ("pages/II._Listening_wordlist.py", ["range", "generate", "rerun"]),
+    "listen_and_spell": ("pages/🌱_App:_Listen_and_Spell.py", ["range", "generate", "rerun", "check"]),
+    "practice_wic": ("pages/🌱_App:_Practice_Words_in_Context.py", ["range", "generate", "rerun"]),
+    "quiz_practice": ("pages/🌱_App:_WIC_Quiz_Practice.py", ["range", "generate", "rerun", "check"]),
+    "quiz_random": ("pages/🌱_App:_WIC_Quiz_Random.py", ["login", "generate", "rerun", "check"]),
+    "teacher_analytics": ("pages/IV._Teacher_Analytics.py", ["passcode", "rerun"]),
+}
+
+# Budget = measurement * factor when writing thresholds (time varies most)
+SLACK = {"ms": 3.0, "peak_kib": 1.5, "tts_calls": 1.0}
+MIN_MS = 250.0   # floor of a time budget: a 30 ms rerun can triple on a busy machine
+
+CHILD = r"""
+import json, sys, time, tracemalloc
+sys.path.insert(0, {root!r})
+sys.path.insert(0, {root!r} + "/benchmarks")
+from streamlit.testing.v1 import AppTest
+import stub_tts
+
+stub = stub_tts.install(latency={latency!r})
+
+def click(at, *words):
+    for button in at.button:
+        if any(word in button.label for word in words):
+            return button.click()
+    raise LookupError(f"no button labelled {{words}}")
+
+def set_range(at):
+    at.number_input[0].set_value(21)
+    at.number_input[1].set_value(40)
+
+ACTIONS = {{
+    "rerun": lambda at: None,
+    "range": set_range,
+    "generate": lambda at: click(at, "Generate", "Show"),
+    "check": lambda at: click(at, "Check"),
+    "login": lambda at: at.text_input(key="user_id").input("bench"),
+    "passcode": lambda at: at.text_input(key="teacher_passcode").input("bench"),
+}}
+
+at = AppTest.from_file({script!r}, default_timeout=120)
+tracemalloc.start()
+results = []
+for step in ["cold"] + {steps!r}:
+    if step != "cold":
+        ACTIONS[step](at)
+    tracemalloc.reset_peak()
+    calls, start = stub.calls, time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    results.append({{
+        "step": step,
+        "ms": round(elapsed * 1000, 1),
+        "peak_kib": tracemalloc.get_traced_memory()[1] // 1024,
+        "tts_calls": stub.calls - calls,
+        "exceptions": [e.message for e in at.exception],
+    }})
+print(json.dumps(results))
+"""
+
+
+def run_page(name, latency):
+    script, steps = PAGES[name]
+    with tempfile.TemporaryDirectory() as state:
+        env = dict(os.environ, CEFR_STATE_DIR=state, CEFR_AUDIO_BUNDLE=os.path.join(state, "no-bundle"),
+                   CEFR_PREFETCH="0", CEFR_TEACHER_PASSCODE="bench")
+        env.pop("CEFR_DATA_SYNC", None)
+        code = CHILD.format(root=ROOT, script=os.path.join(ROOT, script), steps=steps, latency=latency)
+        out = subprocess.run([sys.executable, "-c", code], env=env, cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def measure(name, repeat, latency):
+    """Run a page ``repeat`` times; return per-step medians (max for memory/calls)."""
+    runs = [run_page(name, latency) for _ in range(repeat)]
+    steps = []
+    for samples in zip(*runs):
+        steps.append({
+            "step": samples[0]["step"],
+            "ms": round(statistics.median(s["ms"] for s in samples), 1),
+            "peak_kib": max(s["peak_kib"] for s in samples),
+            "tts_calls": max(s["tts_calls"] for s in samples),
+            "exceptions": sorted({e for s in samples for e in s["exceptions"]}),
+        })
+    return steps
+
+
+def regressions(report, thresholds):
+    """Return human-readable budget violations of ``report``."""
+    problems = []
+    for page, steps in report.items():
+        budgets = thresholds.get(page, {})
+        for step in steps:
+            label = f"{page}/{step['step']}"
+            if step["exceptions"]:
+                problems.append(f"{label}: raised {step['exceptions']}")
+            for metric, budget in budgets.get(step["step"], {}).items():
+                if step[metric] > budget:
+                    problems.append(f"{label}: {metric} {step[metric]} > {budget}")
+    return problems
+
+
+def budgets_for(report):
+    return {
+        page: {step["step"]: {metric: max(MIN_MS, round(step[metric] * factor, 1)) if metric == "ms"
+                              else int(step[metric] * factor)
+                              for metric, factor in SLACK.items()}
+               for step in steps}
+        for page, steps in report.items()
+    }
+
+
+def main(argv=None):
+    from cefr.config import STATE_DIR
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", choices=sorted(PAGES), default=list(PAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tts-latency", type=float, default=0.0, help="seconds slept per stub TTS call")
+    parser.add_argument("--output", default=str(STATE_DIR / "bench" / "pages.json"))
+    parser.add_argument("--write-thresholds", action="store_true", help=f"store budgets in {os.path.relpath(THRESHOLDS, ROOT)}")
+    args = parser.parse_args(argv)
+
+    report = {}
+    for name in args.pages:
+        report[name] = measure(name, args.repeat, args.tts_latency)
+        for step in report[name]:
+            print(f"{name:17} {step['step']:9} {step['ms']:9.1f} ms {step['peak_kib']:8d} KiB peak "
+                  f"{step['tts_calls']:4d} TTS calls" + (" RAISED" if step["exceptions"] else ""))
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"repeat": args.repeat, "tts_latency": args.tts_latency, "pages": report}, f, indent=2)
+    print(f"report: {args.output}")
+
+    thresholds = {}
+    if os.path.exists(THRESHOLDS):
+        with open(THRESHOLDS) as f:
+            thresholds = json.load(f)
+    if args.write_thresholds:
+        thresholds.update(budgets_for(report))
+        with open(THRESHOLDS, "w") as f:
+            json.dump(thresholds, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"thresholds written: {THRESHOLDS}")
+        return 0
+
+    problems = regressions(report, thresholds)
+    for problem in problems:
+        print("REGRESSION", problem)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    sys.exit(main())
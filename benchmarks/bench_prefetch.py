@@ -0,0 +1,101 @@
+"""Time of the second "Generate" with and without background prefetch.
+
+Each page runs headlessly (AppTest, stub TTS with ``--tts-latency`` seconds
+per call, empty cache) in a fresh interpreter: Generate a first batch, spend
+``--think`` seconds answering (every answer correct), then ask for the next
+batch -- the next SID window in Listen & Spell, a new draw in the WIC quiz --
+and Generate again. The run is repeated with ``CEFR_PREFETCH=0``.
+
+Reported per page and mode: both Generate times, the TTS calls made while
+the second one ran, and the prefetcher's counters (``hit_rate``).
+
+    python benchmarks/bench_prefetch.py [--tts-latency 0.3] [--think 3]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = {
+    "listen_and_spell": "pages/🌱_App:_Listen_and_Spell.py",
+    "quiz_random": "pages/🌱_App:_WIC_Quiz_Random.py",
+}
+
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, {root!r})
+sys.path.insert(0, {root!r} + "/benchmarks")
+from streamlit.testing.v1 import AppTest
+import stub_tts
+from cefr.datasets import load_dataset
+from cefr.prefetch import get_prefetcher
+
+stub = stub_tts.install(latency={latency!r})
+page = {page!r}
+
+def generate(at):
+    next(b for b in at.button if "Generate" in b.label).click()
+    calls, start = stub.calls, time.perf_counter()
+    at.run()
+    return round((time.perf_counter() - start) * 1000, 1), stub.calls - calls
+
+at = AppTest.from_file({script!r}, default_timeout=120)
+at.run()
+if page == "quiz_random":
+    at.text_input(key="user_id").input("bench").run()
+    words = dict(zip(load_dataset("b2_wic")["SID"], load_dataset("b2_wic")["WORD"]))
+else:
+    at.text_input[0].input("bench").run()
+    words = dict(zip(load_dataset("b2_words")["SID"], load_dataset("b2_words")["WORD"]))
+first_ms, first_calls = generate(at)
+
+# Answer everything correctly, then think
+for box in at.get("form")[0].get("text_input"):
+    box.input(words[int(box.key.rsplit("_", 2 if page == "listen_and_spell" else 1)[1])])
+next(b for b in at.button if "Check" in b.label).click().run()
+time.sleep({think!r})
+
+if page == "listen_and_spell":
+    at.number_input[0].set_value(21).run()   # next window: 21-40
+second_ms, second_calls = generate(at)
+print(json.dumps({{"first_ms": first_ms, "second_ms": second_ms, "second_calls": second_calls,
+                  "exceptions": [e.message for e in at.exception], "prefetch": get_prefetcher().snapshot()}}))
+"""
+
+
+def run(page, latency, think, prefetch):
+    with tempfile.TemporaryDirectory() as state:
+        env = dict(os.environ, CEFR_STATE_DIR=state, CEFR_AUDIO_BUNDLE=os.path.join(state, "no-bundle"),
+                   CEFR_PREFETCH="1" if prefetch else "0")
+        env.pop("CEFR_DATA_SYNC", None)
+        code = CHILD.format(root=ROOT, page=page, script=os.path.join(ROOT, PAGES[page]), latency=latency, think=think)
+        out = subprocess.run([sys.executable, "-c", code], env=env, cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", choices=sorted(PAGES), default=list(PAGES))
+    parser.add_argument("--tts-latency", type=float, default=0.3, help="seconds per stub TTS call")
+    parser.add_argument("--think", type=float, default=3.0, help="seconds spent answering the first batch")
+    args = parser.parse_args(argv)
+
+    print(f"{'page':17} {'prefetch':8} {'1st gen ms':>10} {'2nd gen ms':>10} {'2nd TTS':>7} {'hit rate':>8}")
+    for page in args.pages:
+        for prefetch in (False, True):
+            result = run(page, args.tts_latency, args.think, prefetch)
+            stats = result["prefetch"]
+            print(f"{page:17} {'on' if prefetch else 'off':8} {result['first_ms']:10.1f} {result['second_ms']:10.1f} "
+                  f"{result['second_calls']:7d} {stats['hit_rate']:8.0%}"
+                  + (f"  RAISED {result['exceptions'][:1]}" if result["exceptions"] else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
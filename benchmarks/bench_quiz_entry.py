@@ -0,0 +1,91 @@
+"""Reruns and bytes sent per completed quiz on the answer-entry pages.
+
+Answers are typed into a form inside an ``st.fragment``: typing triggers no
+rerun and "Check Answers" reruns only the fragment. Before, every committed
+blank reran the whole page. This script generates one quiz per page
+headlessly (AppTest, stub TTS), answers every blank, submits, and compares:
+
+* commit per blank -- ``items + 1`` full reruns, each sending a full page
+* form + fragment  -- one fragment rerun, sending only the fragment's deltas
+
+Bytes are the serialized ForwardMsgs a browser would receive.
+
+    python benchmarks/bench_quiz_entry.py
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+PAGES = {
+    "quiz_practice": "pages/🌱_App:_WIC_Quiz_Practice.py",
+    "quiz_random": "pages/🌱_App:_WIC_Quiz_Random.py",
+    "listen_and_spell": "pages/🌱_App:_Listen_and_Spell.py",
+}
+
+
+def capture_messages():
+    """Record the ForwardMsgs of every AppTest script run."""
+    from streamlit.testing.v1 import local_script_runner
+
+    runs = []
+    original = local_script_runner.LocalScriptRunner.run
+
+    def run(self, *args, **kwargs):
+        tree = original(self, *args, **kwargs)
+        runs.append(list(self.forward_msgs()))
+        return tree
+
+    local_script_runner.LocalScriptRunner.run = run
+    return runs
+
+
+def sent_bytes(messages, fragment_only=False):
+    total = 0
+    for msg in messages:
+        if fragment_only and not (msg.HasField("delta") and msg.delta.fragment_id):
+            continue
+        total += msg.ByteSize()
+    return total
+
+
+def measure(script, runs):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=120)
+    at.run()
+    if any(widget.key == "user_id" for widget in at.text_input):
+        at.text_input(key="user_id").input("bench").run()
+    next(b for b in at.button if "Generate" in b.label).click().run()
+    at.run()
+    full_page = sent_bytes(runs[-1])
+
+    blanks = at.get("form")[0].get("text_input")
+    for blank in blanks:
+        blank.input("answer")        # no run: the form holds the values until submit
+    next(b for b in at.button if "Check" in b.label).click().run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return len(blanks), full_page, sent_bytes(runs[-1], fragment_only=True)
+
+
+def main():
+    os.environ.setdefault("CEFR_STATE_DIR", tempfile.mkdtemp())
+    import stub_tts
+
+    stub_tts.install()
+    runs = capture_messages()
+    print(f"{'page':17} {'items':>5}  {'commit per blank':>24}  {'form + fragment':>24}")
+    for name, script in PAGES.items():
+        items, full_page, fragment = measure(script, runs)
+        before = (items + 1) * full_page
+        print(f"{name:17} {items:5d}  {items + 1:3d} full reruns {before / 1024:7.1f} KiB"
+              f"  {1:3d} fragment run {fragment / 1024:6.1f} KiB  ({before / max(fragment, 1):.0f}x fewer bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Per-worker memory of the datasets as the number of worker processes grows.
+
+Starts ``--workers`` processes at once (as several Streamlit servers behind a
+proxy would be), each loading every registered dataset plus the SID indexes
+and reading all of their text. While they are all alive it reads
+``/proc/<pid>/smaps_rollup`` and the ``.col`` mappings of each worker and
+reports, per worker:
+
+* ``private`` -- memory only that worker wrote while loading the data
+  (``Private_Dirty`` after minus before; clean pages of files or libraries it
+  happens to map alone are left out): what every extra worker costs
+* ``segment`` -- compiled files mapped by the worker, and its PSS share of them
+  (the mapping is counted once in total, split across the workers)
+
+Runs with the shared segment (default) and with ``CEFR_DATA_SHARED=0``, where
+every worker decodes its own copy of the text. Exits 1 if the private memory
+per worker grows with the worker count.
+
+    python benchmarks/bench_workers.py [--workers 1 2 4 8]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = r"""
+import json, sys
+sys.path.insert(0, {root!r})
+import numpy, pandas, pyarrow
+
+def dirty_kib():
+    with open("/proc/self/smaps_rollup") as f:
+        fields = dict(line.split(":", 1) for line in f if ":" in line and not line.startswith("0"))
+    return int(fields["Private_Dirty"].split()[0])
+
+from cefr.datasets import DATASETS
+from cefr.index import get_index
+
+before = dirty_kib()
+chars = 0
+for name in DATASETS:
+    frame = get_index(name).frame
+    for column in frame.columns:
+        if frame[column].dtype == "str":
+            chars += int(frame[column].str.len().sum())   # touch every string
+print(json.dumps({{"private_kib": dirty_kib() - before, "chars": chars}}), flush=True)
+sys.stdin.read()   # stay alive until the parent has measured everyone
+"""
+
+
+def segment_kib(pid):
+    """Return ``(rss, pss)`` in KiB of the compiled ``.col`` files mapped by ``pid``."""
+    rss = pss = 0
+    current = None
+    with open(f"/proc/{pid}/smaps") as f:
+        for line in f:
+            parts = line.split()
+            if "-" in parts[0] and len(parts) >= 5:   # mapping header line
+                current = parts[-1] if len(parts) >= 6 else ""
+            elif current and current.endswith(".col"):
+                if parts[0] == "Rss:":
+                    rss += int(parts[1])
+                elif parts[0] == "Pss:":
+                    pss += int(parts[1])
+    return rss, pss
+
+
+def run(workers, shared, state):
+    env = dict(os.environ, CEFR_STATE_DIR=state, CEFR_DATA_SHARED="1" if shared else "0")
+    procs = [subprocess.Popen([sys.executable, "-c", WORKER.format(root=ROOT)], env=env, text=True,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE) for _ in range(workers)]
+    try:
+        reports = [json.loads(proc.stdout.readline()) for proc in procs]
+        segments = [segment_kib(proc.pid) for proc in procs]
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+    return {
+        "private_kib": max(report["private_kib"] for report in reports),
+        "segment_rss_kib": max(rss for rss, _ in segments),
+        "segment_pss_kib": sum(pss for _, pss in segments) / workers,
+        "total_kib": sum(report["private_kib"] for report in reports) + sum(pss for _, pss in segments),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args(argv)
+
+    state = tempfile.mkdtemp()
+    print(f"{'mode':7} {'workers':>7} {'private/worker':>15} {'segment RSS':>12} {'PSS/worker':>11} {'total':>10}")
+    status = 0
+    for shared in (True, False):
+        first = None
+        for workers in args.workers:
+            result = run(workers, shared, state)
+            first = first or result
+            print(f"{'shared' if shared else 'copied':7} {workers:7d} {result['private_kib']:11d} KiB "
+                  f"{result['segment_rss_kib']:8d} KiB {result['segment_pss_kib']:7.0f} KiB {result['total_kib']:6.0f} KiB")
+            if shared and result["private_kib"] > first["private_kib"] * 1.1 + 256:
+                status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""Simulate a class of learners hitting the same page at the same moment.
+
+A real Streamlit server is started for the page, with the stub TTS from
+``stub_tts.py`` (``--tts-latency`` seconds per call) and an empty audio cache.
+Each learner is a websocket client speaking the browser protocol with its own
+session and user id: open the page, sign in, press Generate -- all learners
+wait for each other first, like at the start of a lesson -- rerun, type every
+answer and check.
+
+For every class size the script reports p50/p95/p99 rerun latency (time from
+sending a rerun to ``script_finished``), reruns per second, peak RSS of the
+server process and the number of TTS calls the server made.
+
+    python benchmarks/load_sim.py --learners 1 5 10 20 40 --tts-latency 0.3
+    python benchmarks/load_sim.py --page listen_and_spell --spread
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = {
+    "quiz_random": "pages/🌱_App:_WIC_Quiz_Random.py",
+    "listen_and_spell": "pages/🌱_App:_Listen_and_Spell.py",
+}
+
+SERVER = r"""
+import atexit, sys
+sys.path.insert(0, {root!r})
+sys.path.insert(0, {root!r} + "/benchmarks")
+import stub_tts
+stub = stub_tts.install(latency={latency!r})
+
+def report():
+    with open({calls_file!r}, "w") as f:
+        f.write(str(stub.calls))
+atexit.register(report)
+
+from streamlit.web import bootstrap
+flags = {{"server.port": {port}, "server.headless": True, "server.address": "127.0.0.1",
+          "browser.gatherUsageStats": False, "global.developmentMode": False,
+          "server.fileWatcherType": "none", "server.runOnSave": False, "logger.level": "error"}}
+bootstrap.load_config_options(flags)
+bootstrap.run({script!r}, False, [], flags)
+"""
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def peak_rss_kib(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    return 0
+
+
+class Server:
+    """The page running under ``streamlit run`` with the stub TTS."""
+
+    def __init__(self, page, latency, state_dir):
+        self.port = free_port()
+        self.calls_file = os.path.join(state_dir, "tts_calls")
+        code = SERVER.format(root=ROOT, latency=latency, calls_file=self.calls_file, port=self.port,
+                             script=os.path.join(ROOT, PAGES[page]))
+        env = dict(os.environ, CEFR_STATE_DIR=state_dir, CEFR_AUDIO_BUNDLE=os.path.join(state_dir, "no-bundle"))
+        env.pop("CEFR_DATA_SYNC", None)
+        self.process = subprocess.Popen([sys.executable, "-c", code], env=env, cwd=ROOT,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1)
+                break
+            except OSError:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"server did not start: {self.process.stderr.read().decode()[-2000:]}")
+                time.sleep(0.2)
+
+    @property
+    def url(self):
+        return f"ws://127.0.0.1:{self.port}/_stcore/stream"
+
+    def stop(self):
+        """Stop the server; return ``(peak_rss_kib, tts_calls)``."""
+        rss = peak_rss_kib(self.process.pid)
+        self.process.terminate()
+        self.process.wait(timeout=30)
+        with open(self.calls_file) as f:
+            return rss, int(f.read())
+
+
+class Browser:
+    """Minimal websocket client for one Streamlit session."""
+
+    def __init__(self, websocket):
+        self.ws = websocket
+        self.elements = []        # (element type, proto, fragment id) of the last run
+        self.values = {}          # widget id -> WidgetState sent with every rerun
+        self.triggers = []
+        self.page_hash = ""
+        self.exceptions = []
+
+    async def rerun(self, fragment_id=""):
+        """Send a rerun and wait for it to finish; return elapsed seconds."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        state = msg.rerun_script
+        state.page_script_hash = self.page_hash
+        state.fragment_id = fragment_id
+        state.widget_states.widgets.extend(list(self.values.values()) + self.triggers)
+        self.triggers = []
+        if not fragment_id:
+            self.elements = []
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.ws.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                self.page_hash = forward.new_session.page_script_hash
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = forward.delta.new_element
+                name = element.WhichOneof("type")
+                if name == "exception":
+                    self.exceptions.append(element.exception.message)
+                self.elements.append((name, getattr(element, name), forward.delta.fragment_id))
+            elif kind == "script_finished" and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return time.perf_counter() - start
+
+    def find(self, name, label="", in_form=None):
+        return [(proto, fragment) for kind, proto, fragment in self.elements
+                if kind == name and label in proto.label and (in_form is None or bool(proto.form_id) == in_form)]
+
+    def _state(self, proto):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        return WidgetState(id=proto.id)
+
+    def type_text(self, proto, text):
+        state = self._state(proto)
+        state.string_value = text
+        self.values[proto.id] = state
+
+    def set_number(self, proto, value):
+        state = self._state(proto)
+        if proto.data_type == proto.INT:
+            state.int_value = value
+        else:
+            state.double_value = value
+        self.values[proto.id] = state
+
+    def click(self, proto):
+        state = self._state(proto)
+        state.trigger_value = True
+        self.triggers.append(state)
+
+
+async def learner(number, page, url, barrier, spread):
+    """One learner's lesson; returns ``[(step, seconds), ...]``."""
+    import websockets
+
+    timings = []
+    async with websockets.connect(url, subprotocols=["streamlit"], max_size=None) as ws:
+        browser = Browser(ws)
+
+        async def step(name, fragment_id=""):
+            timings.append((name, await browser.rerun(fragment_id)))
+
+        await step("open")
+        user_id = f"learner{number:03d}"
+        if page == "quiz_random":
+            browser.type_text(browser.find("text_input", "User ID")[0][0], user_id)
+            await step("sign_in")
+        else:
+            browser.type_text(browser.find("text_input", "user name")[0][0], user_id)
+            await step("sign_in")
+            if spread:
+                start_sid = 1 + 20 * number
+                numbers = browser.find("number_input")
+                browser.set_number(numbers[0][0], start_sid)
+                browser.set_number(numbers[1][0], start_sid + 19)
+                await step("range")
+        await barrier.wait()
+        browser.click(browser.find("button", "Generate")[0][0])
+        await step("generate")
+        await step("rerun")
+        for proto, _ in browser.find("text_input", in_form=True):
+            browser.type_text(proto, "answer")
+        submit, fragment_id = browser.find("button", "Check")[0]
+        browser.click(submit)
+        await step("check", fragment_id)
+        if browser.exceptions:
+            raise RuntimeError(browser.exceptions[0])
+    return timings
+
+
+async def lesson(page, url, learners, spread):
+    barrier = asyncio.Barrier(learners)
+    return await asyncio.gather(*(learner(n, page, url, barrier, spread) for n in range(learners)),
+                                return_exceptions=True)
+
+
+def run_class(page, learners, latency, spread):
+    with tempfile.TemporaryDirectory() as state:
+        server = Server(page, latency, state)
+        try:
+            start = time.perf_counter()
+            outcomes = asyncio.run(lesson(page, server.url, learners, spread))
+            wall = time.perf_counter() - start
+        finally:
+            rss, calls = server.stop()
+
+    errors = [f"{type(o).__name__}: {o}" for o in outcomes if isinstance(o, BaseException)]
+    timings = [t for o in outcomes if not isinstance(o, BaseException) for t in o]
+    reruns = [seconds for step, seconds in timings if step != "open"]
+    generate = [seconds for step, seconds in timings if step == "generate"]
+    return {
+        "learners": learners,
+        "errors": errors,
+        "reruns": len(timings),
+        "p50_ms": round(percentile(reruns, 50) * 1000, 1),
+        "p95_ms": round(percentile(reruns, 95) * 1000, 1),
+        "p99_ms": round(percentile(reruns, 99) * 1000, 1),
+        "generate_p95_ms": round(percentile(generate, 95) * 1000, 1),
+        "reruns_per_s": round(len(timings) / wall, 2),
+        "wall_s": round(wall, 2),
+        "peak_rss_mib": round(rss / 1024, 1),
+        "tts_calls": calls,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page", choices=sorted(PAGES), default="quiz_random")
+    parser.add_argument("--learners", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--tts-latency", type=float, default=0.3, help="seconds per stub TTS call")
+    parser.add_argument("--spread", action="store_true", help="give each Listen & Spell learner a different SID range")
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{args.page}, stub TTS latency {args.tts_latency}s")
+    print(f"{'learners':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'gen p95':>8} {'reruns/s':>9} {'RSS MiB':>8} {'TTS':>5}")
+    for learners in args.learners:
+        result = run_class(args.page, learners, args.tts_latency, args.spread)
+        results.append(result)
+        print(f"{learners:8d} {result['p50_ms']:8.1f} {result['p95_ms']:8.1f} {result['p99_ms']:8.1f} "
+              f"{result['generate_p95_ms']:8.1f} {result['reruns_per_s']:9.2f} {result['peak_rss_mib']:8.1f} "
+              f"{result['tts_calls']:5d}" + (f"  errors: {result['errors'][:1]}" if result["errors"] else ""))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"page": args.page, "tts_latency": args.tts_latency, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
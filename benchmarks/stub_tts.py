@@ -0,0 +1,62 @@
+"""Deterministic local stand-in for gTTS used by the benchmarks.
+
+Returns real (silent) MPEG-2 Layer III frames, so the playlist joiner and
+``st.audio`` see valid MP3 data, with a length that depends only on the
+text. ``latency`` seconds are slept per call to model the network.
+
+Bulk requests (``synthesize_many``) return "sounding" frames instead, so the
+pauses between texts can be found: a comma is a short pause and "..." a
+long one, which makes the split fail the way a real engine's would.
+"""
+
+import threading
+import time
+
+from cefr import tts
+from cefr.backends import BULK_PAUSE, Backend
+from cefr.mp3 import FrameHeader, silence_frames, silent_frame
+
+# MPEG-2, Layer III, no CRC, 32 kbit/s, 24 kHz, mono: the format gTTS returns
+_HEADER = FrameHeader(0xFFE00000 | 2 << 19 | 1 << 17 | 1 << 16 | 4 << 12 | 1 << 10 | 3 << 6)
+_FRAME = silent_frame(_HEADER)
+# Same format with big_values > 0 in the side info: not "quiet" to cefr.mp3
+_SPEECH = _FRAME[:4] + ((300 << 51) | (100 << 42)).to_bytes(9, "big") + b"\x55" * (len(_FRAME) - 13)
+
+
+class StubBackend(Backend):
+    """TTS backend standing in for gTTS (same engine name) that counts calls."""
+
+    name = tts.ENGINE
+    remote = True   # rate limited like gTTS
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def synthesize(self, text, lang="en", timeout=None):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return _FRAME * (4 + len(text) // 2)   # ~24 ms of audio per character pair
+
+    def synthesize_many(self, texts, lang="en", timeout=None, pause=BULK_PAUSE):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        gap = b"".join(silence_frames(pause, _HEADER))
+        spoken = []
+        for text in texts:
+            sentences = [(_FRAME * 8).join(_SPEECH * (2 + len(phrase) // 2) for phrase in sentence.split(","))
+                         for sentence in text.split("...")]
+            spoken.append((_FRAME * 40).join(sentences))   # ~1 s inside a text: the split must fail
+        return _FRAME * 10 + gap.join(spoken) + _FRAME * 10
+
+
+def install(latency=0.0):
+    """Make a new stub the only TTS backend and return it."""
+    stub = StubBackend(latency)
+    tts.use_backends([stub])
+    return stub
@@ -0,0 +1,6 @@
+"""Shared building blocks for the CEFR vocabulary pages.
+
+The Streamlit pages in ``pages/`` import what they need from the submodules
+(``cefr.tts``, ``cefr.audio_cache``, ...). Nothing is imported here so that a
+page only pays for the modules it actually uses.
+"""
@@ -0,0 +1,346 @@
+"""Append-only log of every checked answer, in SQLite (WAL mode).
+
+Each "Check Answers" adds one row per item: user, page, dataset (which fixes
+the level and the SID numbering), SID, the typed answer, whether it was
+correct and a timestamp. Pages only put rows on an in-memory queue; one
+background thread writes them in batches of up to ``BATCH_SIZE`` rows per
+transaction, so grading never waits for the disk. If the queue ever holds
+``CEFR_ANSWER_QUEUE`` rows (writer stuck), new rows are counted as dropped
+rather than blocking the page.
+
+The database is ``STATE_DIR/answers.sqlite3`` (``CEFR_ANSWER_DB``) and has
+indexes for per-user and per-SID queries.
+
+The same transaction that writes a batch also adds it to running totals per
+SID, per user and per dataset (which fixes the level), for all time and for
+the ISO week of each answer (``week_of``); unnamed sessions are added up as
+one user. The teacher analytics page reads only these totals, through
+indexes that keep them ordered by error rate, so "the 20 hardest C1 words
+this week" costs the same with a thousand answers as with ten million. A log written before the totals existed is summed up
+once when it is opened (``PRAGMA user_version``).
+"""
+
+import atexit
+import contextlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from cefr.config import STATE_DIR, env_int
+
+DB_PATH = os.environ.get("CEFR_ANSWER_DB", str(STATE_DIR / "answers.sqlite3"))
+BATCH_SIZE = env_int("CEFR_ANSWER_BATCH", 500)
+MAX_PENDING = env_int("CEFR_ANSWER_QUEUE", 100_000)
+FLUSH_SECONDS = 0.2   # longest a row waits for companions before it is written
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id      INTEGER PRIMARY KEY,
+    user    TEXT    NOT NULL,
+    page    TEXT    NOT NULL,
+    dataset TEXT    NOT NULL,
+    sid     INTEGER NOT NULL,
+    answer  TEXT    NOT NULL,
+    correct INTEGER NOT NULL,
+    ts      REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_user ON answers (user, ts);
+CREATE INDEX IF NOT EXISTS answers_sid ON answers (dataset, sid, ts);
+
+CREATE TABLE IF NOT EXISTS sid_stats (
+    period   TEXT    NOT NULL,   -- 'all' or an ISO week such as '2026-W42'
+    dataset  TEXT    NOT NULL,
+    sid      INTEGER NOT NULL,
+    attempts INTEGER NOT NULL,
+    correct  INTEGER NOT NULL,
+    PRIMARY KEY (period, dataset, sid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sid_stats_hardest
+    ON sid_stats (period, dataset, (attempts - correct + 1.0) / (attempts + 2.0) DESC);
+
+CREATE TABLE IF NOT EXISTS user_stats (
+    period   TEXT    NOT NULL,
+    dataset  TEXT    NOT NULL,
+    user     TEXT    NOT NULL,
+    attempts INTEGER NOT NULL,
+    correct  INTEGER NOT NULL,
+    last_ts  REAL    NOT NULL,
+    PRIMARY KEY (period, dataset, user)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS user_stats_weakest
+    ON user_stats (period, dataset, correct * 1.0 / attempts);
+
+CREATE TABLE IF NOT EXISTS dataset_stats (
+    period   TEXT    NOT NULL,
+    dataset  TEXT    NOT NULL,
+    attempts INTEGER NOT NULL,
+    correct  INTEGER NOT NULL,
+    PRIMARY KEY (period, dataset)
+) WITHOUT ROWID;
+"""
+
+# Hardest first: error rate as if every SID had one more wrong and one more
+# right answer, so one miss in one attempt does not outrank a word half the
+# class got wrong. The ORDER BY clauses must match the index expressions.
+HARDEST = "(attempts - correct + 1.0) / (attempts + 2.0) DESC"
+WEAKEST = "correct * 1.0 / attempts"
+
+AGGREGATES_VERSION = 2   # PRAGMA user_version once the totals include every answer (2: ANONYMOUS)
+
+# Learners who give no name are logged as "session:<uuid>"; their totals are
+# kept as one ANONYMOUS user so every browser tab is not counted as a student
+ANONYMOUS_PREFIX = "session:"
+ANONYMOUS = ANONYMOUS_PREFIX + "*"
+
+UPSERTS = (
+    "INSERT INTO sid_stats (period, dataset, sid, attempts, correct) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT DO UPDATE SET attempts = attempts + excluded.attempts, correct = correct + excluded.correct",
+    "INSERT INTO user_stats (period, dataset, user, attempts, correct, last_ts) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT DO UPDATE SET attempts = attempts + excluded.attempts, correct = correct + excluded.correct, "
+    "last_ts = max(last_ts, excluded.last_ts)",
+    "INSERT INTO dataset_stats (period, dataset, attempts, correct) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT DO UPDATE SET attempts = attempts + excluded.attempts, correct = correct + excluded.correct",
+)
+
+
+def week_of(ts):
+    """ISO week of a timestamp in local time, e.g. ``'2026-W42'`` (the period key of the totals)."""
+    return time.strftime("%G-W%V", time.localtime(ts))
+
+
+def _add_to_totals(conn, rows):
+    """Add ``answers`` rows (``user, page, dataset, sid, answer, correct, ts``) to the running totals."""
+    sids, users, datasets = {}, {}, {}
+    weeks = {}   # rows of one check share a timestamp
+    for user, _, dataset, sid, _, correct, ts in rows:
+        week = weeks.get(ts)
+        if week is None:
+            week = weeks[ts] = week_of(ts)
+        if user.startswith(ANONYMOUS_PREFIX):
+            user = ANONYMOUS
+        for period in ("all", week):
+            total = sids.setdefault((period, dataset, sid), [0, 0])
+            total[0] += 1
+            total[1] += correct
+            total = users.setdefault((period, dataset, user), [0, 0, ts])
+            total[0] += 1
+            total[1] += correct
+            total[2] = max(total[2], ts)
+            total = datasets.setdefault((period, dataset), [0, 0])
+            total[0] += 1
+            total[1] += correct
+    for sql, totals in zip(UPSERTS, (sids, users, datasets)):
+        conn.executemany(sql, [key + tuple(total) for key, total in totals.items()])
+
+
+def connect(path=DB_PATH):
+    """Open a connection with the log's pragmas (WAL, relaxed fsync)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # WAL + NORMAL: durable across app crashes
+    return conn
+
+
+class AnswerLog:
+    """Queue in front of the ``answers`` table, drained by one writer thread."""
+
+    def __init__(self, path=DB_PATH, batch_size=BATCH_SIZE, max_pending=MAX_PENDING):
+        self.path = path
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_pending)
+        self.stats = {"queued": 0, "written": 0, "batches": 0, "dropped": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+        self._pending = {}   # (user, dataset) -> rows queued and not yet committed
+        self._pending_lock = threading.Lock()
+        with contextlib.closing(connect(path)) as conn:
+            conn.executescript(SCHEMA)
+            self._build_totals(conn)
+        self._writer = threading.Thread(target=self._run, name="answer-log", daemon=True)
+        self._writer.start()
+
+    # -- producers ---------------------------------------------------------
+    def record(self, user, page, dataset, sid, answer, correct, ts=None):
+        """Queue one answer; never blocks."""
+        self.record_many([(user, page, dataset, sid, answer, correct)], ts)
+
+    def record_many(self, rows, ts=None):
+        """Queue ``(user, page, dataset, sid, answer, correct)`` rows from one check."""
+        ts = time.time() if ts is None else ts
+        queued = dropped = 0
+        with self._pending_lock:   # Noted before the writer can take it off the queue
+            for user, page, dataset, sid, answer, correct in rows:
+                row = (user, page, dataset, int(sid), answer, int(bool(correct)), ts)
+                try:
+                    self._queue.put_nowait(row)
+                except queue.Full:
+                    dropped += 1
+                    continue
+                self._pending.setdefault((user, dataset), []).append(row)
+                queued += 1
+        with self._stats_lock:
+            self.stats["queued"] += queued
+            self.stats["dropped"] += dropped
+
+    def flush(self, timeout=None):
+        """Block until every row queued so far is written (for tools and shutdown)."""
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    # -- writer ------------------------------------------------------------
+    @staticmethod
+    def _build_totals(conn):
+        """Sum up the answers logged before the running totals existed (once per database)."""
+        conn.execute("BEGIN IMMEDIATE")   # one process builds them; the others then see the new version
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] < AGGREGATES_VERSION:
+                for table in ("sid_stats", "user_stats", "dataset_stats"):
+                    conn.execute(f"DELETE FROM {table}")
+                cursor = conn.execute("SELECT user, page, dataset, sid, answer, correct, ts FROM answers")
+                while rows := cursor.fetchmany(50_000):
+                    _add_to_totals(conn, rows)
+                conn.execute(f"PRAGMA user_version = {AGGREGATES_VERSION}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def _run(self):
+        conn = connect(self.path)
+        while True:
+            batch, events = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + FLUSH_SECONDS
+            while True:
+                if isinstance(item, threading.Event):
+                    events.append(item)
+                    break           # flush(): write what we have now
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(conn, batch)
+            for event in events:
+                event.set()
+
+    def _write(self, conn, batch):
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO answers (user, page, dataset, sid, answer, correct, ts) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    batch)
+                _add_to_totals(conn, batch)   # Same transaction: the totals never miss or repeat a batch
+        except sqlite3.Error:
+            with self._stats_lock:
+                self.stats["errors"] += 1
+            return
+        finally:
+            self._settle(batch)
+        with self._stats_lock:
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+
+    def _settle(self, batch):
+        """Forget committed (or failed) rows: queries find them in the table from now on."""
+        with self._pending_lock:
+            for row in batch:
+                key = (row[0], row[2])
+                rows = self._pending[key]
+                rows.remove(row)
+                if not rows:
+                    del self._pending[key]
+
+    def snapshot(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["pending"] = self._queue.qsize()
+        return stats
+
+    # -- queries -----------------------------------------------------------
+    def user_answers(self, user, dataset=None, limit=1000):
+        """Most recent answers of ``user`` (optionally in one dataset), newest first."""
+        sql = "SELECT page, dataset, sid, answer, correct, ts FROM answers WHERE user = ?"
+        args = [user]
+        if dataset is not None:
+            sql += " AND dataset = ?"
+            args.append(dataset)
+        with contextlib.closing(connect(self.path)) as conn:
+            return conn.execute(sql + " ORDER BY ts DESC LIMIT ?", args + [limit]).fetchall()
+
+    def history(self, user, dataset):
+        """``[(sid, correct, ts), ...]`` of ``user`` in one dataset, oldest first.
+
+        Includes rows still waiting for the writer, without waiting for it.
+        """
+        with self._pending_lock:   # Before the read: a row committed since is in both, never in neither
+            pending = [(sid, correct, ts) for _, _, _, sid, _, correct, ts in self._pending.get((user, dataset), ())]
+        with contextlib.closing(connect(self.path)) as conn:
+            rows = conn.execute("SELECT sid, correct, ts FROM answers WHERE user = ? AND dataset = ? ORDER BY ts",
+                                (user, dataset)).fetchall()
+        if pending:
+            written = set(rows)
+            rows = sorted(rows + [row for row in pending if row not in written], key=lambda row: row[2])
+        return rows
+
+    def sid_accuracy(self, dataset, sids=None, period="all"):
+        """``{sid: (attempts, correct)}`` for a dataset, optionally only ``sids``."""
+        sql = "SELECT sid, attempts, correct FROM sid_stats WHERE period = ? AND dataset = ?"
+        args = [period, dataset]
+        if sids is not None:
+            sids = [int(sid) for sid in sids]
+            sql += f" AND sid IN ({','.join('?' * len(sids))})"
+            args += sids
+        with contextlib.closing(connect(self.path)) as conn:
+            rows = conn.execute(sql, args).fetchall()
+        return {sid: (attempts, correct) for sid, attempts, correct in rows}
+
+    def hardest(self, dataset, period="all", limit=20, min_attempts=1):
+        """``[(sid, attempts, correct), ...]`` of the most missed SIDs in ``period``, hardest first."""
+        with contextlib.closing(connect(self.path)) as conn:
+            return conn.execute(
+                f"SELECT sid, attempts, correct FROM sid_stats WHERE period = ? AND dataset = ? AND attempts >= ? "
+                f"ORDER BY {HARDEST} LIMIT ?", (period, dataset, min_attempts, limit)).fetchall()
+
+    def students(self, dataset, period="all", limit=200):
+        """``[(user, attempts, correct, last_ts), ...]`` in ``period``, lowest accuracy first.
+
+        Unnamed sessions share one ``ANONYMOUS`` row.
+        """
+        with contextlib.closing(connect(self.path)) as conn:
+            return conn.execute(
+                f"SELECT user, attempts, correct, last_ts FROM user_stats WHERE period = ? AND dataset = ? "
+                f"ORDER BY {WEAKEST} LIMIT ?", (period, dataset, limit)).fetchall()
+
+    def totals(self, period="all"):
+        """``{dataset: (attempts, correct, users)}`` in ``period``; ``users`` leaves out unnamed sessions."""
+        with contextlib.closing(connect(self.path)) as conn:
+            rows = conn.execute(
+                "SELECT dataset, attempts, correct, (SELECT COUNT(*) FROM user_stats AS u "
+                "WHERE u.period = d.period AND u.dataset = d.dataset AND u.user != ?) FROM dataset_stats AS d "
+                "WHERE period = ?", (ANONYMOUS, period)).fetchall()
+        return {dataset: (attempts, correct, users) for dataset, attempts, correct, users in rows}
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_answer_log():
+    """Return the answer log shared by every page and session in this process."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = AnswerLog()
+                atexit.register(_shared.flush, 5)
+    return _shared
@@ -0,0 +1,147 @@
+"""Process-wide, content-addressed cache for synthesized audio.
+
+Clips are keyed by a hash of ``(text, lang, engine)`` so every page and every
+session shares the same entry for the same sentence. Two tiers are used:
+
+* memory: an LRU dict bounded by a total byte budget
+* disk:   one file per key under ``STATE_DIR/audio`` that survives restarts
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from cefr.config import STATE_DIR, env_int
+
+DEFAULT_MEMORY_BUDGET = env_int("CEFR_AUDIO_MEMORY_BYTES", 64 * 1024 * 1024)
+
+
+def audio_key(text, lang="en", engine="gtts"):
+    """Return the cache key for a clip."""
+    raw = "\x1f".join((engine, lang, text)).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class AudioCache:
+    """Two-tier (memory LRU + disk) byte cache with hit/miss counters."""
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET, disk_dir=None):
+        self.memory_budget = memory_budget
+        self.disk_dir = disk_dir
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    # -- memory tier -------------------------------------------------------
+    def _remember(self, key, data):
+        """Insert into the LRU tier, evicting the oldest entries over budget."""
+        if len(data) > self.memory_budget:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old)
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.memory_budget:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+                self.stats["evictions"] += 1
+
+    # -- disk tier ---------------------------------------------------------
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + ".mp3")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, data):
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file first so readers never see a partial clip
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # The disk tier is best effort; memory still holds the clip
+
+    # -- public API --------------------------------------------------------
+    def get(self, key):
+        """Return cached bytes for ``key`` or None."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return data
+        data = self._read_disk(key)
+        if data is not None:
+            with self._lock:
+                self.stats["disk_hits"] += 1
+            self._remember(key, data)
+        return data
+
+    def put(self, key, data, disk=True):
+        """Store ``data`` in both tiers (``disk=False``: memory only, for derived audio)."""
+        self._remember(key, data)
+        if disk:
+            self._write_disk(key, data)
+
+    def record_miss(self):
+        with self._lock:
+            self.stats["misses"] += 1
+
+    def get_or_create(self, key, create):
+        """Return the cached clip for ``key``, calling ``create()`` on a miss."""
+        data = self.get(key)
+        if data is None:
+            self.record_miss()
+            data = create()
+            self.put(key, data)
+        return data
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._memory:
+                return True
+        return bool(self.disk_dir) and os.path.exists(self._path(key))
+
+    def memory_bytes(self):
+        return self._memory_bytes
+
+    def snapshot(self):
+        """Return counters plus the current size of the memory tier."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_items"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (lookups - stats["misses"]) / lookups if lookups else 0.0
+        return stats
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_audio_cache():
+    """Return the cache shared by every page and session in this process."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = AudioCache(disk_dir=str(STATE_DIR / "audio"))
+    return _shared
@@ -0,0 +1,105 @@
+"""Post-synthesis processing that makes clips smaller before they are cached.
+
+TTS engines return speech with leading and trailing silence at a fixed
+bitrate; for one-word clips most of the bytes are silence. Every newly
+synthesized clip goes through ``process`` before it is stored, in the mode
+set by ``CEFR_AUDIO_PROCESS``:
+
+* ``trim`` (default) -- silent MPEG frames cut from both ends, no re-encode
+* ``transcode`` (needs ffmpeg) -- decoded with pydub, silence below
+  ``SILENCE_DBFS`` trimmed to ``PAD_MS``, peak-normalized to ``HEADROOM_DB``
+  and re-encoded as mono MP3 at ``CEFR_AUDIO_BITRATE`` kbit/s
+* ``off`` (or ``0``) -- clips are stored as synthesized
+
+The mode is a setting, not a property of the machine: a bundle built on a
+host with ffmpeg must still match the server that loads it. ``transcode``
+without ffmpeg logs a warning and trims instead.
+
+MP3 stays the output format: ``st.audio`` and the frame-level playlist joiner
+in ``cefr.mp3`` both rely on it. ``VARIANT`` names the settings and is part of
+every cache key, so clips processed differently never share an entry.
+"""
+
+import logging
+import os
+import shutil
+import threading
+from io import BytesIO
+
+from cefr.config import env_int
+from cefr.mp3 import trim_silence
+
+BITRATE = env_int("CEFR_AUDIO_BITRATE", 24)          # kbit/s, mono
+SAMPLE_RATE = env_int("CEFR_AUDIO_SAMPLE_RATE", 16000)
+SILENCE_DBFS = -45
+PAD_MS = 50
+HEADROOM_DB = 1.0
+MODES = ("trim", "transcode", "off")
+
+_log = logging.getLogger(__name__)
+
+
+def _mode():
+    """Processing mode from ``CEFR_AUDIO_PROCESS``."""
+    mode = os.environ.get("CEFR_AUDIO_PROCESS", "trim").strip().lower() or "trim"
+    mode = {"0": "off", "1": "trim"}.get(mode, mode)
+    if mode not in MODES:
+        raise ValueError(f"CEFR_AUDIO_PROCESS={mode!r}: expected one of {', '.join(MODES)}")
+    if mode == "transcode" and not (shutil.which("ffmpeg") or shutil.which("avconv")):
+        _log.warning("CEFR_AUDIO_PROCESS=transcode needs ffmpeg, which is not installed: trimming instead")
+        return "trim"
+    return mode
+
+
+MODE = _mode()
+VARIANT = {
+    "off": "",
+    "trim": f"trim{PAD_MS}",
+    "transcode": f"trim{PAD_MS}-norm-mono{BITRATE}k{SAMPLE_RATE // 1000}",
+}[MODE]
+
+stats = {"clips": 0, "bytes_in": 0, "bytes_out": 0, "failures": 0}
+_stats_lock = threading.Lock()
+
+
+def _transcode(data):
+    from pydub import AudioSegment, effects
+    from pydub.silence import detect_leading_silence
+
+    clip = AudioSegment.from_file(BytesIO(data), format="mp3")
+    start = max(0, detect_leading_silence(clip, SILENCE_DBFS) - PAD_MS)
+    end = len(clip) - max(0, detect_leading_silence(clip.reverse(), SILENCE_DBFS) - PAD_MS)
+    if end > start:
+        clip = clip[start:end]
+    clip = effects.normalize(clip.set_channels(1), headroom=HEADROOM_DB)
+    out = BytesIO()
+    clip.export(out, format="mp3", bitrate=f"{BITRATE}k", parameters=["-ar", str(SAMPLE_RATE)])
+    return out.getvalue()
+
+
+def process(data, mode=None):
+    """Return the compact version of an MP3 clip, or ``data`` if it is not smaller."""
+    mode = mode or MODE
+    if mode == "off":
+        return data
+    failed = False
+    try:
+        out = _transcode(data) if mode == "transcode" else trim_silence(data, PAD_MS / 1000)
+    except Exception:
+        out, failed = None, True  # A clip we cannot decode still plays as synthesized
+    if not out or len(out) >= len(data):
+        out = data
+    with _stats_lock:
+        stats["clips"] += 1
+        stats["bytes_in"] += len(data)
+        stats["bytes_out"] += len(out)
+        stats["failures"] += failed
+    return out
+
+
+def snapshot():
+    """Mode, variant and bytes in/out of every clip processed so far."""
+    with _stats_lock:
+        counts = dict(stats)
+    counts["saved_ratio"] = round(1 - counts["bytes_out"] / counts["bytes_in"], 3) if counts["bytes_in"] else 0.0
+    return dict(counts, mode=MODE, variant=VARIANT)
@@ -0,0 +1,310 @@
+"""Cacheable URLs for audio clips, served by a small local HTTP server.
+
+``st.audio(bytes)`` hands the clip to Streamlit's media store again on every
+rerun of every session, and the ``/media`` responses carry no validators or
+cache headers, so the browser downloads the clip again each time. Pages call
+``audio_source(data)`` instead: the clip is written once to
+``STATE_DIR/static/audio/<sha256>.mp3`` and the page gets its URL. The name is
+the hash of the bytes, so a URL never changes meaning and can be cached
+forever. The folder holds at most ``CEFR_AUDIO_STATIC_BYTES`` (default 256
+MiB; 0: no cap): publishing a clip again marks it as recently used, and every
+``PRUNE_EVERY`` new clips the least recently used ones are deleted down to
+the cap.
+
+A threaded HTTP server on ``CEFR_AUDIO_HOST``:``CEFR_AUDIO_PORT`` (default
+127.0.0.1:8581) serves that folder with ``Cache-Control: immutable`` for a
+year, the hash as ETag (``304`` for a matching ``If-None-Match``) and single
+byte ranges (``206``, honouring ``If-Range``), which ``<audio>`` elements use
+to seek. Several worker processes share one server: the first binds the
+port, the others check that it serves the same folder and use it.
+
+Browsers must be able to reach the server. Pages opened on ``localhost`` use
+``http://localhost:<port>`` directly; other deployments route a path of
+their proxy to the server and set ``CEFR_AUDIO_URL`` to its public prefix.
+Without a usable URL (or with ``CEFR_AUDIO_PORT=0``) ``audio_source``
+returns the bytes, as before.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from urllib.parse import urlsplit
+
+from cefr.config import STATE_DIR, env_int
+
+HOST = os.environ.get("CEFR_AUDIO_HOST", "127.0.0.1")
+PORT = env_int("CEFR_AUDIO_PORT", 8581)   # 0: no server, pages pass bytes
+PUBLIC_URL = os.environ.get("CEFR_AUDIO_URL", "").rstrip("/")
+STATIC_DIR = STATE_DIR / "static" / "audio"
+MAX_BYTES = env_int("CEFR_AUDIO_STATIC_BYTES", 256 * 1024 * 1024)   # 0: no cap
+PRUNE_EVERY = 64   # new clips between checks of the folder size
+MAX_AGE = 365 * 24 * 3600
+
+LOCAL_HOSTS = {"localhost", "127.0.0.1"}
+CLIP_PATH = re.compile(r"/audio/([0-9a-f]{64})\.mp3")
+BYTE_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+PING_PATH = "/audio/"
+FOLDER_HEADER = "X-Cefr-Audio-Folder"   # hash of the folder: lets a sibling process recognise the server
+
+
+stats = {"published": 0, "pruned": 0, "pruned_bytes": 0}
+_stats_lock = threading.Lock()
+_since_prune = {}   # folder -> clips written since its size was last checked
+
+
+def publish(data, folder=STATIC_DIR, max_bytes=MAX_BYTES):
+    """Store ``data`` under its content hash (once) and return the hash."""
+    digest = hashlib.sha256(data).hexdigest()
+    path = os.path.join(folder, digest + ".mp3")
+    try:
+        os.utime(path)   # Already published: now the most recently used clip
+        return digest
+    except FileNotFoundError:
+        pass
+    os.makedirs(folder, exist_ok=True)
+    # Readers never see a partial clip: write aside, then rename
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    with _stats_lock:
+        stats["published"] += 1
+        written = _since_prune.get(folder, PRUNE_EVERY - 1) + 1   # the first clip checks a folder left by a restart
+        _since_prune[folder] = 0 if written >= PRUNE_EVERY else written
+    if max_bytes and written >= PRUNE_EVERY:
+        prune(folder, max_bytes)
+    return digest
+
+
+def prune(folder, max_bytes):
+    """Delete the least recently used clips until ``folder`` holds at most ``max_bytes``; return how many."""
+    clips = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.endswith(".mp3"):
+                try:
+                    info = entry.stat()
+                except FileNotFoundError:
+                    continue   # pruned by a sibling process
+                clips.append((info.st_mtime, info.st_size, entry.path))
+    total = sum(size for _, size, _ in clips)
+    removed = removed_bytes = 0
+    for _, size, path in sorted(clips):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            removed, removed_bytes = removed + 1, removed_bytes + size
+        except FileNotFoundError:
+            pass
+        total -= size
+    with _stats_lock:
+        stats["pruned"] += removed
+        stats["pruned_bytes"] += removed_bytes
+    return removed
+
+
+def parse_range(header, size):
+    """``(start, end)`` of a single ``bytes=`` range, or None to send the whole clip.
+
+    Raises ``ValueError`` when the range is not satisfiable (``416``).
+    Multiple ranges and malformed headers are ignored, as RFC 9110 allows.
+    """
+    match = BYTE_RANGE.fullmatch(header.strip())
+    first, last = match.groups() if match else ("", "")
+    if not (first or last) or (first and last and int(last) < int(first)):
+        return None
+    if not first:   # bytes=-500: the last 500 bytes
+        if int(last) == 0 or size == 0:
+            raise ValueError(f"empty range {header!r}")
+        return max(0, size - int(last)), size - 1
+    start, end = int(first), int(last) if last else size - 1
+    if start >= size:
+        raise ValueError(f"range {header!r} outside {size} bytes")
+    return start, min(end, size - 1)
+
+
+class _ClipHandler:
+    """Request handling, mixed into ``BaseHTTPRequestHandler`` when the server starts."""
+
+    protocol_version = "HTTP/1.1"   # keep-alive: a page's clips share one connection
+    server_version = "cefr-audio"
+
+    def do_GET(self):
+        self._serve(body=True)
+
+    def do_HEAD(self):
+        self._serve(body=False)
+
+    def log_message(self, format, *args):
+        pass   # one line per clip would drown the Streamlit log
+
+    def _finish(self, status, headers=(), data=b"", body=True, count=None):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if body and data:
+            self.wfile.write(data)
+        self.server.owner.count(count or str(status), len(data) if body else 0)
+
+    def _serve(self, body):
+        owner = self.server.owner
+        path = urlsplit(self.path).path
+        if path == PING_PATH:
+            return self._finish(200, [(FOLDER_HEADER, owner.folder_id)], body=body, count="ping")
+        match = CLIP_PATH.fullmatch(path)
+        data = None
+        if match:
+            try:
+                with open(os.path.join(owner.folder, match.group(1) + ".mp3"), "rb") as f:
+                    data = f.read()
+            except OSError:
+                pass
+        if data is None:
+            return self._finish(404, body=body, count="not_found")
+
+        etag = f'"{match.group(1)}"'
+        headers = [("ETag", etag), ("Cache-Control", f"public, max-age={MAX_AGE}, immutable"),
+                   ("Accept-Ranges", "bytes"), ("Access-Control-Allow-Origin", "*")]
+        if {etag, "*"} & {tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")}:
+            return self._finish(304, headers, body=body, count="not_modified")
+
+        headers.append(("Content-Type", "audio/mpeg"))
+        requested = self.headers.get("Range")
+        if requested and self.headers.get("If-Range", etag) == etag:
+            try:
+                span = parse_range(requested, len(data))
+            except ValueError:
+                return self._finish(416, headers + [("Content-Range", f"bytes */{len(data)}")], body=body,
+                                    count="bad_range")
+            if span is not None:
+                start, end = span
+                headers.append(("Content-Range", f"bytes {start}-{end}/{len(data)}"))
+                return self._finish(206, headers, data[start:end + 1], body=body, count="partial")
+        self._finish(200, headers, data, body=body, count="ok")
+
+
+class AudioServer:
+    """Serves the published clips over HTTP from a daemon thread, or uses a sibling's server."""
+
+    def __init__(self, host=HOST, port=PORT, folder=STATIC_DIR, public_url=PUBLIC_URL, max_bytes=MAX_BYTES):
+        self.host = host
+        self.folder = os.path.realpath(folder)
+        self.max_bytes = max_bytes
+        self.folder_id = hashlib.sha256(self.folder.encode()).hexdigest()[:16]
+        self.public_url = public_url
+        self.stats = {"ok": 0, "partial": 0, "not_modified": 0, "not_found": 0, "bad_range": 0, "bytes_sent": 0}
+        self._stats_lock = threading.Lock()
+        self.serving = self.shared = False
+        self.port = port
+        self._httpd = None
+        if not port:
+            return
+        # http.server is imported only here: pages pay for it once audio is shown
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        os.makedirs(self.folder, exist_ok=True)
+        handler = type("AudioHandler", (_ClipHandler, BaseHTTPRequestHandler), {})
+        try:
+            self._httpd = ThreadingHTTPServer((host, port), handler)
+        except OSError:
+            self.shared = self._sibling_serves(host, port)
+            return
+        self._httpd.daemon_threads = True
+        self._httpd.owner = self
+        threading.Thread(target=self._httpd.serve_forever, name="audio-server", daemon=True).start()
+        self.serving = True
+
+    def _sibling_serves(self, host, port):
+        """True if the process holding the port serves this folder (another worker of this app)."""
+        import urllib.request
+
+        host = "127.0.0.1" if host in ("", "0.0.0.0") else host
+        try:
+            with urllib.request.urlopen(f"http://{host}:{port}{PING_PATH}", timeout=1) as response:
+                return response.headers.get(FOLDER_HEADER) == self.folder_id
+        except (OSError, ValueError):
+            return False
+
+    def count(self, outcome, sent):
+        with self._stats_lock:
+            if outcome in self.stats:
+                self.stats[outcome] += 1
+            self.stats["bytes_sent"] += sent
+
+    def base_url(self, browser_host=None):
+        """URL prefix the browser can use, or None (then pages pass bytes)."""
+        if not (self.serving or self.shared):
+            return None
+        if self.public_url:
+            return self.public_url
+        hostname = _local_hostname(browser_host)
+        return f"http://{hostname}:{self.port}" if hostname else None
+
+    def url(self, data, browser_host=None):
+        """Publish ``data`` and return its URL, or None when browsers cannot reach the server."""
+        base = self.base_url(browser_host)
+        return None if base is None else f"{base}/audio/{publish(data, self.folder, self.max_bytes)}.mp3"
+
+    def close(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self.serving = False
+
+    def snapshot(self):
+        with self._stats_lock:
+            served = dict(self.stats)
+        with _stats_lock:
+            folder = dict(stats)
+        return dict(served, **folder, serving=int(self.serving), shared=int(self.shared), port=self.port)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_audio_server():
+    """Return the audio server of this process, started on first use."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = AudioServer()
+    return _shared
+
+
+def _local_hostname(browser_host):
+    """The host name if the browser opened the app on this machine, else None."""
+    hostname = urlsplit("//" + browser_host).hostname if browser_host else None
+    return hostname if hostname in LOCAL_HOSTS else None
+
+
+def _browser_host():
+    """``Host`` the browser used to open the running page, or None outside a script run."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+    import streamlit as st
+
+    return st.context.headers.get("Host")
+
+
+def audio_source(data):
+    """What to pass to ``st.audio``: a cacheable URL for ``data``, or ``data`` itself."""
+    if not PORT:
+        return data
+    browser_host = _browser_host()
+    if not (PUBLIC_URL or _local_hostname(browser_host)):
+        return data   # No browser could reach the server: do not start it
+    try:
+        url = get_audio_server().url(data, browser_host)
+    except OSError:
+        url = None   # folder not writable: serve inline
+    return url or data
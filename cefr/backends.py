@@ -0,0 +1,360 @@
+"""Text-to-speech backends with latency tracking, circuit breaking and routing.
+
+Two engines are available:
+
+* ``gtts``   -- Google Translate TTS over HTTPS (best voice, network latency)
+* ``espeak`` -- local espeak-ng/espeak, encoded to MP3 with lame or ffmpeg;
+  only available when those programs are installed
+
+The ``Router`` tries backends in preference order, but a backend whose recent
+(EWMA) latency is above ``CEFR_TTS_SLOW_SECONDS`` is moved behind the healthy
+ones, and each backend has a circuit breaker that opens after
+``CEFR_TTS_BREAKER_FAILURES`` consecutive slow or failed calls and lets one
+probe call through after ``CEFR_TTS_BREAKER_COOLDOWN`` seconds.
+
+Both engines can also speak many texts in one request (``synthesize_many``).
+gTTS answers with one clip per text (every part of its answer is tagged with
+the request it belongs to); espeak speaks one MP3 with ``BULK_PAUSE`` seconds
+of silence between the texts, which ``cefr.tts`` cuts back into clips. Bulk
+calls are timed separately and do not feed the breakers; a failed bulk call
+is retried text by text.
+
+Calls to a ``remote`` backend first take a token from the router's
+``limiter`` (see ``cefr.limiter``), if it has one; the wait is not counted
+as backend latency.
+"""
+
+import base64
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from io import BytesIO
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from cefr.config import env_int
+
+SLOW_SECONDS = env_int("CEFR_TTS_SLOW_SECONDS", 5)
+BREAKER_FAILURES = env_int("CEFR_TTS_BREAKER_FAILURES", 3)
+BREAKER_COOLDOWN = env_int("CEFR_TTS_BREAKER_COOLDOWN", 60)
+EWMA_WEIGHT = 0.3
+BULK_PAUSE = 0.8   # seconds of silence between texts in a bulk request
+
+
+class BackendUnavailable(RuntimeError):
+    """Raised when no backend can take a request."""
+
+
+class LatencyStats:
+    """Per-backend call counters and latency (EWMA and recent percentiles)."""
+
+    def __init__(self, window=256):
+        self.calls = 0
+        self.failures = 0
+        self.slow = 0
+        self.ewma = None
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok=True, slow=False):
+        with self._lock:
+            self.calls += 1
+            self.failures += not ok
+            self.slow += slow
+            self.recent.append(seconds)
+            self.ewma = seconds if self.ewma is None else EWMA_WEIGHT * seconds + (1 - EWMA_WEIGHT) * self.ewma
+
+    def snapshot(self):
+        with self._lock:
+            recent = sorted(self.recent)
+            ewma = self.ewma
+
+        def percentile(q):
+            return round(recent[min(len(recent) - 1, int(q * len(recent)))] * 1000, 1) if recent else 0.0
+
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "slow": self.slow,
+            "ewma_ms": round(ewma * 1000, 1) if ewma is not None else 0.0,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+        }
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive bad calls; probes after ``cooldown``."""
+
+    def __init__(self, threshold=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.consecutive = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.clock() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self):
+        """True if a call may go to the backend now."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.clock() - self.opened_at >= self.cooldown:
+                self.opened_at = self.clock()   # one probe per cooldown period
+                return True
+            return False
+
+    def record(self, ok):
+        with self._lock:
+            if ok:
+                self.consecutive = 0
+                self.opened_at = None
+            else:
+                self.consecutive += 1
+                if self.consecutive >= self.threshold:
+                    self.opened_at = self.clock()
+
+
+class Backend:
+    """One TTS engine; ``synthesize`` returns MP3 bytes."""
+
+    name = ""
+    remote = False   # calls go over the network and are rate limited
+
+    def available(self):
+        return True
+
+    def synthesize(self, text, lang="en", timeout=None):
+        raise NotImplementedError
+
+    def synthesize_many(self, texts, lang="en", timeout=None, pause=BULK_PAUSE):
+        """Speak ``texts`` in one request.
+
+        Returns a list with one MP3 per text, or one MP3 of all the texts
+        ``pause`` seconds apart (the caller cuts it at the pauses).
+        """
+        raise BackendUnavailable(f"{self.name} has no bulk synthesis")
+
+
+class GTTSBackend(Backend):
+    name = "gtts"
+    remote = True
+
+    def synthesize(self, text, lang="en", timeout=None):
+        from gtts import gTTS
+
+        tts = gTTS(text=text, lang=lang, timeout=timeout)
+        audio_file = BytesIO()
+        tts.write_to_fp(audio_file)
+        return audio_file.getvalue()
+
+    @staticmethod
+    def _internals():
+        """gTTS's request builder, or BackendUnavailable if this gTTS version does not have it.
+
+        Bulk requests reuse private gTTS internals (tested with gTTS 2.5); when
+        they are missing the caller synthesizes text by text through ``gTTS``.
+        """
+        try:
+            from gtts import gTTS
+            from gtts.utils import _translate_url
+        except ImportError as e:
+            raise BackendUnavailable(f"gTTS bulk synthesis unavailable: {e}") from None
+        missing = [name for name in ("_tokenize", "GOOGLE_TTS_RPC", "GOOGLE_TTS_HEADERS") if not hasattr(gTTS, name)]
+        if missing:
+            raise BackendUnavailable(f"gTTS bulk synthesis unavailable: gTTS has no {', '.join(missing)}")
+        return gTTS, _translate_url
+
+    def synthesize_many(self, texts, lang="en", timeout=None, pause=BULK_PAUSE):
+        """One batchexecute POST carrying one RPC per text part (gTTS sends one POST per part).
+
+        The parts come back tagged with their RPC id; each text's parts are
+        joined, as ``gTTS.write_to_fp`` does, into one clip per text.
+        """
+        import requests
+
+        gTTS, _translate_url = self._internals()
+        tts = gTTS(text=texts[0], lang=lang, timeout=timeout)
+        rpcs, owners = [], []   # owners[i]: index of the text RPC i speaks
+        for index, text in enumerate(texts):
+            for part in tts._tokenize(text):
+                parameters = json.dumps([part, tts.lang, tts.speed, "null"], separators=(",", ":"))
+                rpcs.append([tts.GOOGLE_TTS_RPC, parameters, None, str(len(rpcs) + 1)])
+                owners.append(index)
+        body = "f.req={}&".format(quote(json.dumps([rpcs], separators=(",", ":"))))
+        url = _translate_url(tld=tts.tld, path="_/TranslateWebserverUi/data/batchexecute")
+        response = requests.post(url, data=body, headers=tts.GOOGLE_TTS_HEADERS, timeout=timeout)
+        response.raise_for_status()
+
+        audio = {}
+        for line in response.text.splitlines():
+            if tts.GOOGLE_TTS_RPC not in line:
+                continue
+            for item in json.loads(line):
+                if item[:2] == ["wrb.fr", tts.GOOGLE_TTS_RPC] and item[2]:
+                    audio[item[-1]] = base64.b64decode(json.loads(item[2])[0])
+        if len(audio) != len(rpcs):
+            raise RuntimeError(f"gTTS answered {len(audio)} of {len(rpcs)} parts")
+
+        clips = [[] for _ in texts]
+        for i, owner in enumerate(owners):
+            clips[owner].append(audio[str(i + 1)])
+        return [b"".join(parts) for parts in clips]
+
+
+class EspeakBackend(Backend):
+    """Local espeak-ng (or espeak) piped through lame or ffmpeg for MP3 output."""
+
+    name = "espeak"
+    VOICES = {"en": "en-us"}
+
+    def __init__(self, speed=150):
+        self.speed = speed
+        self.speaker = shutil.which("espeak-ng") or shutil.which("espeak")
+        self.lame = shutil.which("lame")
+        self.ffmpeg = shutil.which("ffmpeg")
+
+    def available(self):
+        return bool(self.speaker and (self.lame or self.ffmpeg))
+
+    def _encoder(self):
+        if self.lame:
+            return [self.lame, "--quiet", "-m", "m", "-b", "32", "-", "-"]
+        return [self.ffmpeg, "-loglevel", "error", "-i", "pipe:0", "-ac", "1", "-ar", "24000",
+                "-b:a", "32k", "-f", "mp3", "pipe:1"]
+
+    def _speak(self, text, lang, timeout, ssml=False):
+        if not self.available():
+            raise BackendUnavailable("espeak and lame/ffmpeg are not installed")
+        voice = self.VOICES.get(lang, lang)
+        wav = subprocess.run([self.speaker, *(["-m"] if ssml else []), "-v", voice, "-s", str(self.speed),
+                              "--stdout", text], capture_output=True, check=True, timeout=timeout).stdout
+        return subprocess.run(self._encoder(), input=wav, capture_output=True, check=True, timeout=timeout).stdout
+
+    def synthesize(self, text, lang="en", timeout=None):
+        return self._speak(text, lang, timeout)
+
+    def synthesize_many(self, texts, lang="en", timeout=None, pause=BULK_PAUSE):
+        """One espeak run over SSML with a ``<break>`` between the texts."""
+        separator = f'<break time="{int(pause * 1000)}ms"/>'
+        return self._speak("<speak>" + separator.join(escape(text) for text in texts) + "</speak>", lang, timeout, ssml=True)
+
+
+BACKENDS = {backend.name: backend for backend in (GTTSBackend, EspeakBackend)}
+
+
+class Router:
+    """Routes synthesis requests across backends by health and latency."""
+
+    def __init__(self, backends, slow_seconds=SLOW_SECONDS, breaker=CircuitBreaker, limiter=None):
+        self.backends = list(backends)
+        self.slow_seconds = slow_seconds
+        self.limiter = limiter
+        self.stats = {backend.name: LatencyStats() for backend in self.backends}
+        self.bulk_stats = {backend.name: LatencyStats() for backend in self.backends}
+        self.breakers = {backend.name: breaker() for backend in self.backends}
+
+    @property
+    def primary(self):
+        return self.backends[0].name
+
+    def candidates(self):
+        """Available backends with a closed (or probing) breaker, best first."""
+        ranked = []
+        for position, backend in enumerate(self.backends):
+            if not backend.available():
+                continue
+            ewma = self.stats[backend.name].ewma
+            ranked.append(((ewma or 0) > self.slow_seconds, position, backend))
+        return [backend for _, _, backend in sorted(ranked, key=lambda r: r[:2])]
+
+    def _admit(self, backend):
+        """Wait for the rate limiter before a request to a remote backend."""
+        if backend.remote and self.limiter is not None:
+            self.limiter.acquire()
+
+    def _call(self, backend, text, lang, timeout):
+        """Call one backend and record latency and breaker outcome."""
+        self._admit(backend)
+        start = time.perf_counter()
+        try:
+            data = backend.synthesize(text, lang, timeout=timeout)
+        except Exception:
+            self.stats[backend.name].record(time.perf_counter() - start, ok=False)
+            self.breakers[backend.name].record(ok=False)
+            raise
+        elapsed = time.perf_counter() - start
+        slow = elapsed > self.slow_seconds
+        self.stats[backend.name].record(elapsed, slow=slow)
+        self.breakers[backend.name].record(ok=not slow)
+        return data
+
+    def synthesize(self, text, lang="en", timeout=None, fallback=True):
+        """Return ``(engine_name, mp3_bytes)`` from the best backend that answers.
+
+        With ``fallback=False`` only the primary backend is used.
+        """
+        error, tried = None, False
+        for backend in self.candidates() if fallback else []:
+            if not self.breakers[backend.name].allow():
+                continue
+            tried = True
+            try:
+                return backend.name, self._call(backend, text, lang, timeout)
+            except Exception as e:
+                error = e
+        if not tried:
+            # Primary only, or every breaker is open: the primary is still the best bet
+            backend = self.backends[0]
+            return backend.name, self._call(backend, text, lang, timeout)
+        raise error or BackendUnavailable("no TTS backend is available")
+
+    def synthesize_many(self, texts, lang="en", timeout=None, fallback=True, pause=BULK_PAUSE):
+        """Return ``(engine_name, audio)`` speaking every text, from the best backend.
+
+        ``audio`` is what the backend's ``synthesize_many`` returned: one MP3
+        per text, or one MP3 to cut at the pauses.
+
+        Only the backend a single request would go to first is asked, and only
+        while its breaker is closed; raises when it cannot do bulk synthesis
+        or fails, and the caller then synthesizes text by text.
+        """
+        candidates = self.candidates() if fallback else self.backends[:1]
+        if not candidates or self.breakers[candidates[0].name].state != "closed":
+            raise BackendUnavailable("no healthy backend for bulk synthesis")   # probes go text by text
+        backend = candidates[0]
+        self._admit(backend)
+        start = time.perf_counter()
+        try:
+            data = backend.synthesize_many(texts, lang, timeout=timeout, pause=pause)
+        except BackendUnavailable:
+            raise
+        except Exception:
+            self.bulk_stats[backend.name].record(time.perf_counter() - start, ok=False)
+            raise
+        self.bulk_stats[backend.name].record(time.perf_counter() - start)
+        return backend.name, data
+
+    def snapshot(self):
+        """Per-backend availability, breaker state and latency metrics (``bulk``: bulk calls)."""
+        return {
+            backend.name: dict(self.stats[backend.name].snapshot(), available=backend.available(),
+                               breaker=self.breakers[backend.name].state,
+                               bulk=self.bulk_stats[backend.name].snapshot())
+            for backend in self.backends
+        }
+
+
+def default_backends():
+    """Backends named in ``CEFR_TTS_BACKENDS`` (default ``gtts,espeak``), in order."""
+    names = os.environ.get("CEFR_TTS_BACKENDS", "gtts,espeak")
+    return [BACKENDS[name.strip()]() for name in names.split(",") if name.strip()]
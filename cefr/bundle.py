@@ -0,0 +1,253 @@
+"""Pre-built audio bundle for every word and context sentence.
+
+The word and sentence inventory is fixed, so every clip can be synthesized
+once, offline, into a single packed file::
+
+    data/audio_bundle/clips.bin       concatenated MP3 clips
+    data/audio_bundle/manifest.json   {key: [offset, length]} + source hashes
+
+Clips are processed (``cefr.audio_process``) like live ones and keyed the same
+way, so a bundle built with other processing settings simply misses. The
+manifest records the processing variant, and loading or checking a bundle
+whose variant differs from ``CEFR_AUDIO_PROCESS`` logs a warning.
+
+At runtime ``clips.bin`` is memory-mapped and a lookup is a slice of the
+mapping, so no network call (and no read syscall) is needed. Text missing from
+the bundle falls back to live TTS.
+
+Build or refresh the bundle with::
+
+    python -m cefr.bundle build     # synthesize missing clips, drop stale ones
+    python -m cefr.bundle check     # report stale/missing entries, exit 1 if any
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import sys
+import threading
+import time
+
+from cefr.config import DATA_DIR
+from cefr.datasets import dataset_path, load_dataset
+
+BUNDLE_DIR = os.environ.get("CEFR_AUDIO_BUNDLE", str(DATA_DIR / "audio_bundle"))
+MANIFEST_VERSION = 1
+
+# Datasets whose text is bundled, and which columns are spoken
+WORD_DATASETS = ["b2_words", "c1_words"]
+CONTEXT_DATASETS = ["b2_wic", "c1_wic"]
+
+_log = logging.getLogger(__name__)
+
+
+def _file_sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def source_hashes():
+    """Return ``{file name: sha256}`` for every bundled source file."""
+    return {path.name: _file_sha256(path) for path in map(dataset_path, WORD_DATASETS + CONTEXT_DATASETS)}
+
+
+def bundle_texts():
+    """Return every text the pages speak, in a stable order without duplicates."""
+    texts = []
+    for name in WORD_DATASETS:
+        df = load_dataset(name)
+        for sid, word in zip(df["SID"], df["WORD"]):
+            texts.append(word)                        # Listen & Spell
+            texts.append(f"Number {sid}, {word}")     # Listening wordlist
+    for name in CONTEXT_DATASETS:
+        texts.extend(load_dataset(name)["Context"].dropna())  # WIC pages
+    return list(dict.fromkeys(texts))
+
+
+class AudioBundle:
+    """Read-only, memory-mapped view of a built bundle."""
+
+    def __init__(self, directory=BUNDLE_DIR):
+        with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.directory = directory
+        self.entries = self.manifest["entries"]
+        self.engine = self.manifest["engine"]
+        self.processing = self.manifest.get("processing", "")
+        self._file = open(os.path.join(directory, "clips.bin"), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._view = memoryview(self._map)
+
+    def get(self, key):
+        """Return a zero-copy ``memoryview`` of the clip, or None."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        offset, length = entry
+        return self._view[offset:offset + length]
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stale_sources(self):
+        """Return the source files that changed since the bundle was built."""
+        built = self.manifest.get("sources", {})
+        return sorted(name for name, digest in source_hashes().items() if built.get(name) != digest)
+
+    def warn_processing(self):
+        """Log a warning (and return True) if the clips were processed unlike live ones."""
+        from cefr.audio_process import MODE, VARIANT
+
+        if self.processing == VARIANT:
+            return False
+        _log.warning("audio bundle %s was built with processing %r, but CEFR_AUDIO_PROCESS=%s uses %r: "
+                     "its clips will not be found; rebuild it with `python -m cefr.bundle build`",
+                     self.directory, self.processing, MODE, VARIANT)
+        return True
+
+
+RETRY_SECONDS = 60
+
+_shared = None
+_checked_at = 0.0
+_shared_lock = threading.Lock()
+
+
+def get_bundle():
+    """Return the process-wide bundle, or None when none has been built.
+
+    A missing bundle is looked for again at most every ``RETRY_SECONDS`` so a
+    freshly built one is picked up without restarting the server.
+    """
+    global _shared, _checked_at
+    if _shared is None and time.monotonic() - _checked_at > RETRY_SECONDS:
+        with _shared_lock:
+            if _shared is None:
+                _checked_at = time.monotonic()
+                try:
+                    _shared = AudioBundle()
+                except (OSError, ValueError, KeyError):
+                    pass  # No (valid) bundle: pages use live TTS only
+                else:
+                    _shared.warn_processing()
+    return _shared
+
+
+def reload_bundle():
+    """Forget the loaded bundle so the next lookup opens the current files."""
+    global _shared, _checked_at
+    with _shared_lock:
+        _shared, _checked_at = None, 0.0
+
+
+def check(directory=BUNDLE_DIR, lang="en"):
+    """Compare the bundle against the current data files.
+
+    Returns ``(stale_sources, missing_texts, unused_keys)``.
+    """
+    from cefr.tts import audio_key_for
+
+    bundle = AudioBundle(directory)
+    bundle.warn_processing()  # Then every text is missing: say why
+    wanted = {audio_key_for(text, lang): text for text in bundle_texts()}
+    missing = [text for key, text in wanted.items() if key not in bundle.entries]
+    unused = [key for key in bundle.entries if key not in wanted]
+    return bundle.stale_sources(), missing, unused
+
+
+def build(directory=BUNDLE_DIR, lang="en", log=print):
+    """Synthesize every bundled text once and write ``clips.bin`` + manifest.
+
+    Clips already present in an existing bundle are copied over instead of
+    synthesized again; entries whose text no longer exists are dropped.
+    """
+    from cefr.audio_process import VARIANT
+    from cefr.tts import ENGINE, audio_key_for, generate_audio_batch
+
+    texts = bundle_texts()
+    keys = [audio_key_for(text, lang) for text in texts]
+    try:
+        previous = AudioBundle(directory)
+    except (OSError, ValueError, KeyError):
+        previous = None
+
+    clips = [None] * len(texts)
+    todo = []
+    for i, key in enumerate(keys):
+        old = previous.get(key) if previous is not None and previous.engine == ENGINE else None
+        if old is not None:
+            clips[i] = bytes(old)
+        else:
+            todo.append(i)
+    log(f"{len(texts)} texts: {len(texts) - len(todo)} reused, {len(todo)} to synthesize")
+
+    failed = 0
+    for done, (j, audio, error) in enumerate(generate_audio_batch([texts[i] for i in todo], fallback=False), 1):
+        if error is not None:
+            failed += 1
+            log(f"  failed: {texts[todo[j]]!r}: {error}")
+        else:
+            clips[todo[j]] = audio
+        if done % 100 == 0:
+            log(f"  {done}/{len(todo)}")
+
+    os.makedirs(directory, exist_ok=True)
+    entries = {}
+    tmp_bin = os.path.join(directory, "clips.bin.tmp")
+    with open(tmp_bin, "wb") as f:
+        for key, clip in zip(keys, clips):
+            if clip is None or key in entries:
+                continue
+            entries[key] = [f.tell(), len(clip)]
+            f.write(clip)
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "engine": ENGINE,
+        "processing": VARIANT,
+        "lang": lang,
+        "sources": source_hashes(),
+        "entries": entries,
+    }
+    tmp_manifest = os.path.join(directory, "manifest.json.tmp")
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    previous = old = None  # Drop our views of the old mapping before replacing it
+    os.replace(tmp_bin, os.path.join(directory, "clips.bin"))
+    os.replace(tmp_manifest, os.path.join(directory, "manifest.json"))
+    if os.path.abspath(directory) == os.path.abspath(BUNDLE_DIR):
+        reload_bundle()
+    log(f"Wrote {len(entries)} clips to {directory} ({failed} failed)")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cefr.bundle", description=__doc__.split("\n")[0])
+    parser.add_argument("command", choices=["build", "check"])
+    parser.add_argument("--dir", default=BUNDLE_DIR, help="bundle folder (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        return 1 if build(args.dir) else 0
+
+    try:
+        stale, missing, unused = check(args.dir)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"No usable bundle in {args.dir}: {e}")
+        return 1
+    print(f"Changed sources: {', '.join(stale) or 'none'}")
+    print(f"Missing texts: {len(missing)}")
+    for text in missing[:20]:
+        print(f"  {text}")
+    print(f"Unused clips: {len(unused)}")
+    return 1 if stale or missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""Cloze (fill-in-the-blank) masking for the WIC quiz pages.
+
+The quiz pages used to build ``re.sub(rf'\\b{word}\\b', ...)`` for every
+sentence on every generation, and only the bare headword was hidden, so
+"The sponge absorbs water" gave the answer away. Here every sentence of a
+dataset is masked once, at load time, by one precompiled token scanner that
+checks each token against the inflected forms of that row's headword. The
+result is stored as two extra columns:
+
+* ``Masked``   -- the sentence with every form of the headword replaced by BLANK
+* ``BlankPos`` -- character offset of the first blank in ``Masked`` (-1: not found)
+"""
+
+import re
+from functools import lru_cache
+
+BLANK = "_______"
+
+# Words, keeping hyphenated compounds ("full-time") together
+_TOKEN = re.compile(r"[A-Za-z]+(?:-[A-Za-z]+)*")
+_VOWELS = set("aeiou")
+
+# Irregular forms of verbs that occur in the wordlists (base -> other forms)
+IRREGULAR = {
+    "arise": ["arose", "arisen"], "bear": ["bore", "borne", "born"], "beat": ["beaten"],
+    "bend": ["bent"], "bet": [], "bind": ["bound"], "bite": ["bit", "bitten"],
+    "bleed": ["bled"], "blow": ["blew", "blown"], "breed": ["bred"], "cling": ["clung"],
+    "creep": ["crept"], "deal": ["dealt"], "dig": ["dug"], "draw": ["drew", "drawn"],
+    "feed": ["fed"], "flee": ["fled"], "fling": ["flung"], "forbid": ["forbade", "forbidden"],
+    "forecast": [], "forgive": ["forgave", "forgiven"], "freeze": ["froze", "frozen"],
+    "grind": ["ground"], "hang": ["hung"], "hide": ["hid", "hidden"], "kneel": ["knelt"],
+    "lay": ["laid"], "lead": ["led"], "lean": ["leant"], "leap": ["leapt"], "lend": ["lent"],
+    "mislead": ["misled"], "overcome": ["overcame"], "overlook": [], "oversee": ["oversaw", "overseen"],
+    "overtake": ["overtook", "overtaken"], "overthrow": ["overthrew", "overthrown"],
+    "seek": ["sought"], "sew": ["sewn"], "shake": ["shook", "shaken"], "shed": [],
+    "shoot": ["shot"], "shrink": ["shrank", "shrunk"], "sink": ["sank", "sunk"],
+    "slide": ["slid"], "sow": ["sown"], "spin": ["spun"], "spit": ["spat"], "split": [],
+    "spread": [], "spring": ["sprang", "sprung"], "steal": ["stole", "stolen"],
+    "stick": ["stuck"], "sting": ["stung"], "stink": ["stank", "stunk"], "strike": ["struck"],
+    "strive": ["strove", "striven"], "swear": ["swore", "sworn"], "sweep": ["swept"],
+    "swell": ["swollen"], "swing": ["swung"], "tear": ["tore", "torn"], "thrive": ["throve"],
+    "tread": ["trod", "trodden"], "undergo": ["underwent", "undergone"],
+    "undertake": ["undertook", "undertaken"], "uphold": ["upheld"], "weave": ["wove", "woven"],
+    "weep": ["wept"], "withdraw": ["withdrew", "withdrawn"], "withstand": ["withstood"],
+    "wind": ["wound"], "wring": ["wrung"],
+}
+
+
+def _spelling_variants(word):
+    """US/UK spelling variants (harbor/harbour, litre/liter, organize/organise)."""
+    variants = {word}
+    if "our" in word:
+        variants.add(word.replace("our", "or"))
+    elif "or" in word:
+        variants.add(word.replace("or", "our"))
+    if word.endswith("re"):
+        variants.add(word[:-2] + "er")
+    elif word.endswith("er"):
+        variants.add(word[:-2] + "re")
+    for us, uk in (("ize", "ise"), ("yze", "yse"), ("ization", "isation"), ("sk", "sc")):
+        if us in word:
+            variants.add(word.replace(us, uk))
+    if word.endswith("ll"):
+        variants.add(word[:-1])                       # enroll -> enrol
+    for suffix in ("lor", "ling", "led", "ler"):
+        if word.endswith(suffix) and not word.endswith("l" + suffix):
+            variants.add(word[:-len(suffix)] + "l" + suffix)  # counselor -> counsellor
+    return variants
+
+
+def _regular_forms(stem):
+    forms = {stem, stem + "s", stem + "es", stem + "ed", stem + "ing", stem + "er", stem + "est"}
+    if stem.endswith("e"):
+        forms |= {stem + "d", stem + "r", stem + "st", stem[:-1] + "ing"}
+    if stem.endswith("y") and len(stem) > 2 and stem[-2] not in _VOWELS:
+        forms |= {stem[:-1] + suffix for suffix in ("ies", "ied", "ier", "iest")}
+    if stem.endswith("ic"):
+        forms |= {stem + "ked", stem + "king"}
+    # Consonant doubling: plan -> planned, equip -> equipped, travel -> travelled
+    if len(stem) >= 3 and stem[-1] not in _VOWELS | set("wxy") and stem[-2] in _VOWELS and (
+            stem[-3] not in _VOWELS or stem[-4:-2] == "qu"):
+        forms |= {stem + stem[-1] + suffix for suffix in ("ed", "ing", "er", "est")}
+    return forms
+
+
+@lru_cache(maxsize=None)
+def inflections(headword):
+    """Return the lowercase forms of ``headword`` that should be blanked."""
+    base = headword.strip().lower().rstrip("0123456789")  # "bass1", "bow1"
+    forms = set()
+    for stem in _spelling_variants(base):
+        forms |= _regular_forms(stem)
+        for irregular in IRREGULAR.get(stem, ()):
+            forms.add(irregular)
+    return frozenset(forms)
+
+
+def mask_sentence(sentence, headword):
+    """Return ``(masked_sentence, blank_position)`` for one sentence."""
+    forms = inflections(headword)
+    parts, last, first_blank = [], 0, -1
+    for match in _TOKEN.finditer(sentence):
+        token = match.group().lower()
+        if token in forms:
+            spans = [(match.start(), match.end())]
+        elif "-" in token:
+            # A plain headword inside a compound: "term" in "long-term"
+            spans, start = [], match.start()
+            for piece in token.split("-"):
+                if piece in forms:
+                    spans.append((start, start + len(piece)))
+                start += len(piece) + 1
+        else:
+            continue
+        for start, end in spans:
+            parts.append(sentence[last:start])
+            if first_blank < 0:
+                first_blank = sum(map(len, parts))
+            parts.append(BLANK)
+            last = end
+    if first_blank < 0:
+        return sentence, -1
+    parts.append(sentence[last:])
+    return "".join(parts), first_blank
+
+
+def add_cloze_columns(df, word_column="WORD", sentence_column="Context"):
+    """Return ``df`` with ``Masked`` and ``BlankPos`` computed for every row."""
+    masked = [mask_sentence(str(sentence), str(word)) for word, sentence in zip(df[word_column], df[sentence_column])]
+    df = df.copy()
+    df["Masked"] = [sentence for sentence, _ in masked]
+    df["BlankPos"] = [position for _, position in masked]
+    df["BlankPos"] = df["BlankPos"].astype("int32")
+    return df
@@ -0,0 +1,267 @@
+"""Compiled, typed, column-oriented copies of the datasets in ``data/``.
+
+``python -m cefr.columnar compile`` runs the CSV/TSV cleanup from
+``cefr.datasets`` once and writes ``data/compiled/<name>.col``. Loading such a
+file is an ``mmap`` plus a few ``numpy.frombuffer`` views: no parsing, no
+regex over SID, no WORD splitting. WIC tables also carry the precomputed
+cloze columns (``Masked``, ``BlankPos``; see ``cefr.cloze``).
+
+The compiled files double as a shared dataset segment for running several
+Streamlit processes: string columns are handed to pandas as Arrow arrays over
+the mapping, so every worker reads the same page-cache copy of the text instead
+of decoding its own (``CEFR_DATA_SHARED=0`` decodes per process, as before).
+A dataset whose compiled copy is missing or stale (e.g. after
+``python -m cefr.datasets sync``) is compiled into ``.cefr/compiled`` by the
+first process that loads it; the others attach to that file.
+
+File layout (little endian, every block 8-byte aligned)::
+
+    b"CEFRCOL1" | uint32 header length | JSON header | column blocks
+
+Column kinds:
+
+* ``int32``    -- ``rows`` int32 values (SID, BlankPos)
+* ``category`` -- ``rows`` int16 codes; labels are listed in the header
+* ``string``   -- ``rows + 1`` uint32 byte offsets, then the UTF-8 blob
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+from cefr.config import DATA_DIR, STATE_DIR
+from cefr.datasets import CATEGORY_COLUMNS, DATASETS
+
+MAGIC = b"CEFRCOL1"
+COMPILED_DIR = DATA_DIR / "compiled"
+# Written at runtime for datasets whose shipped compiled copy is missing or stale
+PUBLISHED_DIR = STATE_DIR / "compiled"
+SHARED = os.environ.get("CEFR_DATA_SHARED", "1") != "0"
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def _sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _cloze_sha256():
+    """Hash of the masking code: compiled cloze columns go stale when it changes."""
+    from cefr import cloze
+
+    return _sha256(cloze.__file__)
+
+
+def write_table(path, df, source_sha256="", cloze_sha256=""):
+    """Write a normalized DataFrame in the compiled column format."""
+    import numpy as np
+
+    blocks = []   # (column header dict, [bytes, ...])
+    for name in df.columns:
+        if df[name].dtype == "int32":
+            blocks.append(({"name": name, "kind": "int32"}, [df[name].to_numpy(dtype="<i4").tobytes()]))
+        elif name in CATEGORY_COLUMNS:
+            values = df[name].astype(str)
+            categories = sorted(set(values))
+            lookup = {label: code for code, label in enumerate(categories)}
+            codes = np.fromiter((lookup[v] for v in values), dtype="<i2", count=len(values))
+            blocks.append(({"name": name, "kind": "category", "categories": categories}, [codes.tobytes()]))
+        else:
+            encoded = [v.encode("utf-8") for v in df[name].fillna("").astype(str)]
+            offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+            np.cumsum([len(v) for v in encoded], out=offsets[1:])
+            blocks.append(({"name": name, "kind": "string"}, [offsets.tobytes(), b"".join(encoded)]))
+
+    # Lay out the blocks first so the header can record absolute offsets
+    header = {"rows": len(df), "source_sha256": source_sha256, "columns": []}
+    if cloze_sha256:
+        header["cloze_sha256"] = cloze_sha256
+    for column, parts in blocks:
+        column["parts"] = [len(part) for part in parts]
+        header["columns"].append(column)
+    header_size = len(json.dumps(header).encode("utf-8")) + 64 * len(blocks) + 64
+    position = _align(len(MAGIC) + 4 + header_size)
+    for column, parts in blocks:
+        column["offsets"] = []
+        for part in parts:
+            column["offsets"].append(position)
+            position = _align(position + len(part))
+    header_bytes = json.dumps(header).encode("utf-8").ljust(header_size)
+
+    tmp = f"{path}.{os.getpid()}.tmp"   # several workers may publish at once
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+        for column, parts in blocks:
+            for offset, part in zip(column["offsets"], parts):
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(part)
+    os.replace(tmp, path)
+
+
+class Table:
+    """Memory-mapped compiled table; columns are zero-copy numpy views."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a compiled CEFR table")
+        (size,) = struct.unpack_from("<I", self._map, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(bytes(self._map[start:start + size]))
+        self.rows = self.header["rows"]
+        self.columns = {column["name"]: column for column in self.header["columns"]}
+
+    def _array(self, column, part, dtype, count):
+        import numpy as np
+
+        return np.frombuffer(self._map, dtype=dtype, count=count, offset=column["offsets"][part])
+
+    def int_column(self, name):
+        """Return an int32 column as a read-only view."""
+        return self._array(self.columns[name], 0, "<i4", self.rows)
+
+    def category_codes(self, name):
+        column = self.columns[name]
+        return self._array(column, 0, "<i2", self.rows), column["categories"]
+
+    def string_offsets(self, name):
+        """Return ``(offsets, blob)`` for a string column, both zero-copy."""
+        column = self.columns[name]
+        offsets = self._array(column, 0, "<u4", self.rows + 1)
+        blob = memoryview(self._map)[column["offsets"][1]:column["offsets"][1] + column["parts"][1]]
+        return offsets, blob
+
+    def string(self, name, row):
+        """Decode a single cell of a string column."""
+        offsets, blob = self.string_offsets(name)
+        return str(blob[offsets[row]:offsets[row + 1]], "utf-8")
+
+    def strings(self, name):
+        """Decode a whole string column to a list of ``str``."""
+        offsets, blob = self.string_offsets(name)
+        data = bytes(blob)
+        bounds = offsets.tolist()
+        return [data[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(self.rows)]
+
+    def string_array(self, name):
+        """Return a string column as a pandas ``string[pyarrow]`` array over the mapping (zero-copy).
+
+        ``pd.ArrowDtype`` wraps the Arrow array as it is on every pandas with
+        Arrow support; the ``str`` dtype is Arrow-backed only from pandas 3.
+        """
+        import pandas as pd
+        import pyarrow as pa
+
+        offsets, blob = self.string_offsets(name)
+        # Arrow's string layout is ours: int32 offsets (blobs stay far below 2 GiB) + UTF-8 data
+        array = pa.StringArray.from_buffers(self.rows, pa.py_buffer(offsets.view("<i4")), pa.py_buffer(blob))
+        return pd.array(array, dtype=pd.ArrowDtype(pa.string()))
+
+    def to_frame(self, shared=SHARED):
+        """Build a DataFrame (int32, categoricals, str) from the table.
+
+        With ``shared`` the string columns stay views of the mapping, so the
+        text is held once by the OS however many processes load the table.
+        """
+        import pandas as pd
+
+        data = {}
+        for name, column in self.columns.items():
+            if column["kind"] == "int32":
+                data[name] = self.int_column(name)
+            elif column["kind"] == "category":
+                codes, categories = self.category_codes(name)
+                data[name] = pd.Categorical.from_codes(codes, categories=categories)
+            elif shared:
+                data[name] = self.string_array(name)
+            else:
+                data[name] = self.strings(name)
+        return pd.DataFrame(data)
+
+
+def compiled_path(name):
+    return COMPILED_DIR / f"{name}.col"
+
+
+def published_path(name):
+    return PUBLISHED_DIR / f"{name}.col"
+
+
+def _open_fresh(path, source_sha256, cloze_sha256):
+    """Return the ``Table`` at ``path`` if it matches the source (and masking code)."""
+    if not path.exists():
+        return None
+    try:
+        table = Table(path)
+    except (OSError, ValueError):
+        return None
+    if table.header.get("source_sha256") != source_sha256:
+        return None  # data/ changed since the last compile
+    if cloze_sha256 and table.header.get("cloze_sha256") != cloze_sha256:
+        return None  # cefr.cloze changed: the Masked column is outdated
+    return table
+
+
+def load_compiled(name, source_path):
+    """Return the compiled DataFrame for ``name``, or None if missing/stale.
+
+    The shipped copy in ``data/compiled`` is tried first, then the one a
+    worker published into ``.cefr/compiled``.
+    """
+    source_sha256 = _sha256(source_path)
+    cloze_sha256 = _cloze_sha256() if DATASETS[name].cloze else ""
+    for path in (compiled_path(name), published_path(name)):
+        table = _open_fresh(path, source_sha256, cloze_sha256)
+        if table is not None:
+            return table.to_frame()
+    return None
+
+
+def publish(name, df, source_path):
+    """Compile a freshly parsed dataset into ``.cefr/compiled`` and attach to it.
+
+    Returns the DataFrame backed by the published file, so this process and
+    every later one share it; returns ``df`` unchanged if it cannot be written.
+    """
+    path = published_path(name)
+    try:
+        os.makedirs(PUBLISHED_DIR, exist_ok=True)
+        write_table(path, df, _sha256(source_path), _cloze_sha256() if DATASETS[name].cloze else "")
+        return Table(path).to_frame()
+    except OSError:
+        return df
+
+
+def compile_all(log=print):
+    """Compile every registered dataset into ``data/compiled``."""
+    from cefr.cloze import add_cloze_columns
+    from cefr.datasets import dataset_path, load_source
+
+    os.makedirs(COMPILED_DIR, exist_ok=True)
+    for name, spec in DATASETS.items():
+        df = load_source(name)
+        cloze_sha256 = ""
+        if spec.cloze:
+            df, cloze_sha256 = add_cloze_columns(df), _cloze_sha256()
+        write_table(compiled_path(name), df, _sha256(dataset_path(name)), cloze_sha256)
+        log(f"{name}: {len(df)} rows -> {compiled_path(name)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cefr.columnar", description="Compile the datasets in data/.")
+    parser.add_argument("command", choices=["compile"])
+    parser.parse_args(argv)
+    compile_all()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
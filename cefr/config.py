@@ -0,0 +1,17 @@
+"""Paths and settings shared by the pages and the offline tools."""
+
+import os
+from pathlib import Path
+
+# Repository root (the folder that holds CEFR_Home.py and data/)
+ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = ROOT / "data"
+
+# Writable folder for caches and logs that should survive restarts
+STATE_DIR = Path(os.environ.get("CEFR_STATE_DIR", ROOT / ".cefr"))
+
+
+def env_int(name, default):
+    """Read an integer setting from the environment."""
+    value = os.environ.get(name)
+    return int(value) if value else default
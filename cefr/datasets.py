@@ -0,0 +1,193 @@
+"""Registry of the wordlists and WIC sentence files shipped in ``data/``.
+
+Pages ask for a dataset by its logical name and always read the local copy,
+so a cold start never waits on the network and the app works offline::
+
+    from cefr.datasets import load_dataset
+    data = load_dataset("b2_wic")
+
+The GitHub copies can optionally be pulled into ``data/`` first, either with
+``python -m cefr.datasets sync`` or by setting ``CEFR_DATA_SYNC=1`` (synced
+once per process, before the first load; failures keep the local files).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from cefr import metrics
+from cefr.config import DATA_DIR
+
+REMOTE_BASE = os.environ.get("CEFR_DATA_REMOTE", "https://raw.githubusercontent.com/MK316/CEFR/refs/heads/main/data/")
+
+# file: name in data/; sep: field separator; first_word: keep only the first
+# token of WORD (some lists carry the part of speech after the word);
+# cloze: add the precomputed Masked/BlankPos quiz columns (see cefr.cloze)
+Dataset = namedtuple("Dataset", ["file", "sep", "first_word", "label", "cloze"], defaults=[False])
+
+DATASETS = {
+    "b2_words": Dataset("B2.txt", "\t", True, "B2 wordlist"),
+    "c1_words": Dataset("C1f.txt", "\t", True, "C1 wordlist"),
+    "b2_wic": Dataset("B2WICf.csv", ",", False, "B2 words in context", cloze=True),
+    "c1_wic": Dataset("C1WICff.csv", ",", False, "C1 words in context", cloze=True),
+    "b2_phonetics": Dataset("CEFR_B_250505.csv", ",", False, "B2 wordlist with stressed vowels"),
+    "c1_phonetics": Dataset("CEFR_C_250505.csv", ",", False, "C1 wordlist with stressed vowels"),
+    "a1a2_words": Dataset("CEFR_A1A2.txt", "\t", True, "A1-A2 wordlist"),
+    "b1b2_words": Dataset("CEFRB1B2.txt", "\t", True, "B1-B2 wordlist"),
+    "c1_all_words": Dataset("CEFRC1.txt", "\t", True, "C1 wordlist (3,000 words)"),
+}
+
+
+# Low-cardinality text columns kept as categoricals
+CATEGORY_COLUMNS = {"POS", "Vowel_Type", "Stressed_Vowel"}
+
+
+def dataset_path(name):
+    """Return the local path of a registered dataset."""
+    return DATA_DIR / DATASETS[name].file
+
+
+def _read_raw(name):
+    """Read a dataset file exactly as shipped (all columns as strings)."""
+    import pandas as pd
+
+    spec = DATASETS[name]
+    # utf-8-sig drops the BOM that some of the exported CSVs start with
+    return pd.read_csv(dataset_path(name), sep=spec.sep, dtype=str, encoding="utf-8-sig")
+
+
+def _normalize(df, spec):
+    """Apply the cleanup every page used to repeat after loading."""
+    df.columns = [str(col).strip() for col in df.columns]
+    df = df.rename(columns={"Word": "WORD"})  # CEFR_A1A2.txt
+    # Trailing separators produce header-less "Unnamed: n" columns (C1WICff.csv)
+    df = df.drop(columns=[col for col in df.columns if col.startswith("Unnamed")])
+
+    # "1414  measurement": spaces instead of the tab leave the word in the SID cell
+    missing = df["WORD"].isna() & df["SID"].str.contains(r"\s", na=False)
+    df.loc[missing, "WORD"] = df.loc[missing, "SID"].str.split(n=1).str[1]
+
+    # Keep only the numeric part of SID and drop rows without one
+    df["SID"] = df["SID"].str.extract(r"(\d+)")[0]
+    df = df.dropna(subset=["SID"])
+    df["SID"] = df["SID"].astype("int32")
+
+    df["WORD"] = df["WORD"].str.strip()
+    if spec.first_word:
+        parts = df["WORD"].str.split(n=1)
+        # "specialize  v.": some lists put the POS after the word in the WORD column
+        if "POS" not in df.columns:
+            df["POS"] = parts.str[1]
+        else:
+            df["POS"] = df["POS"].where(df["POS"].fillna("").str.strip() != "", parts.str[1])
+        df["WORD"] = parts.str[0].astype(str)
+    if "POS" not in df.columns:
+        df["POS"] = ""
+    for col in df.columns:
+        if col not in ("SID", "WORD"):
+            df[col] = df[col].fillna("").str.strip()
+            if col in CATEGORY_COLUMNS:
+                df[col] = df[col].astype("category")
+    return df.reset_index(drop=True)
+
+
+_sync_lock = threading.Lock()
+_synced = False
+
+
+def _maybe_sync():
+    global _synced
+    if _synced or os.environ.get("CEFR_DATA_SYNC") != "1":
+        return
+    with _sync_lock:
+        if not _synced:
+            _synced = True
+            sync(log=lambda message: print(message, file=sys.stderr))
+
+
+def load_source(name):
+    """Parse and clean the CSV/TSV file of a dataset (no compiled copy)."""
+    return _normalize(_read_raw(name), DATASETS[name])
+
+
+@lru_cache(maxsize=None)
+def load_dataset(name):
+    """Load a registered dataset from ``data/``, cleaned, once per process.
+
+    The compiled copy in ``data/compiled`` (see ``cefr.columnar``) is used when
+    it is up to date with the source file; otherwise the CSV/TSV is parsed and
+    published as a compiled copy for the other worker processes. WIC datasets
+    carry their cloze columns (``Masked``, ``BlankPos``).
+    The returned DataFrame is shared by every page and session (and its text
+    by every process): treat it as read-only and copy before modifying it.
+    """
+    from cefr.columnar import load_compiled, publish
+
+    _maybe_sync()
+    start = time.perf_counter()
+    df = load_compiled(name, dataset_path(name))
+    source = "compiled"
+    if df is None:
+        df = load_source(name)
+        if DATASETS[name].cloze:
+            from cefr.cloze import add_cloze_columns
+
+            df = add_cloze_columns(df)
+        df = publish(name, df, dataset_path(name))
+        source = "parsed"
+    metrics.DATASET_LOAD_SECONDS.observe(time.perf_counter() - start, name, source)
+    return df
+
+
+def sync(names=None, log=print, timeout=10):
+    """Download the GitHub copy of each dataset over the local file.
+
+    Files are replaced atomically and only when the download succeeds, so a
+    failed sync leaves the shipped data untouched. Returns the names that
+    were updated.
+    """
+    from urllib.request import urlopen
+
+    updated = []
+    for name in names or DATASETS:
+        path = dataset_path(name)
+        url = REMOTE_BASE + DATASETS[name].file
+        try:
+            with urlopen(url, timeout=timeout) as response:
+                content = response.read()
+        except OSError as e:
+            log(f"{name}: keeping local copy ({e})")
+            continue
+        if path.exists() and path.read_bytes() == content:
+            continue
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp, path)
+        updated.append(name)
+        log(f"{name}: updated from {url}")
+    load_dataset.cache_clear()
+    return updated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cefr.datasets", description="Manage the CEFR datasets.")
+    parser.add_argument("command", choices=["list", "sync"])
+    parser.add_argument("names", nargs="*", help="datasets to sync (default: all)")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for name, spec in DATASETS.items():
+            print(f"{name:14} {spec.file:20} {spec.label}")
+        return 0
+    sync(args.names or None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""Per-dataset index for SID range slicing, word lookup and sampling.
+
+Pages used to filter with ``data[(data['SID'] >= start) & (data['SID'] <= end)]``
+on every rerun, which builds two full boolean masks and copies a new frame.
+A ``WordlistIndex`` keeps the rows sorted by SID so a range is found with two
+binary searches and returned as a positional slice.
+"""
+
+import random
+import time
+from functools import lru_cache
+
+from cefr import metrics
+from cefr.datasets import load_dataset
+
+
+class WordlistIndex:
+    """Sorted-by-SID view of a dataset built once per process."""
+
+    def __init__(self, df):
+        import numpy as np
+
+        if not df["SID"].is_monotonic_increasing:
+            df = df.sort_values("SID", kind="stable")
+        # Sorted (compiled) data is not copied: string columns stay shared across processes
+        self.frame = df.reset_index(drop=True)
+        self.sids = np.ascontiguousarray(self.frame["SID"].to_numpy())
+        self._rows_by_word = {}
+        for position, word in enumerate(self.frame["WORD"]):
+            self._rows_by_word.setdefault(str(word).lower(), position)
+
+    def __len__(self):
+        return len(self.sids)
+
+    @property
+    def min_sid(self):
+        return int(self.sids[0]) if len(self.sids) else 0
+
+    @property
+    def max_sid(self):
+        return int(self.sids[-1]) if len(self.sids) else 0
+
+    def bounds(self, start_sid, end_sid):
+        """Return the ``[lo, hi)`` row positions of SIDs in ``[start_sid, end_sid]``."""
+        lo = int(self.sids.searchsorted(start_sid, side="left"))
+        hi = int(self.sids.searchsorted(end_sid, side="right"))
+        return lo, max(lo, hi)
+
+    def count(self, start_sid, end_sid):
+        lo, hi = self.bounds(start_sid, end_sid)
+        return hi - lo
+
+    def slice(self, start_sid, end_sid):
+        """Return the rows with ``start_sid <= SID <= end_sid`` (positional slice)."""
+        start = time.perf_counter()
+        lo, hi = self.bounds(start_sid, end_sid)
+        rows = self.frame.iloc[lo:hi]
+        metrics.SID_FILTER_SECONDS.observe(time.perf_counter() - start, "slice")
+        return rows
+
+    def lookup(self, word):
+        """Return the first row for ``word`` (case-insensitive) as a dict, or None."""
+        position = self._rows_by_word.get(word.strip().lower())
+        return None if position is None else self.frame.iloc[position].to_dict()
+
+    def sample_positions(self, start_sid, end_sid, k, rng=random):
+        """Return ``k`` random row positions within the SID range."""
+        start = time.perf_counter()
+        lo, hi = self.bounds(start_sid, end_sid)
+        positions = rng.sample(range(lo, hi), min(k, hi - lo))
+        metrics.SID_FILTER_SECONDS.observe(time.perf_counter() - start, "sample")
+        return positions
+
+    def sample(self, start_sid, end_sid, k, rng=random):
+        """Return ``k`` random rows of the SID range as dicts.
+
+        Only the ``k`` chosen positions are materialized, never the range.
+        """
+        positions = self.sample_positions(start_sid, end_sid, k, rng)
+        return self.frame.iloc[positions].to_dict(orient="records")
+
+
+@lru_cache(maxsize=None)
+def get_index(name):
+    """Return the shared ``WordlistIndex`` for a registered dataset."""
+    df = load_dataset(name)
+    with metrics.timer(metrics.INDEX_BUILD_SECONDS, name):
+        return WordlistIndex(df)
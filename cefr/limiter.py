@@ -0,0 +1,149 @@
+"""Process-wide rate limit for requests to the remote TTS engine.
+
+A class told to "do SIDs 1-20" starts dozens of sessions at once. Identical
+texts are already coalesced into one synthesis (``cefr.tts``); what is left
+goes through one token bucket of ``CEFR_TTS_RATE`` requests per second with
+bursts of ``CEFR_TTS_BURST``, so the upstream is not hammered into throttling
+us. ``CEFR_TTS_RATE=0`` turns the limit off.
+
+When the bucket is empty, requests wait in one queue per session and tokens
+are handed out round-robin across sessions: a learner generating 60 clips
+does not make a classmate who asked for one wait behind all of them. A
+request that waits longer than ``CEFR_TTS_QUEUE_TIMEOUT`` seconds gives up
+with ``RateLimited`` (the router then tries the next engine). Queue waits are
+recorded in ``metrics.TTS_QUEUE_SECONDS``.
+
+Requests run on worker threads, so the session they belong to is taken at
+submission time: wrap the submitted function with ``bind_session``.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+
+from cefr import metrics
+from cefr.backends import BackendUnavailable
+from cefr.config import env_int
+
+RATE = env_int("CEFR_TTS_RATE", 5)             # requests per second; 0: no limit
+BURST = env_int("CEFR_TTS_BURST", 10)
+QUEUE_TIMEOUT = env_int("CEFR_TTS_QUEUE_TIMEOUT", 30)
+
+_session = ContextVar("cefr_tts_session", default=None)
+
+
+class RateLimited(BackendUnavailable):
+    """Raised when a request waited longer than the queue timeout."""
+
+
+def session_key():
+    """Session the running request belongs to (bound, or the running script's)."""
+    session = _session.get()
+    if session is None:
+        from cefr.session import current_session_id
+
+        session = current_session_id()
+    return session
+
+
+def bind_session(fn, session=None):
+    """Wrap ``fn`` to run on another thread as the calling session (or ``session``)."""
+    session = session_key() if session is None else session
+
+    def run(*args, **kwargs):
+        token = _session.set(session)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _session.reset(token)
+    return run
+
+
+class _Waiter:
+    __slots__ = ("event", "granted")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+
+class FairLimiter:
+    """Token bucket whose waiters are served round-robin by session."""
+
+    def __init__(self, rate=RATE, burst=BURST, queue_timeout=QUEUE_TIMEOUT, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.queue_timeout = queue_timeout
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._queues = OrderedDict()   # session -> deque of waiters; first session is served next
+        self._lock = threading.Lock()
+        self.stats = {"granted": 0, "queued": 0, "timeouts": 0}
+
+    def _dispatch(self):
+        """Refill, hand tokens to queued waiters round-robin; return seconds to the next token."""
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        while self._queues and self._tokens >= 1:
+            session, queue = self._queues.popitem(last=False)
+            waiter = queue.popleft()
+            if queue:
+                self._queues[session] = queue   # back of the line for its next request
+            self._tokens -= 1
+            waiter.granted = True
+            waiter.event.set()
+        return (1 - self._tokens) / self.rate
+
+    def acquire(self, session=None):
+        """Wait for a token; return the seconds waited. Raises ``RateLimited`` on timeout."""
+        if self.rate <= 0:
+            return 0.0
+        session = session_key() if session is None else session
+        start = self._clock()
+        waiter = _Waiter()
+        with self._lock:
+            self._queues.setdefault(session, deque()).append(waiter)
+            self._dispatch()
+            self.stats["queued"] += not waiter.granted
+        deadline = start + self.queue_timeout
+        while not waiter.granted:
+            with self._lock:
+                delay = self._dispatch()
+                if not waiter.granted and self._clock() >= deadline:
+                    queue = self._queues[session]
+                    queue.remove(waiter)
+                    if not queue:
+                        del self._queues[session]
+                    self.stats["timeouts"] += 1
+                    metrics.TTS_QUEUE_SECONDS.observe(self._clock() - start, "timeout")
+                    raise RateLimited(f"TTS queue wait over {self.queue_timeout} s")
+            waiter.event.wait(min(delay, max(0.0, deadline - self._clock())))
+        waited = self._clock() - start
+        with self._lock:
+            self.stats["granted"] += 1
+        metrics.TTS_QUEUE_SECONDS.observe(waited, "granted")
+        return waited
+
+    def snapshot(self):
+        """Settings, counters and the current queue (waiting requests and sessions)."""
+        with self._lock:
+            waiting = sum(len(queue) for queue in self._queues.values())
+            return dict(self.stats, rate=self.rate, burst=self.burst, tokens=round(self._tokens, 2),
+                        waiting=waiting, waiting_sessions=len(self._queues))
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_limiter():
+    """Return the limiter shared by every session in this process."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = FairLimiter()
+    return _shared
@@ -0,0 +1,176 @@
+"""Cross-level word lookup: prefix search plus POS and vowel filters.
+
+One index over every wordlist, built once per process::
+
+    from cefr.lookup import get_lookup
+    get_lookup().search("abs")                                    # prefix
+    get_lookup().search(level="C1", pos="v", stressed_vowel="ɔ")  # filters
+
+Entries are unique per (word, level). Lists of the same level are merged, so
+the C1 entry of a word carries the POS of ``CEFRC1.txt`` and the vowels of
+``CEFR_C_250505.csv``. ``CEFRC1.txt`` ends with the A1-A2 list under the same
+SIDs; those rows are merged into the A1-A2 entries.
+
+Entries are sorted by lowercase word, so a prefix is a contiguous range found
+with two binary searches. POS, vowel type, stressed vowel and level each have
+an inverted index (value -> sorted entry ids); a query intersects the
+shortest posting list, cut to the prefix range, with the others. No
+DataFrame is scanned per query.
+"""
+
+import bisect
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+from cefr.datasets import load_dataset
+
+# (dataset, level) in level order
+SOURCES = [
+    ("a1a2_words", "A1-A2"),
+    ("b1b2_words", "B1-B2"),
+    ("b2_phonetics", "B2"),
+    ("c1_phonetics", "C1"),
+    ("c1_all_words", "C1"),
+]
+APPENDED = {"c1_all_words": "a1a2_words"}   # rows also in the named list belong to its level
+LEVELS = [level for level in dict.fromkeys(level for _, level in SOURCES)]
+FIELDS = ("level", "pos", "vowel_type", "stressed_vowel")
+
+_POS_TAG = re.compile(r"\b([a-z]+)\.")
+
+
+def normalize(field, value):
+    """Canonical form of a filter value: ``"v."`` -> ``"v"``, ``"/ ɔ /"`` -> ``"ɔ"``, ``"diphthong"`` -> ``"Diphthong"``."""
+    value = str(value).strip()
+    if field == "pos":
+        return value.rstrip(".").lower()
+    if field == "stressed_vowel":
+        return value.replace("/", "").strip()
+    if field == "vowel_type":
+        return value.capitalize()
+    return value
+
+
+class LookupEntry:
+    """One word at one level, with the SIDs it has in each list."""
+
+    __slots__ = ("word", "level", "pos", "vowel_type", "stressed_vowel", "sids")
+
+    def __init__(self, word, level):
+        self.word = word
+        self.level = level
+        self.pos = ()
+        self.vowel_type = ""
+        self.stressed_vowel = ""
+        self.sids = {}     # dataset -> SID
+
+    def as_dict(self):
+        return {
+            "Word": self.word,
+            "Level": self.level,
+            "POS": ", ".join(f"{tag}." for tag in self.pos),
+            "Vowel_Type": self.vowel_type,
+            "Stressed_Vowel": f"/ {self.stressed_vowel} /" if self.stressed_vowel else "",
+            "SID": ", ".join(f"{dataset} {sid}" for dataset, sid in self.sids.items()),
+        }
+
+
+class LookupIndex:
+    """Sorted entries plus inverted indexes on level, POS and vowels."""
+
+    def __init__(self, entries):
+        self.entries = sorted(entries, key=lambda e: (e.word.lower(), LEVELS.index(e.level)))
+        self.keys = [entry.word.lower() for entry in self.entries]
+        self.postings = {field: defaultdict(list) for field in FIELDS}   # field -> value -> [entry id]
+        for i, entry in enumerate(self.entries):
+            self.postings["level"][entry.level].append(i)
+            for tag in entry.pos:
+                self.postings["pos"][tag].append(i)
+            if entry.vowel_type:
+                self.postings["vowel_type"][normalize("vowel_type", entry.vowel_type)].append(i)
+            if entry.stressed_vowel:
+                self.postings["stressed_vowel"][entry.stressed_vowel].append(i)
+        self._sets = {(field, value): frozenset(ids) for field, values in self.postings.items()
+                      for value, ids in values.items()}
+
+    @classmethod
+    def build(cls, sources=SOURCES):
+        entries = {}     # (lowercase word, level) -> LookupEntry
+        rows = {}        # dataset -> {(lowercase word, SID): level}
+        levels = dict(sources)
+        for dataset, level in sources:
+            df = load_dataset(dataset)
+            other = APPENDED.get(dataset)
+            columns = [df[name] if name in df.columns else [""] * len(df)
+                       for name in ("SID", "WORD", "POS", "Vowel_Type", "Stressed_Vowel")]
+            seen = rows.setdefault(dataset, {})
+            for sid, word, pos, vowel_type, stressed in zip(*columns):
+                word = str(word).strip()
+                if not word:
+                    continue
+                key = word.lower()
+                row_level = levels[other] if other and (key, int(sid)) in rows.get(other, {}) else level
+                seen[(key, int(sid))] = row_level
+                entry = entries.get((key, row_level))
+                if entry is None:
+                    entry = entries[(key, row_level)] = LookupEntry(word, row_level)
+                entry.sids.setdefault(dataset, int(sid))
+                tags = tuple(tag for tag in _POS_TAG.findall(str(pos).lower()) if tag not in entry.pos)
+                entry.pos += tags
+                if vowel_type and not entry.vowel_type:
+                    entry.vowel_type = str(vowel_type)
+                if stressed and not entry.stressed_vowel:
+                    entry.stressed_vowel = normalize("stressed_vowel", stressed)
+        return cls(entries.values())
+
+    def __len__(self):
+        return len(self.entries)
+
+    def values(self, field):
+        """Filter values present for ``field``, most frequent first (levels in level order)."""
+        if field == "level":
+            return [level for level in LEVELS if level in self.postings["level"]]
+        return sorted(self.postings[field], key=lambda value: -len(self.postings[field][value]))
+
+    def prefix_range(self, prefix):
+        """``[lo, hi)`` entry ids whose word starts with ``prefix`` (case-insensitive)."""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return 0, len(self.keys)
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + "\U0010ffff", lo)
+        return lo, hi
+
+    def search(self, prefix="", limit=None, **filters):
+        """Entries starting with ``prefix`` that match every filter (``level``, ``pos``, ...)."""
+        lo, hi = self.prefix_range(prefix)
+        wanted = [(field, normalize(field, value)) for field, value in filters.items() if value]
+        if not wanted:
+            ids = range(lo, hi)
+        else:
+            postings = []
+            for field, value in wanted:
+                if field not in self.postings:
+                    raise ValueError(f"unknown filter: {field}")
+                ids = self.postings[field].get(value)
+                if not ids:
+                    return []
+                postings.append((field, value, ids))
+            postings.sort(key=lambda p: len(p[2]))
+            shortest = postings[0][2]
+            others = [self._sets[(field, value)] for field, value, _ in postings[1:]]
+            ids = (i for i in shortest[bisect.bisect_left(shortest, lo):bisect.bisect_left(shortest, hi)]
+                   if all(i in other for other in others))
+        results = []
+        for i in ids:
+            if limit is not None and len(results) >= limit:
+                break
+            results.append(self.entries[i])
+        return results
+
+
+@lru_cache(maxsize=None)
+def get_lookup():
+    """Return the shared lookup index over every wordlist."""
+    return LookupIndex.build()
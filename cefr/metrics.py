@@ -0,0 +1,366 @@
+"""Counters and latency histograms for the hot paths, exported as text files.
+
+Instrumented code calls the module-level metrics directly::
+
+    from cefr import metrics
+    with metrics.timer(metrics.SID_FILTER_SECONDS, "slice"):
+        ...
+
+An observation is a lock, a ``bisect`` into fixed buckets and a few integer
+adds (about a microsecond), so the hooks stay on in production;
+``CEFR_METRICS=0`` turns them into no-ops.
+
+Pages wrap their whole script in ``page_run(name)``, which times the rerun,
+records the session's footprint and starts the exporter. Every
+``CEFR_METRICS_INTERVAL`` seconds (default 15) the exporter writes
+``STATE_DIR/metrics.prom`` in the Prometheus text format (point a
+node_exporter textfile collector at it) and, with ``CEFR_METRICS_JSON=1``,
+appends the same data as one JSON line to ``STATE_DIR/metrics.jsonl``.
+
+Besides the metrics below, an export includes the snapshots of the audio
+cache, TTS router and rate limiter, session ledger, prefetcher, answer log,
+audio server, audio processing and the ``lru_cache`` loaders, as gauges. A
+subsystem that was never imported is skipped, so exporting never loads
+pandas or gTTS.
+"""
+
+import atexit
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from cefr.config import STATE_DIR, env_int
+
+ENABLED = os.environ.get("CEFR_METRICS", "1") != "0"
+INTERVAL = env_int("CEFR_METRICS_INTERVAL", 15)
+JSON_LINES = os.environ.get("CEFR_METRICS_JSON") == "1"
+PROM_PATH = STATE_DIR / "metrics.prom"
+JSON_PATH = STATE_DIR / "metrics.jsonl"
+PREFIX = "cefr"
+
+# Seconds: 50 us .. 60 s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Bytes: 1 KiB .. 64 MiB
+SIZE_BUCKETS = tuple(1024 * 4 ** n for n in range(9))
+
+
+class Counter:
+    """Monotonic count per label values."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name + "_total", labels, value) for labels, value in self._values.items()]
+
+    def series(self):
+        with self._lock:
+            return dict(self._values)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label values, plus sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}    # labels -> [count per bucket (last is +Inf), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        if not ENABLED:
+            return
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[slot] += 1
+            counts[-1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {labels: list(counts) for labels, counts in self._values.items()}
+        samples = []
+        for labels, counts in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append((self.name + "_bucket", labels + (("le", _format(bound)),), cumulative))
+            samples.append((self.name + "_sum", labels, counts[-1]))
+            samples.append((self.name + "_count", labels, cumulative))
+        return samples
+
+    def summary(self, *labels):
+        """Count, mean and bucket-estimated p50/p99 (seconds or bytes) for one label set."""
+        with self._lock:
+            counts = list(self._values.get(labels, ()))
+        if not counts:
+            return {"count": 0}
+        total = sum(counts[:-1])
+
+        def quantile(q):
+            rank, seen = q * total, 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                seen += count
+                if seen >= rank:
+                    return bound
+            return float("inf")
+
+        return {"count": total, "mean": counts[-1] / total, "p50": quantile(0.5), "p99": quantile(0.99)}
+
+    def series(self):
+        with self._lock:
+            labelsets = list(self._values)
+        return {labels: self.summary(*labels) for labels in labelsets}
+
+
+def _format(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = []
+
+
+def _register(metric):
+    metric.name = f"{PREFIX}_{metric.name}"
+    REGISTRY.append(metric)
+    return metric
+
+
+RERUN_SECONDS = _register(Histogram("rerun_seconds", "Whole-script rerun time per page.", ("page", "outcome")))
+SESSION_BYTES = _register(Histogram("session_bytes", "Bytes held by the session after a rerun.", ("page",),
+                                    buckets=SIZE_BUCKETS))
+SESSION_KEYS = _register(Histogram("session_state_keys", "st.session_state keys after a rerun.", ("page",),
+                                   buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000)))
+DATASET_LOAD_SECONDS = _register(Histogram("dataset_load_seconds", "Cold dataset load time.", ("dataset", "source")))
+INDEX_BUILD_SECONDS = _register(Histogram("index_build_seconds", "WordlistIndex build time.", ("dataset",)))
+SID_FILTER_SECONDS = _register(Histogram("sid_filter_seconds", "SID range slicing and sampling.", ("op",)))
+AUDIO_SECONDS = _register(Histogram("generate_audio_seconds", "Time to get one clip, by where it came from.",
+                                    ("result",)))
+BATCH_CLIPS = _register(Counter("batch_clips", "Clips asked of generate_audio_batch.", ("result",)))
+BULK_REQUESTS = _register(Counter("tts_bulk_requests", "Bulk synthesis requests by outcome.", ("result",)))
+COALESCED = _register(Counter("tts_coalesced_requests", "Clip requests that joined a synthesis already in flight.",
+                              ("path",)))
+TTS_QUEUE_SECONDS = _register(Histogram("tts_queue_wait_seconds", "Time a TTS request waited for the rate limiter.",
+                                        ("outcome",)))
+
+
+@contextmanager
+def timer(histogram, *labels):
+    """Observe the time spent in the ``with`` block."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, *labels)
+
+
+# -- subsystem snapshots ----------------------------------------------------
+
+def _cache_info(loader):
+    hits, misses, _, size = loader.cache_info()
+    lookups = hits + misses
+    return {"hits": hits, "misses": misses, "size": size, "hit_rate": round(hits / lookups, 3) if lookups else 0.0}
+
+
+def _shared_snapshot(module):
+    # Only report a log or prefetcher some page actually created
+    return module._shared.snapshot() if module._shared is not None else None
+
+
+# name -> (module that must already be imported, snapshot of it)
+COLLECTORS = {
+    "audio_cache": ("cefr.audio_cache", lambda m: m.get_audio_cache().snapshot()),
+    "tts_router": ("cefr.tts", lambda m: m.get_router().snapshot()),
+    "sessions": ("cefr.session", lambda m: m.ledger.snapshot()),
+    "prefetch": ("cefr.prefetch", _shared_snapshot),
+    "tts_limiter": ("cefr.limiter", _shared_snapshot),
+    "answer_log": ("cefr.answer_log", _shared_snapshot),
+    "audio_server": ("cefr.audio_server", _shared_snapshot),
+    "audio_process": ("cefr.audio_process", lambda m: m.snapshot()),
+    "load_dataset": ("cefr.datasets", lambda m: _cache_info(m.load_dataset)),
+    "get_index": ("cefr.index", lambda m: _cache_info(m.get_index)),
+    "get_lookup": ("cefr.lookup", lambda m: _cache_info(m.get_lookup)),
+}
+
+
+def collect():
+    """Snapshots of every imported subsystem (a failing one reports its error)."""
+    snapshots = {}
+    for name, (module_name, snapshot) in COLLECTORS.items():
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        try:
+            value = snapshot(module)
+        except Exception as e:
+            value = {"error": f"{type(e).__name__}: {e}"}
+        if value is not None:
+            snapshots[name] = value
+    return snapshots
+
+
+def _gauges(name, value, labels=()):
+    """Flatten a snapshot: first-level dict keys become a ``key`` label, strings a ``value`` label."""
+    if isinstance(value, dict):
+        for key, inner in value.items():
+            if isinstance(inner, dict) and not labels:
+                yield from _gauges(name, inner, (("key", str(key)),))
+            else:
+                yield from _gauges(f"{name}_{key}", inner, labels)
+    elif isinstance(value, bool):
+        yield name, labels, int(value)
+    elif isinstance(value, (int, float)):
+        yield name, labels, value
+    elif value is not None:
+        yield name, labels + (("value", str(value)),), 1
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+
+def _named(metric, labels):
+    """Pair label values with the metric's label names (``le`` is already a pair)."""
+    named = tuple(zip(metric.labelnames, labels[:len(metric.labelnames)]))
+    return named + tuple(labels[len(metric.labelnames):])
+
+
+def render_prometheus(snapshots=None):
+    """Every metric and subsystem snapshot in the Prometheus text format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_label_text(_named(metric, labels))} {_format(value)}")
+    snapshots = collect() if snapshots is None else snapshots
+    for subsystem, snapshot in snapshots.items():
+        typed = set()
+        for name, labels, value in _gauges(f"{PREFIX}_{subsystem}", snapshot):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{_label_text(labels)} {_format(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot():
+    """Metrics as a JSON-ready dict: counters, histogram summaries and subsystem snapshots."""
+    metrics = {}
+    for metric in REGISTRY:
+        for labels, value in metric.series().items():
+            metrics[metric.name + "".join(f"[{label}]" for label in labels)] = value
+    return {"ts": time.time(), "metrics": metrics, "subsystems": collect()}
+
+
+# -- export -----------------------------------------------------------------
+
+def write_files():
+    """Write ``metrics.prom`` (atomically) and append to ``metrics.jsonl`` if enabled."""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    snapshots = collect()
+    tmp = f"{PROM_PATH}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_prometheus(snapshots))
+    os.replace(tmp, PROM_PATH)
+    if JSON_LINES:
+        data = snapshot()
+        with open(JSON_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(data, ensure_ascii=False, default=str) + "\n")
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def _export():
+    try:
+        write_files()
+    except OSError:
+        pass   # A full or read-only disk must not break the app
+
+
+def _export_forever(interval):
+    while True:
+        time.sleep(interval)
+        _export()
+
+
+def start_exporter(interval=INTERVAL):
+    """Start the background exporter once per process."""
+    global _exporter
+    if not ENABLED or _exporter is not None:
+        return
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = threading.Thread(target=_export_forever, args=(interval,), name="metrics", daemon=True)
+            _exporter.start()
+            atexit.register(_export)
+
+
+@contextmanager
+def page_run(page):
+    """Time one whole-script rerun of ``page`` and record the session's size afterwards."""
+    if not ENABLED:
+        yield
+        return
+    start_exporter()
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except BaseException as e:
+        # st.rerun()/st.stop() end a run by raising
+        if type(e).__name__ in ("RerunException", "StopException"):
+            outcome = "interrupted"
+        raise
+    finally:
+        RERUN_SECONDS.observe(time.perf_counter() - start, page, outcome)
+        _record_session(page)
+
+
+def _record_session(page):
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        return   # bare mode: no session
+    session = sys.modules.get("cefr.session")
+    if session is not None:
+        SESSION_BYTES.observe(session.ledger.footprint(ctx.session_id), page)
+    SESSION_KEYS.observe(len(ctx.session_state.filtered_state), page)
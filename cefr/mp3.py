@@ -0,0 +1,327 @@
+"""Frame-level MP3 joining for the listening wordlist.
+
+Appending whole MP3 files back to back leaves ID3 tags and Xing/Info headers
+in the middle of the stream, and the Xing header of the first clip tells the
+player the wrong length. Here each clip is split into its MPEG audio frames,
+tags and Xing/Info frames are dropped, and silence between clips is made of
+real (silent) frames in the same format, so the result is one clean stream
+whose item start times are known exactly.
+
+``trim_silence`` uses the same frame parsing to cut leading and trailing
+silence from a clip when no decoder (ffmpeg) is available, and
+``split_on_silence`` cuts a bulk synthesis (many sentences separated by
+pauses) back into one clip per sentence.
+"""
+
+import struct
+
+from cefr.config import DATA_DIR
+
+SILENCE_FILE = DATA_DIR / "silence.mp3"
+
+# Bitrates (kbit/s) by [MPEG-1?][index] and sample rates by version id
+_BITRATES = {
+    True: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    False: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+class FrameHeader:
+    """Decoded 4-byte MPEG audio (Layer III) frame header."""
+
+    __slots__ = ("raw", "version", "bitrate_index", "sample_rate", "padding", "mono", "protected")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.version = (raw >> 19) & 3           # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+        self.protected = not (raw >> 16) & 1
+        self.bitrate_index = (raw >> 12) & 15
+        self.sample_rate = _SAMPLE_RATES[self.version][(raw >> 10) & 3]
+        self.padding = (raw >> 9) & 1
+        self.mono = ((raw >> 6) & 3) == 3
+
+    @property
+    def mpeg1(self):
+        return self.version == 3
+
+    @property
+    def samples(self):
+        return 1152 if self.mpeg1 else 576
+
+    @property
+    def length(self):
+        bitrate = _BITRATES[self.mpeg1][self.bitrate_index] * 1000
+        return (144 if self.mpeg1 else 72) * bitrate // self.sample_rate + self.padding
+
+    @property
+    def duration(self):
+        return self.samples / self.sample_rate
+
+    @property
+    def side_info_size(self):
+        if self.mpeg1:
+            return 17 if self.mono else 32
+        return 9 if self.mono else 17
+
+    def same_format(self, other):
+        return (self.version, self.sample_rate, self.mono) == (other.version, other.sample_rate, other.mono)
+
+
+def _parse_header(data, offset):
+    """Return a FrameHeader for a valid Layer III header at ``offset``, else None."""
+    if offset + 4 > len(data):
+        return None
+    (raw,) = struct.unpack_from(">I", data, offset)
+    if (raw >> 21) & 0x7FF != 0x7FF:              # frame sync
+        return None
+    if (raw >> 19) & 3 == 1 or (raw >> 17) & 3 != 1:  # reserved version / not Layer III
+        return None
+    if (raw >> 12) & 15 in (0, 15) or (raw >> 10) & 3 == 3:
+        return None
+    return FrameHeader(raw)
+
+
+def _skip_id3v2(data):
+    offset = 0
+    while data[offset:offset + 3] == b"ID3" and len(data) >= offset + 10:
+        size = 0
+        for byte in data[offset + 6:offset + 10]:
+            size = (size << 7) | (byte & 0x7F)
+        footer = 10 if data[offset + 5] & 0x10 else 0
+        offset += 10 + size + footer
+    return offset
+
+
+def _is_info_frame(data, offset, header):
+    """True for the Xing/Info/VBRI metadata frame some encoders put first."""
+    start = offset + 4 + (2 if header.protected else 0) + header.side_info_size
+    return data[start:start + 4] in (b"Xing", b"Info") or data[offset + 36:offset + 40] == b"VBRI"
+
+
+def split_frames(data):
+    """Return ``[(header, frame_bytes), ...]`` for the audio frames of an MP3."""
+    data = bytes(data)
+    frames = []
+    offset = _skip_id3v2(data)
+    while offset < len(data):
+        header = _parse_header(data, offset)
+        if header is None or offset + header.length > len(data):
+            # Resynchronize on the next frame sync (skips junk and ID3v1 tags)
+            offset = data.find(b"\xff", offset + 1)
+            if offset < 0:
+                break
+            continue
+        if not (not frames and _is_info_frame(data, offset, header)):
+            frames.append((header, data[offset:offset + header.length]))
+        offset += header.length
+    return frames
+
+
+def silent_frame(like):
+    """Return one MPEG frame that decodes to silence, in the format of ``like``.
+
+    All side-info fields are zero (part2_3_length = 0 for every granule), which
+    decoders render as digital silence.
+    """
+    raw = like.raw | (1 << 16)                     # no CRC
+    raw &= ~(1 << 9)                               # no padding
+    header = FrameHeader(raw)
+    return struct.pack(">I", raw) + b"\0" * (header.length - 4)
+
+
+def _side_info(frame, header):
+    """Return ``(main_data_begin, [(part2_3_length, big_values), ...])`` of a frame.
+
+    One pair per granule and channel (two granules per frame in MPEG-1, one in
+    MPEG-2/2.5).
+    """
+    start = 4 + (2 if header.protected else 0)
+    size = header.side_info_size * 8
+    bits = int.from_bytes(frame[start:start + header.side_info_size], "big")
+    channels = 1 if header.mono else 2
+    if header.mpeg1:
+        begin_bits, head, granules, stride = 9, 9 + (5 if header.mono else 3) + 4 * channels, 2, 59
+    else:
+        begin_bits, head, granules, stride = 8, 8 + (1 if header.mono else 2), 1, 63
+    fields = []
+    for i in range(granules * channels):
+        shift = size - head - i * stride
+        fields.append(((bits >> (shift - 12)) & 0xFFF, (bits >> (shift - 21)) & 0x1FF))
+    return bits >> (size - begin_bits), fields
+
+
+def _main_data_size(header):
+    return header.length - 4 - (2 if header.protected else 0) - header.side_info_size
+
+
+def _quiet(frame, header):
+    """True when no granule codes ``big_values``: at most ±1 quantized lines."""
+    return all(big_values == 0 for _, big_values in _side_info(frame, header)[1])
+
+
+def trim_silence(data, pad=0.05):
+    """Drop near-silent frames from both ends of an MP3 without re-encoding.
+
+    ``pad`` seconds of the silence are kept at each end. Frames before the
+    first sound are also kept as far back as its bit reservoir reaches, so the
+    first syllable decodes intact. Tags and the Xing/Info frame are dropped.
+    Returns ``data`` unchanged when there is nothing to trim.
+    """
+    frames = split_frames(data)
+    loud = [i for i, (header, frame) in enumerate(frames) if not _quiet(frame, header)]
+    if not loud:
+        return data
+    keep = round(pad / frames[0][0].duration)
+    first = max(0, loud[0] - keep)
+    last = min(len(frames), loud[-1] + 1 + keep)
+
+    reservoir, i = _side_info(frames[loud[0]][1], frames[loud[0]][0])[0], loud[0]
+    while reservoir > 0 and i > 0:
+        i -= 1
+        reservoir -= _main_data_size(frames[i][0])
+    first = min(first, i)
+
+    trimmed = b"".join(frame for _, frame in frames[first:last])
+    return trimmed if len(trimmed) < len(data) else data
+
+
+def split_on_silence(data, count, min_silence):
+    """Cut an MP3 into ``count`` clips at its ``count - 1`` long pauses.
+
+    A pause is a run of near-silent frames between two sounding ones lasting
+    at least ``min_silence`` seconds; each cut is made in its middle and
+    every clip is then trimmed with ``trim_silence``. Returns None unless
+    exactly ``count - 1`` such pauses are found, so a sentence that itself
+    contains a long pause, or a separator the engine swallowed, never yields
+    misaligned clips.
+    """
+    frames = split_frames(data)
+    loud = [i for i, (header, frame) in enumerate(frames) if not _quiet(frame, header)]
+    if not loud:
+        return None
+    cuts = []
+    for before, after in zip(loud, loud[1:]):
+        if after - before > 1 and sum(header.duration for header, _ in frames[before + 1:after]) >= min_silence:
+            cuts.append((before + 1 + after) // 2)
+    if len(cuts) != count - 1:
+        return None
+    bounds = [0] + cuts + [len(frames)]
+    return [trim_silence(b"".join(frame for _, frame in frames[start:end]))
+            for start, end in zip(bounds, bounds[1:])]
+
+
+def _wav_duration(data):
+    """Duration in seconds of a PCM WAV file, or None."""
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+    offset, byte_rate = 12, None
+    while offset + 8 <= len(data):
+        chunk, size = data[offset:offset + 4], struct.unpack_from("<I", data, offset + 4)[0]
+        if chunk == b"fmt ":
+            byte_rate = struct.unpack_from("<I", data, offset + 16)[0]
+        elif chunk == b"data" and byte_rate:
+            return min(size, len(data) - offset - 8) / byte_rate
+        offset += 8 + size + (size & 1)
+    return None
+
+
+def silence_seconds(path=SILENCE_FILE):
+    """Duration of the silence clip shipped in ``data/`` (MP3 or WAV)."""
+    data = path.read_bytes()
+    # Check for WAV first: PCM samples near zero look like MP3 frame syncs
+    seconds = _wav_duration(data)
+    if seconds is None:
+        seconds = sum(header.duration for header, _ in split_frames(data))
+    return seconds or 1.0
+
+
+def silence_frames(seconds, like, path=SILENCE_FILE):
+    """Return frames of ``seconds`` of silence matching the format of ``like``.
+
+    Frames of ``data/silence.mp3`` are reused when that file is an MP3 in the
+    same format; otherwise equivalent silent frames are generated.
+    """
+    if seconds <= 0:
+        return []
+    try:
+        data = path.read_bytes()
+    except OSError:
+        data = b""
+    source = []
+    if data and _wav_duration(data) is None:
+        source = [frame for header, frame in split_frames(data) if header.same_format(like)]
+    count = max(1, round(seconds / like.duration))
+    if source:
+        return (source * (count // len(source) + 1))[:count]
+    return [silent_frame(like)] * count
+
+
+class Playlist:
+    """Joins clips into one MP3 stream and records where each item starts.
+
+    ``items`` holds ``(label, start_seconds, duration_seconds)`` tuples so a
+    player can seek to an item with ``st.audio(..., start_time=start)``.
+    """
+
+    def __init__(self, gap=None):
+        self.gap = silence_seconds() if gap is None else gap
+        self.items = []
+        self._chunks = []
+        self._firsts = []      # index in _chunks of each item's clip
+        self._seconds = 0.0
+        self._silence = None   # (format header, frames bytes, seconds)
+
+    def _gap_for(self, like):
+        if self._silence is None or not self._silence[0].same_format(like):
+            frames = silence_frames(self.gap, like)
+            self._silence = (like, b"".join(frames), len(frames) * like.duration)
+        return self._silence
+
+    def add(self, label, clip):
+        """Append one clip (MP3 bytes) preceded by the configured gap."""
+        frames = split_frames(clip)
+        if frames and self.items and self.gap > 0:
+            _, silence, seconds = self._gap_for(frames[0][0])
+            self._chunks.append(silence)
+            self._seconds += seconds
+        duration = sum(header.duration for header, _ in frames)
+        self.items.append((label, self._seconds, duration))
+        self._firsts.append(len(self._chunks))
+        self._chunks.append(b"".join(frame for _, frame in frames))
+        self._seconds += duration
+
+    @property
+    def duration(self):
+        return self._seconds
+
+    def getvalue(self, first=0):
+        """Return the joined stream, or the part from item ``first`` on (without its gap)."""
+        if not first:
+            return b"".join(self._chunks)
+        return b"".join(self._chunks[self._firsts[first]:]) if first < len(self._firsts) else b""
+
+
+def stream_playlist(labeled_clips, gap=None):
+    """Build a playlist from ``(label, clip)`` pairs arriving in any order.
+
+    ``labeled_clips`` yields ``(position, label, clip)``; clips are appended in
+    ``position`` order as soon as every earlier position has arrived, and the
+    playlist is yielded after each append so callers can already play the
+    prefix while later clips are still being synthesized. A ``None`` clip
+    (failed synthesis) is skipped.
+    """
+    playlist = Playlist(gap)
+    waiting = {}
+    next_position = 0
+    for position, label, clip in labeled_clips:
+        waiting[position] = (label, clip)
+        grew = False
+        while next_position in waiting:
+            label, clip = waiting.pop(next_position)
+            if clip is not None:
+                playlist.add(label, clip)
+                grew = True
+            next_position += 1
+        if grew:
+            yield playlist
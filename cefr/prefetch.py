@@ -0,0 +1,155 @@
+"""Background synthesis of the batch a learner is likely to generate next.
+
+While a learner answers one batch, the page names the texts of the next one
+(the next SID window in Listen & Spell, the next random draw in the WIC
+quiz) with ``schedule(owner, texts)``. They are synthesized into the shared
+audio store on a small pool of ``CEFR_PREFETCH_WORKERS`` threads, apart from
+the pool that serves "Generate", so a real request never queues behind a
+guess. A new plan for the same owner (the range changed) cancels whatever
+of the old one has not started yet.
+
+On "Generate" the page calls ``claim(owner, texts)``, which counts how the
+owner's plan did: ``hits`` (predicted and ready), ``late`` (predicted, still
+in flight), ``misses`` (not predicted, not cached) and ``unused`` (predicted
+but not asked for). A Generate with no plan yet (the first one) only counts
+as ``unplanned``. ``snapshot()`` reports these and the hit rate.
+``CEFR_PREFETCH=0`` turns prefetching off.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from cefr.config import env_int
+from cefr.limiter import bind_session
+
+ENABLED = os.environ.get("CEFR_PREFETCH", "1") != "0"
+WORKERS = env_int("CEFR_PREFETCH_WORKERS", 4)
+MAX_PLANS = 1024
+
+
+class _Plan:
+    __slots__ = ("keys", "futures", "cancelled")
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.futures = []
+        self.cancelled = False
+
+
+class Prefetcher:
+    """Per-owner prefetch plans run on a dedicated low-concurrency pool."""
+
+    def __init__(self, workers=WORKERS, enabled=ENABLED):
+        self.workers = workers
+        self.enabled = enabled
+        self._pool = None
+        self._plans = OrderedDict()   # owner -> _Plan, least recently scheduled first
+        self._lock = threading.Lock()
+        self.stats = {"scheduled": 0, "synthesized": 0, "already_cached": 0, "cancelled": 0, "failed": 0,
+                      "unplanned": 0, "hits": 0, "late": 0, "misses": 0, "unused": 0}
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self.stats[name] += delta
+
+    def _cancel(self, plan):
+        plan.cancelled = True
+        cancelled = sum(future.cancel() for future in plan.futures)
+        self.stats["cancelled"] += cancelled
+
+    def schedule(self, owner, texts, lang="en"):
+        """Make ``texts`` the owner's next batch and start synthesizing what is missing."""
+        if not self.enabled:
+            return
+        from cefr.tts import audio_key_for, cached_audio
+
+        wanted = {audio_key_for(text, lang): text for text in texts}
+        with self._lock:
+            plan = self._plans.get(owner)
+            if plan is not None and plan.keys == wanted.keys():
+                return   # Same plan as on the previous rerun
+            if plan is not None:
+                self._cancel(plan)
+            plan = self._plans[owner] = _Plan(wanted.keys())
+            self._plans.move_to_end(owner)
+            while len(self._plans) > MAX_PLANS:
+                self._cancel(self._plans.popitem(last=False)[1])
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch")
+
+        cached = 0
+        fetch = bind_session(self._fetch)   # queued fairly with the owner's other TTS requests
+        for key, text in wanted.items():
+            if cached_audio(key) is not None:
+                cached += 1
+            else:
+                plan.futures.append(self._pool.submit(fetch, plan, text, lang))
+        self._count(scheduled=len(wanted), already_cached=cached)
+
+    def _fetch(self, plan, text, lang):
+        from cefr.tts import ITEM_TIMEOUT, generate_audio
+
+        if plan.cancelled:
+            return
+        try:
+            generate_audio(text, lang, timeout=ITEM_TIMEOUT)
+        except Exception:
+            self._count(failed=1)   # "Generate" will try again and show the error
+        else:
+            self._count(synthesized=1)
+
+    def claim(self, owner, texts, lang="en"):
+        """Score the owner's plan against the batch actually generated, then drop it."""
+        from cefr.tts import audio_key_for, cached_audio
+
+        with self._lock:
+            plan = self._plans.pop(owner, None)
+        if plan is None:
+            self._count(unplanned=1)
+            return
+        plan.cancelled = True   # Not-yet-started guesses are no longer needed
+        for future in plan.futures:
+            future.cancel()
+
+        hits = late = misses = 0
+        keys = {audio_key_for(text, lang) for text in texts}
+        for key in keys:
+            ready = cached_audio(key) is not None
+            if key in plan.keys:
+                hits += ready
+                late += not ready
+            else:
+                misses += not ready
+        self._count(hits=hits, late=late, misses=misses, unused=len(set(plan.keys) - keys))
+
+    def cancel(self, owner):
+        with self._lock:
+            plan = self._plans.pop(owner, None)
+            if plan is not None:
+                self._cancel(plan)
+
+    def snapshot(self):
+        """Counters plus ``hit_rate``: clips predicted and ready / clips needed by planned Generates."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["plans"] = len(self._plans)
+        wanted = stats["hits"] + stats["late"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / wanted, 3) if wanted else 0.0
+        return stats
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_prefetcher():
+    """Return the prefetcher shared by every page and session in this process."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = Prefetcher()
+    return _shared
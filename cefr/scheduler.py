@@ -0,0 +1,232 @@
+"""Per-learner spaced-repetition scheduling for the randomized WIC quiz.
+
+Every checked answer is already in the answer log (``cefr.answer_log``), so a
+learner's review state is rebuilt from their rows there the first time they
+generate a quiz in this process and then updated in memory on every check.
+Nothing else is stored, and the state survives restarts with the log.
+
+Per SID the scheduler keeps attempts, errors, a streak of correct answers and
+when the item is due again: a wrong answer makes it due at once, and each
+correct answer doubles the wait (``CEFR_REVIEW_BASE_SECONDS`` times
+2^(streak-1)). A quiz is drawn from the chosen SID range in this order:
+
+1. due items, by weighted random sampling: more past errors and longer
+   overdue weigh more, a longer streak weighs less
+2. items the learner has never answered, uniformly
+3. items not due yet, soonest first
+
+Answered items sit in one of two heaps: not due yet, by due time, or due.
+Due items are kept as a race: each has the key at which it would next be
+drawn, ``expovariate(weight)`` after the last key drawn, so popping the k
+smallest keys is a weighted sample without replacement; the drawn items are
+keyed again for the next quiz, and an item that has waited longer since it
+fell due starts nearer the front. A draw thus pops k entries (O(k log n),
+plus due items outside the range, which are put back) rather than weighing
+every answered item. New items are random row positions, redrawn when
+already answered; once most of the range has been answered they are picked
+by rank among the positions left, in O(answered). The range is never
+materialized.
+"""
+
+import bisect
+import heapq
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from cefr.config import env_int
+
+BASE_SECONDS = env_int("CEFR_REVIEW_BASE_SECONDS", 10 * 60)
+MAX_SCHEDULERS = 1024
+
+
+class ItemState:
+    """Review state of one SID for one learner."""
+
+    __slots__ = ("attempts", "errors", "streak", "due")
+
+    def __init__(self):
+        self.attempts = 0    # also tells current heap entries from stale ones
+        self.errors = 0
+        self.streak = 0
+        self.due = 0.0
+
+    def weight(self, now):
+        overdue = max(0.0, now - self.due) / BASE_SECONDS
+        return (1 + self.errors) * (1 + overdue) / (1 + self.streak)
+
+
+class ReviewScheduler:
+    """Review state of one learner in one dataset."""
+
+    def __init__(self, history=()):
+        self._items = {}     # SID -> ItemState
+        self._sids = []      # answered SIDs, sorted
+        self._waiting = []   # heap of (due, sid, attempts): answered items not due yet
+        self._due = []       # heap of (key, sid, attempts): due items, next to be drawn first
+        self._clock = 0.0    # key of the last item drawn
+        self._lock = threading.Lock()
+        for sid, correct, ts in history:
+            self._update(int(sid), correct, ts)
+        self._compact()
+
+    def __len__(self):
+        return len(self._sids)
+
+    def _live(self, entry):
+        return self._items[entry[1]].attempts == entry[2]
+
+    def _compact(self):
+        """Drop the heap entries that later answers made stale."""
+        self._waiting = [entry for entry in self._waiting if self._live(entry)]
+        self._due = [entry for entry in self._due if self._live(entry)]
+        heapq.heapify(self._waiting)
+        heapq.heapify(self._due)
+
+    def _update(self, sid, correct, ts):
+        state = self._items.get(sid)
+        if state is None:
+            state = self._items[sid] = ItemState()
+            bisect.insort(self._sids, sid)
+        state.attempts += 1
+        if correct:
+            state.streak += 1
+            state.due = ts + BASE_SECONDS * 2 ** (state.streak - 1)
+        else:
+            state.errors += 1
+            state.streak = 0
+            state.due = ts
+        heapq.heappush(self._waiting, (state.due, sid, state.attempts))
+
+    def record(self, results, ts=None):
+        """Apply one check: ``results`` holds ``(sid, correct)`` pairs."""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            for sid, correct in results:
+                self._update(int(sid), correct, ts)
+            if len(self._waiting) + len(self._due) > 2 * len(self._items) + 64:
+                self._compact()
+
+    def _enter(self, sid, state, now, rng):
+        """Put a due item in the draw: its key is when it would next be drawn at rate ``weight``."""
+        heapq.heappush(self._due, (self._clock + rng.expovariate(state.weight(now)), sid, state.attempts))
+
+    def _promote(self, now, rng):
+        """Move the items that fell due since the last draw from ``_waiting`` into ``_due``."""
+        while self._waiting and self._waiting[0][0] <= now:
+            entry = heapq.heappop(self._waiting)
+            if self._live(entry):
+                self._enter(entry[1], self._items[entry[1]], now, rng)
+
+    def _pop(self, heap, start_sid, end_sid, k):
+        """Pop up to ``k`` live entries in the SID range off ``heap``, smallest first.
+
+        Entries outside the range go back as they were; stale ones are dropped.
+        """
+        chosen, aside = [], []
+        while heap and len(chosen) < k:
+            entry = heapq.heappop(heap)
+            if not self._live(entry):
+                continue
+            (chosen if start_sid <= entry[1] <= end_sid else aside).append(entry)
+        for entry in aside:
+            heapq.heappush(heap, entry)
+        return chosen
+
+    def _new(self, index, start_sid, end_sid, k, exclude, prefer, rng):
+        """Up to ``k`` never-answered SIDs in the range, none in ``exclude``, from ``prefer`` (positions) first.
+
+        ``exclude`` holds unanswered SIDs of the range only.
+        """
+        chosen = []
+        for position in prefer:
+            sid = int(index.sids[position])
+            if start_sid <= sid <= end_sid and sid not in self._items and sid not in exclude and sid not in chosen:
+                chosen.append(sid)
+                if len(chosen) == k:
+                    return chosen
+        lo, hi = index.bounds(start_sid, end_sid)
+        answered = bisect.bisect_right(self._sids, end_sid) - bisect.bisect_left(self._sids, start_sid)
+        wanted = len(chosen) + min(k - len(chosen), hi - lo - answered - len(exclude) - len(chosen))
+        if 2 * (hi - lo - answered) >= hi - lo:
+            # Mostly new: random positions, redrawn when taken (under two tries per item on average)
+            for _ in range(4 * k + 16):
+                if len(chosen) >= wanted:
+                    return chosen
+                sid = int(index.sids[rng.randrange(lo, hi)])
+                if sid not in self._items and sid not in exclude and sid not in chosen:
+                    chosen.append(sid)
+        if len(chosen) >= wanted:
+            return chosen
+        # Mostly answered: rank the positions left between the taken ones, and pick ranks
+        taken = set(self._sids[bisect.bisect_left(self._sids, start_sid):bisect.bisect_right(self._sids, end_sid)])
+        taken = sorted(first for first, end in (index.bounds(sid, sid) for sid in taken | exclude | set(chosen)) if end > first)
+        free = hi - lo - len(taken)
+        positions, j = [], 0
+        for rank in sorted(rng.sample(range(free), min(wanted - len(chosen), free))):
+            while j < len(taken) and taken[j] <= lo + rank + j:
+                j += 1
+            positions.append(lo + rank + j)
+        rng.shuffle(positions)
+        return chosen + [int(index.sids[position]) for position in positions]
+
+    def new_positions(self, index, start_sid, end_sid, k, exclude=(), rng=random):
+        """Up to ``k`` positions of never-answered SIDs in the range, none in ``exclude``."""
+        with self._lock:
+            exclude = {int(sid) for sid in exclude if start_sid <= int(sid) <= end_sid} - self._items.keys()
+            chosen = self._new(index, start_sid, end_sid, k, exclude, (), rng)
+        return [index.bounds(sid, sid)[0] for sid in chosen]
+
+    def draw(self, index, start_sid, end_sid, k, now=None, rng=random, prefer=()):
+        """Return up to ``k`` row positions of ``index`` (a ``WordlistIndex``) in the SID range.
+
+        New items are taken from the positions in ``prefer`` (e.g. a batch
+        that was prefetched) before any others.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._promote(now, rng)
+            drawn = self._pop(self._due, start_sid, end_sid, k)
+            if drawn:
+                self._clock = max(self._clock, drawn[-1][0])
+            for _, sid, _ in drawn:   # back in the draw for the next quiz, unless answered first
+                self._enter(sid, self._items[sid], now, rng)
+            chosen = [sid for _, sid, _ in drawn]
+
+            if len(chosen) < k:
+                chosen += self._new(index, start_sid, end_sid, k - len(chosen), set(), prefer, rng)
+
+            if len(chosen) < k:
+                waiting = self._pop(self._waiting, start_sid, end_sid, k - len(chosen))
+                for entry in waiting:
+                    heapq.heappush(self._waiting, entry)
+                chosen += [sid for _, sid, _ in waiting]
+
+        rng.shuffle(chosen)
+        return [index.bounds(sid, sid)[0] for sid in chosen]
+
+
+_schedulers = OrderedDict()   # (user, dataset) -> ReviewScheduler, least recently used first
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(user, dataset):
+    """Return the scheduler of ``user`` in ``dataset``, loading it from the answer log once."""
+    key = (user, dataset)
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is not None:
+            _schedulers.move_to_end(key)
+            return scheduler
+
+    from cefr.answer_log import get_answer_log
+
+    # history() includes this learner's rows still waiting in the writer queue, so no flush
+    scheduler = ReviewScheduler(get_answer_log().history(user, dataset))
+    with _schedulers_lock:
+        scheduler = _schedulers.setdefault(key, scheduler)
+        _schedulers.move_to_end(key)
+        while len(_schedulers) > MAX_SCHEDULERS:
+            _schedulers.popitem(last=False)
+    return scheduler
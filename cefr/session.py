@@ -0,0 +1,126 @@
+"""Compact per-session quiz state with memory accounting and idle eviction.
+
+Pages used to keep full MP3 bytes in ``st.session_state`` for every generated
+item, so a class of 40 learners held dozens of copies of the same clips.
+Sessions now keep only small records -- a SID plus the audio cache key --
+and the bytes are resolved from the shared audio store (``cefr.tts``).
+
+The records live in a process-wide ledger keyed by Streamlit session id, so
+the server can report how much each session holds and drop sessions that
+have been idle for ``CEFR_SESSION_IDLE_SECONDS`` (default 30 minutes).
+"""
+
+import sys
+import threading
+import time
+
+from cefr.config import env_int
+
+IDLE_SECONDS = env_int("CEFR_SESSION_IDLE_SECONDS", 30 * 60)
+SWEEP_SECONDS = 60
+
+
+class QuizItem:
+    """One generated item: its SID, row in the shared index and audio key.
+
+    Sentences and answers are read from ``WordlistIndex.frame`` at ``row``;
+    the clip is looked up with ``cefr.tts.cached_audio(audio_key)``.
+    """
+
+    __slots__ = ("sid", "row", "audio_key")
+
+    def __init__(self, sid, row, audio_key):
+        self.sid = sid
+        self.row = row
+        self.audio_key = audio_key
+
+
+def _deep_size(obj, seen):
+    """Approximate bytes held by ``obj``, not counting shared objects twice."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(v, seen) for v in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(_deep_size(getattr(obj, name), seen) for name in obj.__slots__ if hasattr(obj, name))
+    return size
+
+
+class SessionLedger:
+    """Process-wide store of per-session records with idle eviction."""
+
+    def __init__(self, idle_seconds=IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self._sessions = {}      # session id -> {namespace: dict}
+        self._last_seen = {}     # session id -> monotonic time
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def bucket(self, session_id, namespace):
+        """Return the (mutable) dict ``namespace`` of ``session_id``."""
+        now = time.monotonic()
+        with self._lock:
+            self._last_seen[session_id] = now
+            buckets = self._sessions.setdefault(session_id, {})
+            bucket = buckets.setdefault(namespace, {})
+        if now - self._last_sweep > SWEEP_SECONDS:
+            self.evict_idle(now)
+        return bucket
+
+    def evict_idle(self, now=None):
+        """Drop every session not seen for ``idle_seconds``; return how many.
+
+        A returning session gets empty buckets, so pages must treat an empty
+        bucket as "nothing generated" (and reset any flag saying otherwise).
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._last_sweep = now
+            idle = [sid for sid, seen in self._last_seen.items() if now - seen > self.idle_seconds]
+            for sid in idle:
+                del self._last_seen[sid]
+                self._sessions.pop(sid, None)
+            self.evicted += len(idle)
+        return len(idle)
+
+    def footprint(self, session_id):
+        """Approximate bytes held by one session's records."""
+        with self._lock:
+            buckets = self._sessions.get(session_id, {})
+            return _deep_size(buckets, set())
+
+    def snapshot(self):
+        """Return session count, total/max bytes held and evictions so far."""
+        with self._lock:
+            session_ids = list(self._sessions)
+        sizes = [self.footprint(sid) for sid in session_ids]
+        return {
+            "sessions": len(sizes),
+            "bytes": sum(sizes),
+            "max_session_bytes": max(sizes, default=0),
+            "evicted": self.evicted,
+        }
+
+
+ledger = SessionLedger()
+
+
+def current_session_id():
+    """Streamlit session id of the running script ("local" outside Streamlit)."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except ImportError:
+        ctx = None
+    return ctx.session_id if ctx is not None else "local"
+
+
+def session_bucket(namespace):
+    """Return this session's records dict for ``namespace``."""
+    return ledger.bucket(current_session_id(), namespace)
@@ -0,0 +1,350 @@
+"""Text-to-speech used by every page, backed by the shared audio cache.
+
+Synthesis goes through a ``cefr.backends.Router``: gTTS first, a local engine
+when gTTS is slow or failing. Clips are cached under the key of the engine
+that actually produced them; when a fallback engine answered, the primary
+key is aliased to that clip so later lookups by the primary key find it.
+New clips are made compact by ``cefr.audio_process`` before they are stored;
+its ``VARIANT`` is part of every key.
+
+``generate_audio_batch`` asks for up to ``CEFR_TTS_BULK_SIZE`` missing texts
+in one bulk request (see ``cefr.backends``). An engine that answers with one
+clip per text needs nothing more; one joined stream is cut into clips at the
+pauses between the texts, and when the pauses do not match the texts, the
+chunk is synthesized text by text instead.
+
+Concurrent requests for the same clip share one synthesis (single flight):
+the first caller makes it, later ones wait for its result instead of sending
+their own request (``metrics.COALESCED``), whether the clip is being made
+alone or as part of a bulk request. What does reach the remote engine is
+rate limited fairly across sessions by ``cefr.limiter``.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from cefr import audio_process, metrics
+from cefr.audio_cache import audio_key, get_audio_cache
+from cefr.backends import BULK_PAUSE, Router, default_backends
+from cefr.bundle import get_bundle
+from cefr.config import env_int
+from cefr.limiter import bind_session, get_limiter
+from cefr.mp3 import split_on_silence
+
+ENGINE = "gtts"  # Primary engine: the offline bundle and lookup keys use it
+
+_router = None
+_router_lock = threading.Lock()
+_aliases = OrderedDict()   # primary key -> key of a clip made by a fallback engine
+_aliases_lock = threading.Lock()
+MAX_ALIASES = 4096
+_flights = {}   # (key, fallback) -> Future of the clip being synthesized
+_flights_lock = threading.Lock()
+
+
+def get_router():
+    """Return the backend router shared by all sessions."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = Router(default_backends(), limiter=get_limiter())
+    return _router
+
+
+def use_backends(backends):
+    """Replace the backends (benchmarks install a local stub this way)."""
+    global _router
+    with _router_lock:
+        _router = Router(backends, limiter=get_limiter())
+    return _router
+
+
+def _engine_tag(engine):
+    """Engine name plus processing variant, as used in cache keys."""
+    return f"{engine}+{audio_process.VARIANT}" if audio_process.VARIANT else engine
+
+
+def synthesize(text, lang="en", timeout=None, fallback=True):
+    """Synthesize ``text`` (no caching); return ``(engine, mp3_bytes)``."""
+    return get_router().synthesize(text, lang, timeout=timeout, fallback=fallback)
+
+
+def _from_bundle(key):
+    """Return the pre-built clip for ``key`` from the offline bundle, or None."""
+    bundle = get_bundle()
+    if bundle is None or bundle.engine != ENGINE:
+        return None
+    clip = bundle.get(key)
+    # st.audio needs bytes; the bundle lookup itself is a zero-copy slice
+    return bytes(clip) if clip is not None else None
+
+
+def _synthesize_and_store(text, lang="en", timeout=None, fallback=True):
+    """Synthesize, process, cache under the producing engine's key and return the bytes."""
+    engine, data = synthesize(text, lang, timeout=timeout, fallback=fallback)
+    return _store(text, lang, engine, data)
+
+
+def _store(text, lang, engine, data):
+    """Process and cache a new clip of ``text`` made by ``engine``; return the stored bytes."""
+    data = audio_process.process(data)
+    key = audio_key(text, lang, _engine_tag(engine))
+    get_audio_cache().put(key, data)
+    if engine != ENGINE:
+        with _aliases_lock:
+            _aliases[audio_key_for(text, lang)] = key
+            while len(_aliases) > MAX_ALIASES:
+                _aliases.popitem(last=False)
+    return data
+
+
+def audio_key_for(text, lang="en"):
+    """Key under which the clip for ``text`` is looked up (bundle and cache)."""
+    return audio_key(text, lang, _engine_tag(ENGINE))
+
+
+def clip_key(text, lang="en", fallback=True):
+    """Key of the stored clip ``cached_audio`` returns for ``text``: its own, or the fallback clip's."""
+    key = audio_key_for(text, lang)
+    if fallback and key not in get_audio_cache() and (get_bundle() is None or key not in get_bundle()):
+        with _aliases_lock:
+            return _aliases.get(key, key)
+    return key
+
+
+def cached_audio(key, fallback=True):
+    """Return stored bytes for ``key`` (bundle, cache, fallback clip) without synthesizing."""
+    data = _from_bundle(key)
+    if data is None:
+        data = get_audio_cache().get(key)
+    if data is None and fallback:
+        with _aliases_lock:
+            alias = _aliases.get(key)
+        if alias is not None:
+            data = get_audio_cache().get(alias)
+    return data
+
+
+def _join_flights(keys, fallback):
+    """Return ``(future, leader)`` per key: the leader makes the clip, the others wait on ``future``.
+
+    All keys are joined at once, so concurrent bulk requests for the same
+    texts do not split the lead between them.
+    """
+    flights = []
+    with _flights_lock:
+        for key in keys:
+            future = _flights.get((key, fallback))
+            if future is None:
+                _flights[key, fallback] = future = Future()
+                flights.append((future, True))
+            else:
+                flights.append((future, False))
+    return flights
+
+
+def _land(key, fallback, future, data=None, error=None):
+    """End a flight: later callers find the clip in the cache, waiting ones get it (or the error)."""
+    with _flights_lock:
+        del _flights[key, fallback]
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(data)   # None: a bulk request gave up on it, the waiters try themselves
+
+
+def _synthesize_once(text, lang, timeout, fallback):
+    """Synthesize and store ``text`` unless it is already in flight; return ``(data, coalesced)``."""
+    key = audio_key_for(text, lang)
+    while True:
+        [(future, leader)] = _join_flights([key], fallback)
+        if not leader:
+            metrics.COALESCED.inc("single")
+            data = future.result()
+            if data is not None:
+                return data, True
+            continue
+        try:
+            # The previous flight may have landed between our cache miss and joining
+            data = cached_audio(key, fallback)
+            if data is None:
+                data = _synthesize_and_store(text, lang, timeout=timeout, fallback=fallback)
+        except BaseException as e:
+            _land(key, fallback, future, error=e)
+            raise
+        _land(key, fallback, future, data)
+        return data, False
+
+
+def _get_or_synthesize(text, lang="en", timeout=None, fallback=True):
+    start = time.perf_counter()
+    result = "cached"
+    try:
+        data = cached_audio(audio_key_for(text, lang), fallback)
+        if data is None:
+            result = "error"
+            get_audio_cache().record_miss()
+            data, coalesced = _synthesize_once(text, lang, timeout, fallback)
+            result = "coalesced" if coalesced else "synthesized"
+        return data
+    finally:
+        metrics.AUDIO_SECONDS.observe(time.perf_counter() - start, result)
+
+
+def generate_audio(text, lang="en", timeout=None):
+    """Generate speech audio for a given text, reusing any cached clip."""
+    return _get_or_synthesize(text, lang, timeout=timeout)
+
+
+# -- batch synthesis --------------------------------------------------------
+
+MAX_WORKERS = env_int("CEFR_TTS_WORKERS", 8)
+ITEM_TIMEOUT = env_int("CEFR_TTS_TIMEOUT", 15)  # seconds per request
+RETRIES = env_int("CEFR_TTS_RETRIES", 2)
+BULK_SIZE = env_int("CEFR_TTS_BULK_SIZE", 20)   # texts per bulk request; 0 or 1 turns bulk off
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Return the bounded worker pool shared by all sessions."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="tts")
+    return _pool
+
+
+def _synthesize_with_retries(text, lang, timeout, retries, fallback=True):
+    """Synthesize one clip, retrying transient failures with a short backoff."""
+    for attempt in range(retries + 1):
+        try:
+            return _get_or_synthesize(text, lang, timeout=timeout, fallback=fallback)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(0.5 * (attempt + 1))
+
+
+def _request_bulk(texts, lang, timeout, fallback):
+    """One bulk request for ``texts``; return the stored clips, or None."""
+    try:
+        engine, data = get_router().synthesize_many(texts, lang, timeout=timeout, fallback=fallback)
+    except Exception:
+        metrics.BULK_REQUESTS.inc("failed")
+        return None
+    if isinstance(data, list):
+        clips = data if len(data) == len(texts) else None   # One clip per text: nothing to cut
+    else:
+        clips = split_on_silence(data, len(texts), min_silence=BULK_PAUSE * 0.6)
+    if clips is None:
+        metrics.BULK_REQUESTS.inc("mismatch")
+        return None
+    metrics.BULK_REQUESTS.inc("clips" if data is clips else "split")
+    return [_store(text, lang, engine, clip) for text, clip in zip(texts, clips)]
+
+
+def _synthesize_bulk(texts, lang, timeout, fallback=True):
+    """Synthesize ``texts`` in one request and store one clip per text.
+
+    Texts already in flight elsewhere are left out of the request and waited
+    for. Returns the clips, or None when the request failed or could not be
+    cut into one clip per text.
+    """
+    keys = [audio_key_for(text, lang) for text in texts]
+    flights = _join_flights(keys, fallback)
+    results, leading = {}, []
+    for i, (future, leader) in enumerate(flights):
+        if leader:
+            # Flights that landed between our cache miss and joining left their clip behind
+            results[i] = cached_audio(keys[i], fallback)
+            if results[i] is None:
+                leading.append(i)
+            else:
+                _land(keys[i], fallback, future, results[i])
+    clips = None
+    try:
+        if len(leading) > 1:
+            clips = _request_bulk([texts[i] for i in leading], lang, timeout, fallback)
+    finally:
+        for position, i in enumerate(leading):
+            _land(keys[i], fallback, flights[i][0], clips[position] if clips else None)
+    if clips is None and leading:
+        return None   # text by text; waiting on the other flights there
+    results.update(zip(leading, clips or ()))
+    for i, (future, leader) in enumerate(flights):
+        if not leader:
+            metrics.COALESCED.inc("bulk")
+            try:
+                results[i] = future.result()
+            except Exception:
+                return None
+            if results[i] is None:
+                return None
+    return [results[i] for i in range(len(texts))]
+
+
+def generate_audio_batch(texts, lang="en", timeout=ITEM_TIMEOUT, retries=RETRIES, fallback=True, bulk=BULK_SIZE):
+    """Synthesize many texts concurrently and yield results as they finish.
+
+    Yields ``(index, audio_bytes, error)`` tuples in completion order; exactly
+    one of ``audio_bytes``/``error`` is set. Clips already in the offline
+    bundle or the cache are yielded first without touching the worker pool.
+    Missing texts go out in bulk requests of up to ``bulk`` texts; a chunk
+    that fails is retried text by text. ``fallback=False`` restricts
+    synthesis to the primary engine.
+    """
+    cached, missing = [], []
+    for index, text in enumerate(texts):
+        data = cached_audio(audio_key_for(text, lang), fallback)
+        if data is not None:
+            cached.append((index, data))
+            metrics.BATCH_CLIPS.inc("cached")
+        else:
+            missing.append(index)
+
+    # Submit every miss before yielding so the pool starts right away
+    pending = {}   # future -> (bulk?, indices)
+
+    def submit_each(indices):
+        for index in indices:
+            future = _get_pool().submit(bind_session(_synthesize_with_retries), texts[index], lang, timeout, retries,
+                                        fallback)
+            pending[future] = (False, [index])
+            metrics.BATCH_CLIPS.inc("queued")
+
+    size = bulk if bulk > 1 and len(missing) > 1 else 1
+    for start in range(0, len(missing), size):
+        chunk = missing[start:start + size]
+        if len(chunk) > 1:
+            future = _get_pool().submit(bind_session(_synthesize_bulk), [texts[i] for i in chunk], lang, timeout,
+                                        fallback)
+            pending[future] = (True, chunk)
+            metrics.BATCH_CLIPS.inc("bulk", amount=len(chunk))
+        else:
+            submit_each(chunk)
+
+    for index, data in cached:
+        yield index, data, None
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            is_bulk, indices = pending.pop(future)
+            if is_bulk:
+                clips = future.result()
+                if clips is None:
+                    submit_each(indices)
+                else:
+                    for index, data in zip(indices, clips):
+                        yield index, data, None
+                continue
+            try:
+                yield indices[0], future.result(), None
+            except Exception as e:
+                metrics.BATCH_CLIPS.inc("failed")
+                yield indices[0], None, e
@@ -1,6 +1,8 @@
 import streamlit as st
+from cefr.metrics import page_run
 
-st.markdown("""### 🍀 CEFR vocabulary
+with page_run("about"):
+    st.markdown("""### 🍀 CEFR vocabulary
 [The Common European Framework of Reference for Languages (CEFR)](https://www.coe.int/en/web/common-european-framework-reference-languages/level-descriptions) provides a structured way to categorize vocabulary based on language proficiency. Here’s an overview of the levels included in this application:
 
 + A1 (Beginner) – Includes basic words and phrases for everyday communication. Learners at this level can understand and use familiar expressions, introduce themselves, and interact in simple conversations.
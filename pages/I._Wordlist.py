@@ -1,71 +1,94 @@
 import streamlit as st
-import requests
-import pandas as pd
-import io
+from cefr.index import get_index
+from cefr.lookup import get_lookup
+from cefr.metrics import page_run
 
-# URLs for wordlists
-wordlist_urls = {
-    "🍐 Wordlist B2": "https://raw.githubusercontent.com/MK316/CEFR/refs/heads/main/data/CEFR_B_250505.csv",
-    "🍓 Wordlist C1": "https://raw.githubusercontent.com/MK316/CEFR/refs/heads/main/data/CEFR_C_250505.csv"
+# Logical dataset names for each wordlist (files ship in data/)
+wordlist_datasets = {
+    "🍐 Wordlist B2": "b2_phonetics",
+    "🍓 Wordlist C1": "c1_phonetics"
 }
 
-# Function to load wordlist data
-@st.cache_data
-def load_wordlist(url):
+# Function to load wordlist data (shared SID index)
+def load_wordlist(dataset):
     try:
-        response = requests.get(url)
-        response.raise_for_status()
+        return get_index(dataset)
+    except Exception as e:
+        st.error(f"❌ Failed to load data: {e}")
+        return None
 
-        df = pd.read_csv(io.StringIO(response.text), dtype=str)
+SEARCH_TAB = "🔎 Search all levels"
+MAX_RESULTS = 200
 
-        # Strip whitespace from column names
-        df.columns = df.columns.str.strip()
 
-        # Clean and drop rows with missing SID
-        df['SID'] = df['SID'].str.extract('(\d+)')[0]
-        df = df.dropna(subset=['SID'])  # Remove rows where SID is NaN after extraction
-        df['SID'] = df['SID'].astype(int)  # Now safe to convert to int
+@st.fragment
+def search_all_levels():
+    # ✅ Only this fragment reruns while the learner types
+    try:
+        lookup = get_lookup()
+    except Exception as e:
+        st.error(f"❌ Failed to load data: {e}")
+        return
 
-        # Clean other columns
-        df['WORD'] = df['WORD'].str.strip()
-        if 'POS' not in df.columns:
-            df['POS'] = ""
+    prefix = st.text_input("Word starts with", placeholder="e.g. abs", key="lookup_prefix")
+    col1, col2, col3, col4 = st.columns(4)
+    filters = {}
+    for col, (field, label) in zip((col1, col2, col3, col4), (("level", "Level"), ("pos", "Part of speech"),
+                                                             ("vowel_type", "Vowel type"), ("stressed_vowel", "Stressed vowel"))):
+        with col:
+            choice = st.selectbox(label, ["Any"] + lookup.values(field), key=f"lookup_{field}")
+        filters[field] = None if choice == "Any" else choice
 
-        return df
+    if not prefix.strip() and not any(filters.values()):
+        # ✅ No table until there is something to search: keeps page reruns light
+        st.caption(f"{len(lookup):,} words across {len(lookup.values('level'))} levels.")
+        return
+    results = lookup.search(prefix, limit=MAX_RESULTS + 1, **filters)
+    if not results:
+        st.info("No matching words.")
+        return
+    shown = results[:MAX_RESULTS]
+    st.caption(f"Showing the first {MAX_RESULTS} matches. Type more letters to narrow the search."
+               if len(results) > MAX_RESULTS else f"{len(shown)} matching words")
+    st.dataframe([entry.as_dict() for entry in shown], hide_index=True)
 
-    except Exception as e:
-        st.error(f"❌ Failed to load data: {e}")
-        return pd.DataFrame(columns=["SID", "WORD", "POS"])
 
-# Create tabs for different wordlists
-tabs = st.tabs(list(wordlist_urls.keys()))
+with page_run("wordlist"):
+    # Create tabs for different wordlists
+    tabs = st.tabs(list(wordlist_datasets.keys()) + [SEARCH_TAB])
 
-# Loop through tabs dynamically
-for idx, (tab_name, url) in enumerate(wordlist_urls.items()):
-    with tabs[idx]:  # Assign content to each tab
-        st.caption("🔎 The B2 and C1 word lists contain a total of 725 and 1,380 words, respectively. Select the word numbers you want, then click the Show button.")
-        st.markdown("---")
+    # Loop through tabs dynamically
+    for idx, (tab_name, dataset) in enumerate(wordlist_datasets.items()):
+        with tabs[idx]:  # Assign content to each tab
+            st.caption("🔎 The B2 and C1 word lists contain a total of 725 and 1,380 words, respectively. Select the word numbers you want, then click the Show button.")
+            st.markdown("---")
         
-        # Load wordlist
-        wordlist = load_wordlist(url)
+            # Load wordlist
+            index = load_wordlist(dataset)
 
-        if not wordlist.empty:
-            total_words = len(wordlist)  # Get total words in the wordlist
+            if index is not None and len(index):
+                wordlist = index.frame
+                total_words = len(wordlist)  # Get total words in the wordlist
             
-            # User selects SID range
-            col1, col2 = st.columns(2)
-            with col1:
-                start_sid = st.number_input(f"From SID (Total: {total_words} words)", min_value=1, max_value=wordlist['SID'].max(), value=1)
-            with col2:
-                end_sid = st.number_input(f"To SID (Total: {total_words} words)", min_value=start_sid, max_value=wordlist['SID'].max(), value=min(start_sid+19, wordlist['SID'].max()))
+                # User selects SID range
+                col1, col2 = st.columns(2)
+                with col1:
+                    start_sid = st.number_input(f"From SID (Total: {total_words} words)", min_value=1, max_value=index.max_sid, value=1)
+                with col2:
+                    end_sid = st.number_input(f"To SID (Total: {total_words} words)", min_value=start_sid, max_value=index.max_sid, value=min(start_sid+19, index.max_sid))
 
-            # Filter selected range
-            filtered_words = wordlist[(wordlist['SID'] >= start_sid) & (wordlist['SID'] <= end_sid)].reset_index(drop=True)
+                # Filter selected range
+                filtered_words = index.slice(start_sid, end_sid)
 
-            # ✅ "Show Words" Button with number of selected words
-            num_selected = len(filtered_words)
-            if st.button(f"🔍 Show {num_selected} Words", key=f"show_words_{idx}"):
-                st.table(filtered_words.set_index("SID"))
+                # ✅ "Show Words" Button with number of selected words
+                num_selected = len(filtered_words)
+                if st.button(f"🔍 Show {num_selected} Words", key=f"show_words_{idx}"):
+                    st.table(filtered_words.set_index("SID"))
 
-        else:
-            st.error("No data available for this wordlist.")
+            else:
+                st.error("No data available for this wordlist.")
+
+    with tabs[-1]:
+        st.caption("🔎 Search the A1-A2, B1-B2, B2 and C1 lists at once. Type the first letters of a word and/or pick filters.")
+        st.markdown("---")
+        search_all_levels()
@@ -1,36 +1,19 @@
 import streamlit as st
-import requests
-import pandas as pd
-import io
-from gtts import gTTS
-from io import BytesIO
-
-# ✅ Load wordlist from GitHub
-@st.cache_data
-def load_wordlist(url):
+import time
+from cefr.audio_cache import audio_key, get_audio_cache
+from cefr.audio_server import audio_source
+from cefr.index import get_index
+from cefr.metrics import page_run
+from cefr.mp3 import stream_playlist
+from cefr.tts import clip_key, generate_audio_batch
+
+# ✅ Load wordlist from the shared local dataset registry (with SID index)
+def load_wordlist(dataset):
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raise error if request fails
-
-        # Read as DataFrame
-        df = pd.read_csv(io.StringIO(response.text), sep='\t', usecols=['SID', 'WORD', 'POS'], dtype=str)
-
-        # Clean and convert SID to integer
-        df.columns = df.columns.str.strip()
-        df['SID'] = df['SID'].str.extract('(\d+)')[0].astype(int)
-        df['WORD'] = df['WORD'].str.strip()  # Remove extra spaces
-
-        # ✅ Extract only the first word (removing POS)
-        df['WORD'] = df['WORD'].apply(lambda x: x.split()[0])
-
-        return df
+        return get_index(dataset)
     except Exception as e:
         st.error(f"❌ Failed to load data: {e}")
-        return pd.DataFrame(columns=["SID", "WORD"])
-
-# 🔹 Wordlist file URLs
-level_b_url = "https://raw.githubusercontent.com/MK316/CEFR/refs/heads/main/data/B2.txt"
-level_c_url = "https://raw.githubusercontent.com/MK316/CEFR/refs/heads/main/data/C1f.txt"
+        return None
 
 # ✅ Streamlit App UI
 st.title("🔊 Wordlist Audio Generator")
@@ -38,49 +21,81 @@ st.title("🔊 Wordlist Audio Generator")
 # ✅ Tabs for Level B and Level C
 tab1, tab2 = st.tabs(["💙 Level B", "💜 Level C"])
 
-def run_app(level_name, dataset_url, unique_key):
+def run_app(level_name, dataset, unique_key):
     # Load wordlist
-    wordlist = load_wordlist(dataset_url)
+    index = load_wordlist(dataset)
 
-    if not wordlist.empty:
+    if index is not None and len(index):
         # User selects SID range
         col1, col2 = st.columns(2)
         with col1:
             start_sid = st.number_input(f"From SID ({level_name})", 
                                         min_value=1, 
-                                        max_value=wordlist['SID'].max(), 
+                                        max_value=index.max_sid, 
                                         value=1, 
                                         key=f"start_sid_{unique_key}")
         with col2:
             end_sid = st.number_input(f"To SID ({level_name})", 
                                       min_value=start_sid, 
-                                      max_value=wordlist['SID'].max(), 
-                                      value=min(start_sid+19, wordlist['SID'].max()), 
+                                      max_value=index.max_sid, 
+                                      value=min(start_sid+19, index.max_sid), 
                                       key=f"end_sid_{unique_key}")
 
         # Filter selected words
-        selected_data = wordlist[(wordlist['SID'] >= start_sid) & (wordlist['SID'] <= end_sid)][['SID', 'WORD']]
-
-        # ✅ Generate audio including SID + WORD
-        def generate_audio(data):
-            combined_audio = BytesIO()
-
-            for row in data.itertuples():
-                text = f"Number {row.SID}, {row.WORD}"  # Example: "Number 1, specialize"
-                tts = gTTS(text, lang='en')
-                tts_audio = BytesIO()
-                tts.write_to_fp(tts_audio)
-                tts_audio.seek(0)
-
-                combined_audio.write(tts_audio.read())  # Append word audio
-
-            combined_audio.seek(0)
-            return combined_audio
+        selected_data = index.slice(start_sid, end_sid)[['SID', 'WORD']]
+
+        # ✅ Generate audio including SID + WORD, joined frame by frame with silence gaps
+        def generate_wordlist_audio(data, segments):
+            rows = list(data.itertuples())
+            texts = [f"Number {row.SID}, {row.WORD}" for row in rows]  # Example: "Number 1, specialize"
+            failed = []
+
+            def clips():
+                for i, audio, error in generate_audio_batch(texts):  # Concurrent, shared cache
+                    if error is None:
+                        yield i, rows[i].WORD, audio
+                    else:
+                        failed.append(rows[i].SID)
+
+            playlist, shown, last_shown = None, 0, time.monotonic()
+            for playlist in stream_playlist(clips()):
+                # Let the learner start listening while later words are still being synthesized: each
+                # stretch of finished words gets its own player, written once so playback never restarts
+                if time.monotonic() - last_shown >= 1.0:
+                    with segments:
+                        st.caption(f"▶️ {playlist.items[shown][0]} … {playlist.items[-1][0]}")
+                        st.audio(playlist.getvalue(shown), format="audio/mp3")
+                    shown, last_shown = len(playlist.items), time.monotonic()
+            return playlist, texts, sorted(failed)
 
         # ✅ Button to generate and play audio (with unique key)
+        playlist_key = f"playlist_{unique_key}"
         if st.button(f"🎧 Generate Audio ({level_name})", key=f"generate_audio_{unique_key}"):
-            audio_file = generate_audio(selected_data)
-            st.audio(audio_file, format="audio/mp3")
+            playlist, texts, failed = generate_wordlist_audio(selected_data, st.container())
+            if failed:
+                # ✅ A playlist with missing words is played once, never cached
+                st.warning(f"⚠️ Audio is not available for SID {', '.join(map(str, failed))}; "
+                           "these words are skipped. Generate again to retry them.")
+                st.session_state.pop(playlist_key, None)
+                if playlist is not None:
+                    st.audio(playlist.getvalue(), format="audio/mp3")
+            elif playlist is not None:
+                # Keep the joined audio in the memory cache (it is derived from cached clips); the session
+                # only keeps its key and offsets. The key covers every clip's text, engine and processing.
+                audio_id = audio_key(" | ".join(clip_key(text) for text in texts), "en", f"playlist-{playlist.gap}")
+                get_audio_cache().put(audio_id, playlist.getvalue(), disk=False)
+                st.session_state[playlist_key] = (audio_id, playlist.items)
+
+        if playlist_key in st.session_state:
+            audio_id, items = st.session_state[playlist_key]
+            audio_data = get_audio_cache().get(audio_id)
+            if audio_data is not None:
+                # ✅ Seek to any word using the offset table
+                choice = st.selectbox("▶️ Start from", range(len(items)), key=f"seek_{unique_key}",
+                                      format_func=lambda i: f"{items[i][0]} ({items[i][1]:.1f}s)")
+                st.audio(audio_source(audio_data), format="audio/mp3", start_time=int(items[choice][1]))
+            else:
+                st.info("The playlist has expired; generate it again.")
 
         # ✅ Display selected words with SID
         if not selected_data.empty:
@@ -89,10 +104,11 @@ def run_app(level_name, dataset_url, unique_key):
     else:
         st.error(f"No data available for {level_name}.")
 
-# Run app for Level B
-with tab1:
-    run_app("Level B", level_b_url, "level_b")
+with page_run("listening"):
+    # Run app for Level B
+    with tab1:
+        run_app("Level B", "b2_words", "level_b")
 
-# Run app for Level C
-with tab2:
-    run_app("Level C", level_c_url, "level_c")
+    # Run app for Level C
+    with tab2:
+        run_app("Level C", "c1_words", "level_c")
@@ -1,3 +1,5 @@
 import streamlit as st
+from cefr.metrics import page_run
 
-st.caption("Applications to practice the given words will be updated. (Last updated: Feb.25, 2025)")
+with page_run("voca_applications"):
+    st.caption("Applications to practice the given words will be updated. (Last updated: Feb.25, 2025)")
@@ -0,0 +1,111 @@
+import hmac
+import os
+import time
+
+import streamlit as st
+from cefr.answer_log import ANONYMOUS, get_answer_log, week_of
+from cefr.index import get_index
+from cefr.metrics import page_run
+
+# Quizzes whose answers are logged (the dataset fixes the level and the SIDs)
+quiz_datasets = {
+    "🍐 B2 Words in Context": "b2_wic",
+    "🍓 C1 Words in Context": "c1_wic",
+    "🍐 B2 Listen & Spell": "b2_words",
+    "🍓 C1 Listen & Spell": "c1_words",
+}
+
+
+def teacher_passcode():
+    """Passcode from ``teacher_passcode`` in the app secrets or ``CEFR_TEACHER_PASSCODE``; None if unset."""
+    try:
+        passcode = st.secrets.get("teacher_passcode")
+    except Exception:
+        passcode = None  # No secrets file
+    return str(passcode or os.environ.get("CEFR_TEACHER_PASSCODE", "")) or None
+
+
+def period_options():
+    now = time.time()
+    return {"This week": week_of(now), "Last week": week_of(now - 7 * 86400), "All time": "all"}
+
+
+def percent(part, whole):
+    return round(100 * part / whole, 1) if whole else 0.0
+
+
+def words_for(dataset, sids):
+    """``{sid: word}`` for a few SIDs (binary searches in the shared index)."""
+    index = get_index(dataset)
+    words = {}
+    for sid in sids:
+        lo, hi = index.bounds(sid, sid)
+        words[sid] = index.frame.at[lo, "WORD"] if hi > lo else ""
+    return words
+
+
+def show_analytics():
+    st.markdown("---")
+
+    log = get_answer_log()
+    periods = period_options()
+    period_name = st.radio("Period", list(periods), horizontal=True)
+    period = periods[period_name]
+
+    # ✅ Every table below reads running totals, never the answer history
+    totals = log.totals(period)
+    st.markdown("### 📋 Overview")
+    overview = []
+    for label, dataset in quiz_datasets.items():
+        attempts, correct, students = totals.get(dataset, (0, 0, 0))
+        overview.append({"Quiz": label, "Answers": attempts, "Accuracy (%)": percent(correct, attempts),
+                         "Students": students})
+    st.dataframe(overview, hide_index=True)
+
+    quiz = st.selectbox("Quiz", list(quiz_datasets))
+    dataset = quiz_datasets[quiz]
+    if dataset not in totals:
+        st.info(f"No answers for {quiz} ({period_name.lower()}).")
+    else:
+        col1, col2 = st.columns(2)
+        with col1:
+            limit = st.number_input("Hardest words to show", min_value=5, max_value=100, value=20, step=5)
+        with col2:
+            min_attempts = st.number_input("Minimum attempts per word", min_value=1, max_value=50, value=3)
+
+        hardest = log.hardest(dataset, period, limit=limit, min_attempts=min_attempts)
+        st.markdown(f"### 🧩 {limit} hardest words")
+        if hardest:
+            words = words_for(dataset, [sid for sid, _, _ in hardest])
+            st.dataframe([{"SID": sid, "WORD": words[sid], "Attempts": attempts, "Errors": attempts - correct,
+                           "Error rate (%)": percent(attempts - correct, attempts)}
+                          for sid, attempts, correct in hardest], hide_index=True)
+        else:
+            st.info(f"No word has {min_attempts} or more attempts yet.")
+
+        st.markdown("### 🧑‍🎓 Students (lowest accuracy first)")
+        st.dataframe([{"Student": "Anonymous (unnamed sessions)" if user == ANONYMOUS else user,
+                       "Answers": attempts, "Accuracy (%)": percent(correct, attempts),
+                       "Last answer": time.strftime("%Y-%m-%d %H:%M", time.localtime(last_ts))}
+                      for user, attempts, correct, last_ts in log.students(dataset, period)], hide_index=True)
+
+
+def main():
+    st.caption("📊 Results of the WIC quizzes and Listen & Spell, updated as learners check their answers.")
+
+    # ✅ Learners' results are for teachers only: the page stays closed until a passcode is configured
+    passcode = teacher_passcode()
+    if passcode is None:
+        st.warning("🔒 Set `teacher_passcode` in the app secrets (or `CEFR_TEACHER_PASSCODE`) to open this page.")
+        return
+
+    entered = st.text_input("🔑 Teacher passcode", type="password", key="teacher_passcode")
+    if entered:
+        if hmac.compare_digest(entered.encode(), passcode.encode()):
+            show_analytics()
+        else:
+            st.error("Wrong passcode.")
+
+
+with page_run("teacher_analytics"):
+    main()
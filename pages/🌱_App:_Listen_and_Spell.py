@@ -1,31 +1,11 @@
 import streamlit as st
-from gtts import gTTS
-from io import BytesIO
-import pandas as pd
-
-# Load data with caching
-@st.cache_data
-def load_data(file_url):
-    df = pd.read_csv(file_url, sep='\t', usecols=['SID', 'WORD', 'POS'], dtype=str)  # Read all as strings
-
-    # Strip any leading/trailing whitespace from column names
-    df.columns = df.columns.str.strip()
-
-    # Extract only the numeric part of SID
-    df['SID'] = df['SID'].str.extract('(\d+)')[0].astype(int)  # Extract numbers only and convert to integer
-
-    # Extract only the first word from WORD column (in case extra info exists)
-    df['WORD'] = df['WORD'].str.split().str[0]
-
-    return df
-
-def generate_audio(text):
-    """Generate speech audio for a given text using gTTS."""
-    tts = gTTS(text=text, lang='en')
-    audio_file = BytesIO()
-    tts.write_to_fp(audio_file)
-    audio_file.seek(0)
-    return audio_file.getvalue()  # Return byte content
+from cefr.answer_log import ANONYMOUS_PREFIX, get_answer_log
+from cefr.audio_server import audio_source
+from cefr.index import get_index
+from cefr.metrics import page_run
+from cefr.prefetch import get_prefetcher
+from cefr.session import current_session_id, session_bucket
+from cefr.tts import audio_key_for, cached_audio, generate_audio_batch
 
 def main():
     st.markdown("### 🎧 Listen & Spell Practice")
@@ -37,73 +17,113 @@ def main():
     with tab1:
         run_practice_app(
             user_name="User_LevelB",
-            file_url="https://raw.githubusercontent.com/MK316/CEFR/refs/heads/main/data/B2.txt"
+            dataset="b2_words",
+            level_tag="B2"
         )
 
     with tab2:
         run_practice_app(
             user_name="User_LevelC",
-            file_url="https://raw.githubusercontent.com/MK316/CEFR/refs/heads/main/data/C1f.txt"
+            dataset="c1_words",
+            level_tag="C1"
         )
 
-def run_practice_app(user_name, file_url):
-    data = load_data(file_url)  # Load the dataset
-    total_words = len(data)  # Count available words
+def run_practice_app(user_name, dataset, level_tag):
+    index = get_index(dataset)  # Shared dataset, sorted by SID
+    total_words = len(index)  # Count available words
 
     user_name = st.text_input(f"Type user name ({user_name})")
 
     col1, col2 = st.columns(2)
     with col1:
-        start_sid = st.number_input(f"Start SID (1~{total_words})", min_value=1, max_value=data['SID'].max(), value=1)
+        start_sid = st.number_input(f"Start SID (1~{total_words})", min_value=1, max_value=index.max_sid, value=1)
     with col2:
-        end_sid = st.number_input(f"End SID (1~{total_words})", min_value=1, max_value=data['SID'].max(), value=min(start_sid + 19, data['SID'].max()))
+        end_sid = st.number_input(f"End SID (1~{total_words})", min_value=1, max_value=index.max_sid, value=min(start_sid + 19, index.max_sid))
 
-    filtered_data = data[(data['SID'] >= start_sid) & (data['SID'] <= end_sid)].reset_index(drop=True)
+    filtered_data = index.slice(start_sid, end_sid)
 
     audio_key_prefix = f"audio_{user_name}"
     input_key_prefix = f"input_{user_name}"
 
-    if f'{audio_key_prefix}_data' not in st.session_state:
-        st.session_state[f'{audio_key_prefix}_data'] = {}
+    clips = session_bucket(f'{audio_key_prefix}_clips')  # Widget key -> shared audio cache key, no bytes
+    if not clips and st.session_state.get(f'{audio_key_prefix}_generated', False):
+        # ✅ The ledger dropped this session's clips while it was idle: start over, not an empty sheet
+        st.session_state[f'{audio_key_prefix}_generated'] = False
+        st.session_state.pop(f'{audio_key_prefix}_range_{level_tag}', None)
 
-    if f'{input_key_prefix}_inputs' not in st.session_state:
-        st.session_state[f'{input_key_prefix}_inputs'] = {}
+    prefetch_owner = f"{current_session_id()}/listen_and_spell/{dataset}"
 
-    if st.button(f'🔉 Generate Audio - {file_url[-6:-4]}'):
-        st.session_state[f'{audio_key_prefix}_data'].clear()
-        st.session_state[f'{input_key_prefix}_inputs'].clear()
+    generating = st.button(f'🔉 Generate Audio - {level_tag}')
+    if generating:
+        clips.clear()
         st.session_state[f'{audio_key_prefix}_generated'] = True  
-
+        st.session_state[f'{audio_key_prefix}_range_{level_tag}'] = (start_sid, end_sid)
+        get_prefetcher().claim(prefetch_owner, filtered_data['WORD'])
         for row in filtered_data.itertuples():
-            sid_key = f'{input_key_prefix}_{row.SID}_{file_url[-6:-4]}'  # Ensuring uniqueness
-            st.session_state[f'{input_key_prefix}_inputs'][sid_key] = ""
-            audio_key = f'{audio_key_prefix}_{row.SID}_{file_url[-6:-4]}'
-            st.session_state[f'{audio_key_prefix}_data'][audio_key] = generate_audio(row.WORD)
+            clips[f'{audio_key_prefix}_{row.SID}_{level_tag}'] = audio_key_for(row.WORD)
 
     if st.session_state.get(f'{audio_key_prefix}_generated', False):
+        audio_slots = {}
+        missing = []
+        rows = []
         for row in filtered_data.itertuples():
-            audio_key = f'{audio_key_prefix}_{row.SID}_{file_url[-6:-4]}'
-            sid_key = f'{input_key_prefix}_{row.SID}_{file_url[-6:-4]}'  # Uniqueness fix
+            audio_key = f'{audio_key_prefix}_{row.SID}_{level_tag}'
 
-            if audio_key in st.session_state[f'{audio_key_prefix}_data']:
+            if audio_key in clips:
+                rows.append(row)
                 st.caption(f"SID {row.SID}")  
-                st.audio(st.session_state[f'{audio_key_prefix}_data'][audio_key], format='audio/mp3')
-
-                # Updated text input key to be unique
-                st.text_input("Type the word shown:", key=sid_key, value="", placeholder="Type here...", label_visibility="collapsed")
-
-    if st.button(f'🔑 Check Answers - {file_url[-6:-4]}'):
+                audio_slots[audio_key] = st.empty()  # Filled below as soon as the clip is ready
+                audio = cached_audio(clips[audio_key])
+                if audio is not None:
+                    audio_slots[audio_key].audio(audio_source(audio), format='audio/mp3')
+                else:
+                    missing.append((audio_key, row))
+
+        spelling_sheet(user_name, dataset, rows, input_key_prefix, level_tag)
+
+        # ✅ Synthesize the clips not in the cache concurrently and show each one as it finishes
+        for i, audio, error in generate_audio_batch([row.WORD for _, row in missing]):
+            audio_key, row = missing[i]
+            if error is not None:
+                audio_slots[audio_key].warning(f"Audio for SID {row.SID} is not available: {error}")
+                continue
+            audio_slots[audio_key].audio(audio_source(audio), format='audio/mp3')
+
+        # ✅ Synthesize the likely next batch in the background while the learner answers
+        generated_range = st.session_state.get(f'{audio_key_prefix}_range_{level_tag}')
+        if generated_range == (start_sid, end_sid):
+            upcoming = index.slice(end_sid + 1, 2 * end_sid - start_sid + 1)  # Next window of the same size
+            get_prefetcher().schedule(prefetch_owner, upcoming['WORD'])
+        elif generated_range is not None:
+            get_prefetcher().schedule(prefetch_owner, filtered_data['WORD'])  # Range changed: generated next
+
+@st.fragment
+def spelling_sheet(user_name, dataset, rows, input_key_prefix, level_tag):
+    """Spelling form for the generated words; a check grades and logs it without reloading the clips above."""
+    with st.form(f'{input_key_prefix}_form_{level_tag}'):
+        for row in rows:
+            sid_key = f'{input_key_prefix}_{row.SID}_{level_tag}'  # Uniqueness fix
+            st.text_input(f"SID {row.SID}", key=sid_key, value="", placeholder="Type the word you heard...")
+        checked = st.form_submit_button(f'🔑 Check Answers - {level_tag}')
+
+    if checked:
         correct_count = 0
-        for row in filtered_data.itertuples():
-            sid_key = f'{input_key_prefix}_{row.SID}_{file_url[-6:-4]}'  # Uniqueness fix
+        answers = []
+        user = user_name or ANONYMOUS_PREFIX + current_session_id()
+        for row in rows:
+            sid_key = f'{input_key_prefix}_{row.SID}_{level_tag}'  # Uniqueness fix
             user_input = st.session_state.get(sid_key, '').strip().lower()
             correct = user_input == row.WORD.lower()
             if correct:
                 correct_count += 1
             st.write(f"Word: {row.WORD}, Your Input: {user_input}, Correct: {correct}")
+            answers.append((user, "listen_and_spell", dataset, row.SID, user_input, correct))
+
+        get_answer_log().record_many(answers)  # ✅ Queued; written in the background
 
-        st.write(f"{user_name}: {correct_count}/{len(filtered_data)} correct.")
+        st.write(f"{user_name}: {correct_count}/{len(rows)} correct.")
 
 
 if __name__ == "__main__":
-    main()
+    with page_run("listen_and_spell"):
+        main()
@@ -1,24 +1,8 @@
 import streamlit as st
-from gtts import gTTS
-from io import BytesIO
-import pandas as pd
-
-@st.cache_data
-def load_data(file_url):
-    # Determine the separator based on file extension
-    sep = ',' if file_url.endswith('.csv') else '\t'
-    df = pd.read_csv(file_url, sep=sep)
-    df.columns = [col.strip() for col in df.columns]  # Ensure columns are trimmed of whitespace
-    df['SID'] = df['SID'].apply(pd.to_numeric, errors='coerce').fillna(0).astype(int)
-    return df
-
-def generate_audio(text):
-    """Generate speech audio for a given text using gTTS."""
-    tts = gTTS(text=text, lang='en')
-    audio_file = BytesIO()
-    tts.write_to_fp(audio_file)
-    audio_file.seek(0)
-    return audio_file.getvalue()
+from cefr.audio_server import audio_source
+from cefr.index import get_index
+from cefr.metrics import page_run
+from cefr.tts import audio_key_for, cached_audio, generate_audio_batch
 
 def main():
     st.markdown("### 🎧 Words in Context (WIC) practice")
@@ -27,15 +11,14 @@ def main():
     tab1, tab2 = st.tabs(["💙 Level B", "💜 Level C"])
 
     with tab1:
-        data_url = "https://raw.githubusercontent.com/MK316/CEFR/refs/heads/main/data/B2WICf.csv"
-        run_practice_app("Level B", data_url)
+        run_practice_app("Level B", "b2_wic")
 
     with tab2:
-        data_url = "https://raw.githubusercontent.com/MK316/CEFR/refs/heads/main/data/C1WICff.csv"
-        run_practice_app("Level C", data_url)
+        run_practice_app("Level C", "c1_wic")
 
-def run_practice_app(level, file_url):
-    data = load_data(file_url)
+def run_practice_app(level, dataset):
+    index = get_index(dataset)  # Shared dataset, sorted by SID
+    data = index.frame
     if data is None or data.empty:
         st.error("Failed to load data or data is empty.")
         return
@@ -46,8 +29,8 @@ def run_practice_app(level, file_url):
     # User can input the exact numbers for SID start and end
     col1, col2 = st.columns(2)
     # Ensure the min SID is at least 1
-    min_sid = max(int(data['SID'].min()), 1) if not data.empty else 1
-    max_sid = int(data['SID'].max()) if not data.empty else 1
+    min_sid = max(index.min_sid, 1) if not data.empty else 1
+    max_sid = index.max_sid if not data.empty else 1
     default_start_sid = min_sid
     default_end_sid = min(min_sid + 20, max_sid)
 
@@ -56,16 +39,29 @@ def run_practice_app(level, file_url):
     with col2:
         end_sid = st.number_input(f'End SID (total words: {total_sids})', min_value=min_sid, max_value=max_sid, value=default_end_sid, help=f"Choose an ending SID from 1 to {total_sids}")
 
-    filtered_data = data[(data['SID'] >= start_sid) & (data['SID'] <= end_sid)]
+    filtered_data = index.slice(start_sid, end_sid)
 
     if st.button(f'Generate Audio for {level}'):
-        for index, row in filtered_data.iterrows():
+        audio_slots = {}
+        missing = []
+        for _, row in filtered_data.iterrows():
             audio_key = f"audio_{level}_{row['SID']}"
-            if audio_key not in st.session_state:
-                st.session_state[audio_key] = generate_audio(row['Context'])
             st.caption(f"SID {row['SID']} - {row['WORD']}")
-            st.audio(st.session_state[audio_key], format='audio/mp3', start_time=0)
+            audio_slots[audio_key] = st.empty()  # Filled as soon as the clip is ready
+            audio = cached_audio(audio_key_for(row['Context']))  # Shared across sessions, never copied into session state
+            if audio is not None:
+                audio_slots[audio_key].audio(audio_source(audio), format='audio/mp3', start_time=0)
+            else:
+                missing.append((audio_key, row['Context']))
 
+        # ✅ Synthesize the missing sentences concurrently, showing each one when done
+        for i, audio, error in generate_audio_batch([context for _, context in missing]):
+            audio_key = missing[i][0]
+            if error is not None:
+                audio_slots[audio_key].warning(f"Audio is not available: {error}")
+                continue
+            audio_slots[audio_key].audio(audio_source(audio), format='audio/mp3', start_time=0)
 
 if __name__ == "__main__":
-    main()
+    with page_run("practice_wic"):
+        main()
@@ -1,28 +1,10 @@
 import streamlit as st
-from gtts import gTTS
-from io import BytesIO
-import pandas as pd
-import re
-
-@st.cache_data
-def load_data(file_url):
-    sep = ',' if file_url.endswith('.csv') else '\t'
-    df = pd.read_csv(file_url, sep=sep)
-    df.columns = [col.strip() for col in df.columns]  
-    df['SID'] = df['SID'].apply(pd.to_numeric, errors='coerce').fillna(0).astype(int)
-    return df
-
-def generate_audio(text):
-    """Generate speech audio for a given text using gTTS."""
-    tts = gTTS(text=text, lang='en')
-    audio_file = BytesIO()
-    tts.write_to_fp(audio_file)
-    audio_file.seek(0)
-    return audio_file.getvalue()
-
-def mask_word(sentence, target_word):
-    """Replace the target word in the sentence with '_______'."""
-    return re.sub(rf'\b{re.escape(target_word)}\b', '_______', sentence, flags=re.IGNORECASE)
+from cefr.answer_log import ANONYMOUS_PREFIX, get_answer_log
+from cefr.audio_server import audio_source
+from cefr.index import get_index
+from cefr.metrics import page_run
+from cefr.session import QuizItem, current_session_id, session_bucket
+from cefr.tts import audio_key_for, cached_audio, generate_audio_batch
 
 def main():
     st.markdown("### 🎧 Words in Context (WIC) Quiz")
@@ -33,15 +15,14 @@ def main():
     tab1, tab2 = st.tabs(["💙 Level B", "💜 Level C"])
 
     with tab1:
-        data_url = "https://raw.githubusercontent.com/MK316/CEFR/refs/heads/main/data/B2WICf.csv"
-        run_practice_app("Level B", data_url)
+        run_practice_app("Level B", "b2_wic")
 
     with tab2:
-        data_url = "https://raw.githubusercontent.com/MK316/CEFR/refs/heads/main/data/C1WICff.csv"
-        run_practice_app("Level C", data_url)
+        run_practice_app("Level C", "c1_wic")
 
-def run_practice_app(level, file_url):
-    data = load_data(file_url)
+def run_practice_app(level, dataset):
+    index = get_index(dataset)  # Shared dataset, sorted by SID
+    data = index.frame
     if data.empty:
         st.error("Failed to load data or data is empty.")
         return
@@ -51,74 +32,93 @@ def run_practice_app(level, file_url):
 
     # SID Selection
     col1, col2 = st.columns(2)
-    min_sid = max(int(data['SID'].min()), 1)
-    max_sid = int(data['SID'].max())
+    min_sid = max(index.min_sid, 1)
+    max_sid = index.max_sid
 
     with col1:
         start_sid = st.number_input("Start SID", min_value=min_sid, max_value=max_sid, value=min_sid)
     with col2:
         end_sid = st.number_input("End SID", min_value=min_sid, max_value=max_sid, value=min(start_sid + 19, max_sid))
 
-    filtered_data = data[(data['SID'] >= start_sid) & (data['SID'] <= end_sid)]
+    filtered_data = index.slice(start_sid, end_sid)
 
     # **Ensure session state for storing generated words and user inputs**
-    if f"{level}_generated_items" not in st.session_state:
-        st.session_state[f"{level}_generated_items"] = {}
+    generated_items = session_bucket(f"{level}_generated_items")  # Compact records; audio stays in the shared cache
 
     if f"{level}_user_inputs" not in st.session_state:
         st.session_state[f"{level}_user_inputs"] = {}
 
     # Button to generate audio and text inputs
     if st.button(f'🔉 Generate Audio for {level}'):
-        for _, row in filtered_data.iterrows():
-            sid_key = f"{level}_input_{row['SID']}"
-            audio_key = f"audio_{level}_{row['SID']}"
-            sentence_key = f"sentence_{level}_{row['SID']}"
-
-            if sid_key not in st.session_state[f"{level}_generated_items"]:
-                # Store masked sentence
-                masked_sentence = mask_word(row['Context'], row['WORD'])
-                st.session_state[f"{level}_generated_items"][sid_key] = {
-                    "sid": row['SID'],
-                    "audio": generate_audio(row['Context']),
-                    "masked_sentence": masked_sentence,
-                    "correct_word": row['WORD']
-                }
+        lo, _ = index.bounds(start_sid, end_sid)
+        for position, row in enumerate(filtered_data.itertuples(index=False), start=lo):
+            sid_key = f"{level}_input_{row.SID}"
+
+            if sid_key not in generated_items:
+                generated_items[sid_key] = QuizItem(row.SID, position, audio_key_for(row.Context))
 
             # Ensure user input persists
             if sid_key not in st.session_state[f"{level}_user_inputs"]:
                 st.session_state[f"{level}_user_inputs"][sid_key] = ""
 
     # **Display Generated Items Persistently**
-    if st.session_state[f"{level}_generated_items"]:
-        for sid_key, item in st.session_state[f"{level}_generated_items"].items():
-            st.caption(f"SID {item['sid']} - {item['masked_sentence']}")
-            st.audio(item["audio"], format='audio/mp3')
-
+    if generated_items:
+        audio_slots, missing = {}, []
+        for number, (sid_key, item) in enumerate(generated_items.items(), start=1):
+            st.caption(f"{number}. SID {item.sid} - {data.at[item.row, 'Masked']}")
+            audio_slots[sid_key] = st.empty()
+            audio = cached_audio(item.audio_key)
+            if audio is not None:
+                audio_slots[sid_key].audio(audio_source(audio), format='audio/mp3')
+            else:
+                missing.append((sid_key, item))  # Not synthesized yet, or evicted from the cache
+
+        answer_sheet(level, dataset, data, generated_items)
+
+        # ✅ Fill in missing clips concurrently, each one as soon as it is ready
+        for i, audio, error in generate_audio_batch([data.at[item.row, 'Context'] for _, item in missing]):
+            sid_key, item = missing[i]
+            if error is not None:
+                audio_slots[sid_key].warning(f"Audio is not available: {error}")
+                continue
+            audio_slots[sid_key].audio(audio_source(audio), format='audio/mp3')
+
+@st.fragment
+def answer_sheet(level, dataset, data, generated_items):
+    """Missing-word form of the practice quiz; a check reruns only this form, grades it and logs the answers."""
+    user_inputs = st.session_state[f"{level}_user_inputs"]
+    with st.form(f"answers_{level}"):
+        for number, (sid_key, item) in enumerate(generated_items.items(), start=1):
             # Ensure user input field persists
-            st.session_state[f"{level}_user_inputs"][sid_key] = st.text_input(
-                "Type the missing word:", 
+            user_inputs[sid_key] = st.text_input(
+                f"{number}. Type the missing word:", 
                 key=sid_key, 
-                value=st.session_state[f"{level}_user_inputs"][sid_key], 
+                value=user_inputs.get(sid_key, ""), 
                 placeholder="Type here..."
             )
+        checked = st.form_submit_button(f'🔑 Check Answers - {level}')
 
     # **Check Answers Button**
-    if st.button(f'🔑 Check Answers - {level}'):
+    if checked:
         correct_count = 0
         incorrect_sentences = []
+        answers = []
+        user = ANONYMOUS_PREFIX + current_session_id()  # This page does not ask who is practicing
 
-        for sid_key, item in st.session_state[f"{level}_generated_items"].items():
-            user_input = st.session_state[f"{level}_user_inputs"].get(sid_key, "").strip().lower()
-            correct_word = item["correct_word"].lower()
+        for sid_key, item in generated_items.items():
+            user_input = user_inputs.get(sid_key, "").strip().lower()
+            correct_word = data.at[item.row, 'WORD'].lower()
 
             if user_input == correct_word:
                 correct_count += 1
             else:
-                incorrect_sentences.append(f"SID {item['sid']} - {item['masked_sentence']}")
+                incorrect_sentences.append(f"SID {item.sid} - {data.at[item.row, 'Masked']}")
+            answers.append((user, "quiz_practice", dataset, item.sid, user_input, user_input == correct_word))
+
+        get_answer_log().record_many(answers)  # ✅ Queued; written in the background
 
         # Display results
-        st.write(f"✅ Correct: {correct_count} / {len(st.session_state[f'{level}_generated_items'])}")
+        st.write(f"✅ Correct: {correct_count} / {len(generated_items)}")
 
         if incorrect_sentences:
             st.markdown("### ❌ Incorrect Sentences (Try Again)")
@@ -126,4 +126,5 @@ def run_practice_app(level, file_url):
                 st.write(sentence)
 
 if __name__ == "__main__":
-    main()
+    with page_run("quiz_practice"):
+        main()
@@ -1,29 +1,12 @@
 import streamlit as st
-from gtts import gTTS
-from io import BytesIO
-import pandas as pd
-import re
-import random
-
-@st.cache_data
-def load_data(file_url):
-    sep = ',' if file_url.endswith('.csv') else '\t'
-    df = pd.read_csv(file_url, sep=sep)
-    df.columns = [col.strip() for col in df.columns]  
-    df['SID'] = df['SID'].apply(pd.to_numeric, errors='coerce').fillna(0).astype(int)
-    return df
-
-def generate_audio(text):
-    """Generate speech audio for a given text using gTTS."""
-    tts = gTTS(text=text, lang='en')
-    audio_file = BytesIO()
-    tts.write_to_fp(audio_file)
-    audio_file.seek(0)
-    return audio_file.getvalue()
-
-def mask_word(sentence, target_word):
-    """Replace the target word in the sentence with '_______'."""
-    return re.sub(rf'\b{re.escape(target_word)}\b', '_______', sentence, flags=re.IGNORECASE)
+from cefr.answer_log import get_answer_log
+from cefr.audio_server import audio_source
+from cefr.index import get_index
+from cefr.metrics import page_run
+from cefr.prefetch import get_prefetcher
+from cefr.scheduler import get_scheduler
+from cefr.session import QuizItem, current_session_id, session_bucket
+from cefr.tts import audio_key_for, cached_audio, generate_audio_batch
 
 def main():
     st.markdown("### 💦 WIC Quiz (Randomized)")
@@ -37,15 +20,14 @@ def main():
         tab1, tab2 = st.tabs(["💙 Level B", "💜 Level C"])
 
         with tab1:
-            data_url = "https://raw.githubusercontent.com/MK316/CEFR/refs/heads/main/data/B2WICf.csv"
-            run_practice_app("Level B", data_url, user_id)
+            run_practice_app("Level B", "b2_wic", user_id)
 
         with tab2:
-            data_url = "https://raw.githubusercontent.com/MK316/CEFR/refs/heads/main/data/C1WICff.csv"
-            run_practice_app("Level C", data_url, user_id)
+            run_practice_app("Level C", "c1_wic", user_id)
 
-def run_practice_app(level, file_url, user_id):
-    data = load_data(file_url)
+def run_practice_app(level, dataset, user_id):
+    index = get_index(dataset)  # Shared dataset, sorted by SID
+    data = index.frame
     if data.empty:
         st.error("Failed to load data or data is empty.")
         return
@@ -55,8 +37,8 @@ def run_practice_app(level, file_url, user_id):
 
     # SID Selection
     col1, col2, col3 = st.columns(3)
-    min_sid = max(int(data['SID'].min()), 1)
-    max_sid = int(data['SID'].max())
+    min_sid = max(index.min_sid, 1)
+    max_sid = index.max_sid
 
     with col1:
         start_sid = st.number_input(f"Start SID ({level})", min_value=min_sid, max_value=max_sid, value=min_sid, key=f"start_sid_{level}")
@@ -65,68 +47,101 @@ def run_practice_app(level, file_url, user_id):
     with col3:
         num_words = st.number_input(f"Number of words ({level})", min_value=1, max_value=20, value=10, key=f"num_words_{level}", help="Select how many words to practice.")
 
-    filtered_data = data[(data['SID'] >= start_sid) & (data['SID'] <= end_sid)]
-
-    # Ensure session state for generated words
-    if f"{user_id}_{level}_generated_items" not in st.session_state:
-        st.session_state[f"{user_id}_{level}_generated_items"] = {}
+    # Ensure session state for generated words (compact records; audio stays in the shared cache)
+    generated_items = session_bucket(f"{user_id}_{level}_generated_items")
+    upcoming = session_bucket(f"{user_id}_{level}_upcoming")  # Next batch being prefetched
+    prefetch_owner = f"{current_session_id()}/quiz_random/{dataset}"
+    settings = (start_sid, end_sid, num_words)
 
     if f"{user_id}_{level}_user_inputs" not in st.session_state:
         st.session_state[f"{user_id}_{level}_user_inputs"] = {}
 
     # **Button to generate quiz**
     if st.button(f'🔉 Generate Quiz for {level}'):
-        # Select random words based on user input
-        selected_words = random.sample(filtered_data.to_dict(orient="records"), min(num_words, len(filtered_data)))
-        st.session_state[f"{user_id}_{level}_generated_items"] = {}
-
-        for row in selected_words:
-            sid_key = f"{user_id}_{level}_input_{row['SID']}"
-            audio_key = f"{user_id}_audio_{level}_{row['SID']}"
+        # Select words for this learner: missed and due items first, then new ones (prefetched if possible)
+        prefer = upcoming.get("positions", ()) if upcoming.get("settings") == settings else ()
+        positions = get_scheduler(user_id, dataset).draw(index, start_sid, end_sid, num_words, prefer=prefer)
+        get_prefetcher().claim(prefetch_owner, [data.at[position, 'Context'] for position in positions])
+        generated_items.clear()
+        upcoming.clear()
 
-            if sid_key not in st.session_state[f"{user_id}_{level}_generated_items"]:
-                masked_sentence = mask_word(row['Context'], row['WORD'])
+        for position in positions:
+            sid = int(data.at[position, 'SID'])
+            sid_key = f"{user_id}_{level}_input_{sid}"
 
-                st.session_state[f"{user_id}_{level}_generated_items"][sid_key] = {
-                    "audio": generate_audio(row['Context']),
-                    "masked_sentence": masked_sentence,
-                    "correct_word": row['WORD']
-                }
+            if sid_key not in generated_items:
+                generated_items[sid_key] = QuizItem(sid, position, audio_key_for(data.at[position, 'Context']))
 
             # Ensure user input persists
             if sid_key not in st.session_state[f"{user_id}_{level}_user_inputs"]:
                 st.session_state[f"{user_id}_{level}_user_inputs"][sid_key] = ""
 
     # **Display Questions Only After Generating Quiz**
-    if f"{user_id}_{level}_generated_items" in st.session_state and st.session_state[f"{user_id}_{level}_generated_items"]:
-        for sid_key, item in st.session_state[f"{user_id}_{level}_generated_items"].items():
-            st.caption(f"{item['masked_sentence']}")
-            st.audio(item["audio"], format='audio/mp3')
-
+    if generated_items:
+        audio_slots, missing = {}, []
+        for number, (sid_key, item) in enumerate(generated_items.items(), start=1):
+            st.caption(f"{number}. {data.at[item.row, 'Masked']}")
+            audio_slots[sid_key] = st.empty()
+            audio = cached_audio(item.audio_key)
+            if audio is not None:
+                audio_slots[sid_key].audio(audio_source(audio), format='audio/mp3')
+            else:
+                missing.append((sid_key, item))  # Not synthesized yet, or evicted from the cache
+
+        answer_sheet(level, dataset, data, user_id, generated_items)
+
+        # ✅ Fill in missing clips concurrently, each one as soon as it is ready
+        for i, audio, error in generate_audio_batch([data.at[item.row, 'Context'] for _, item in missing]):
+            sid_key, item = missing[i]
+            if error is not None:
+                audio_slots[sid_key].warning(f"Audio is not available: {error}")
+                continue
+            audio_slots[sid_key].audio(audio_source(audio), format='audio/mp3')
+
+        # ✅ Synthesize the likely next batch in the background while the learner answers
+        if upcoming.get("settings") != settings:
+            current = [item.sid for item in generated_items.values()]
+            upcoming["settings"] = settings
+            upcoming["positions"] = get_scheduler(user_id, dataset).new_positions(
+                index, start_sid, end_sid, num_words, exclude=current)
+        get_prefetcher().schedule(prefetch_owner, [data.at[position, 'Context'] for position in upcoming["positions"]])
+
+@st.fragment
+def answer_sheet(level, dataset, data, user_id, generated_items):
+    """Missing-word form of the drawn quiz; a check grades it and updates the learner's review schedule."""
+    user_inputs = st.session_state[f"{user_id}_{level}_user_inputs"]
+    with st.form(f"answers_{user_id}_{level}"):
+        for number, (sid_key, item) in enumerate(generated_items.items(), start=1):
             # Persistent text input
-            st.session_state[f"{user_id}_{level}_user_inputs"][sid_key] = st.text_input(
-                "Type the missing word:", 
+            user_inputs[sid_key] = st.text_input(
+                f"{number}. Type the missing word:", 
                 key=sid_key, 
-                value=st.session_state[f"{user_id}_{level}_user_inputs"][sid_key], 
+                value=user_inputs.get(sid_key, ""), 
                 placeholder="Type here..."
             )
+        checked = st.form_submit_button(f'🔑 Check Answers - {level}')
 
     # **Check Answers Button**
-    if st.button(f'🔑 Check Answers - {level}'):
+    if checked:
         correct_count = 0
         incorrect_sentences = []
+        answers = []
 
-        for sid_key, item in st.session_state[f"{user_id}_{level}_generated_items"].items():
-            user_input = st.session_state[f"{user_id}_{level}_user_inputs"].get(sid_key, "").strip().lower()
-            correct_word = item["correct_word"].lower()
+        for sid_key, item in generated_items.items():
+            user_input = user_inputs.get(sid_key, "").strip().lower()
+            correct_word = data.at[item.row, 'WORD'].lower()
 
             if user_input == correct_word:
                 correct_count += 1
             else:
-                incorrect_sentences.append(f"{item['masked_sentence']}")
+                incorrect_sentences.append(f"{data.at[item.row, 'Masked']}")
+            answers.append((user_id, "quiz_random", dataset, item.sid, user_input, user_input == correct_word))
+
+        get_answer_log().record_many(answers)  # ✅ Queued; written in the background
+        get_scheduler(user_id, dataset).record([(sid, correct) for _, _, _, sid, _, correct in answers])
 
         # Display results
-        st.write(f"✅ Correct: {correct_count} / {len(st.session_state[f'{user_id}_{level}_generated_items'])}")
+        st.write(f"✅ Correct: {correct_count} / {len(generated_items)}")
 
         if incorrect_sentences:
             st.markdown("### ❌ Incorrect Sentences (Try Again)")
@@ -134,4 +149,5 @@ def run_practice_app(level, file_url, user_id):
                 st.write(sentence)
 
 if __name__ == "__main__":
-    main()
+    with page_run("quiz_random"):
+        main()
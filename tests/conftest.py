@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Settings are read at import: give the tests their own state folder, no bundle and no rate limit
+_state = tempfile.mkdtemp(prefix="cefr-tests-")
+os.environ.update(CEFR_STATE_DIR=_state, CEFR_AUDIO_BUNDLE=os.path.join(_state, "no-bundle"),
+                  CEFR_TTS_RATE="0", CEFR_PREFETCH="0")
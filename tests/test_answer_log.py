@@ -0,0 +1,14 @@
+from cefr.answer_log import ANONYMOUS, AnswerLog
+
+
+def test_unnamed_sessions_are_one_anonymous_student(tmp_path):
+    log = AnswerLog(str(tmp_path / "answers.sqlite3"))
+    log.record_many([("ana", "quiz", "b2_wic", 1, "a", True),
+                     ("session:1", "quiz", "b2_wic", 1, "a", False),
+                     ("session:2", "quiz", "b2_wic", 2, "b", True)], ts=1000.0)
+    assert log.flush(timeout=5)
+
+    assert log.totals()["b2_wic"] == (3, 2, 1)   # only named students are counted
+    assert sorted(user for user, *_ in log.students("b2_wic")) == ["ana", ANONYMOUS]
+    assert [row for row in log.students("b2_wic") if row[0] == ANONYMOUS] == [(ANONYMOUS, 2, 1, 1000.0)]
+    assert log.history("session:1", "b2_wic") == [(1, 0, 1000.0)]   # the answers keep their session
@@ -0,0 +1,125 @@
+import http.client
+import os
+import socket
+
+import pytest
+
+from cefr import audio_server
+
+
+def clip(n):
+    return bytes([n]) * 1000
+
+
+def stored(folder):
+    return sorted(name for name in os.listdir(folder) if name.endswith(".mp3"))
+
+
+def test_publish_is_content_addressed(tmp_path):
+    digest = audio_server.publish(clip(1), str(tmp_path), max_bytes=0)
+    assert audio_server.publish(clip(1), str(tmp_path), max_bytes=0) == digest
+    assert stored(tmp_path) == [digest + ".mp3"]
+
+
+def test_prune_drops_least_recently_published_clips(tmp_path):
+    folder = str(tmp_path)
+    digests = [audio_server.publish(clip(n), folder, max_bytes=0) for n in range(5)]
+    for age, digest in enumerate(reversed(digests)):   # clip 0 is the oldest
+        os.utime(os.path.join(folder, digest + ".mp3"), (1000 - age, 1000 - age))
+    audio_server.publish(clip(0), folder, max_bytes=0)   # used again: now the newest
+
+    assert audio_server.prune(folder, max_bytes=3000) == 2
+    assert stored(folder) == sorted(d + ".mp3" for d in [digests[0], digests[3], digests[4]])
+
+
+def test_publish_keeps_the_folder_under_its_cap(tmp_path):
+    folder = str(tmp_path)
+    for n in range(3 * audio_server.PRUNE_EVERY):
+        audio_server.publish(clip(n % 256) + n.to_bytes(2, "big"), folder, max_bytes=20_000)
+    # Checked every PRUNE_EVERY clips: never more than that over the cap
+    assert sum(os.path.getsize(os.path.join(folder, name)) for name in stored(folder)) <= \
+        20_000 + audio_server.PRUNE_EVERY * 1002
+    assert audio_server.stats["pruned"] > 0
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=900-", (900, 999)),
+    ("bytes=900-5000", (900, 999)),    # end past EOF is clipped
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),         # suffix longer than the clip: all of it
+    ("bytes=5-2", None),               # reversed: ignored
+    ("bytes=0-1,5-6", None),           # multiple ranges: ignored
+    ("items=0-1", None),
+    ("bytes=-", None),
+])
+def test_parse_range(header, expected):
+    assert audio_server.parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=-0", "bytes=1000-", "bytes=5000-6000"])
+def test_parse_range_not_satisfiable(header):
+    with pytest.raises(ValueError):
+        audio_server.parse_range(header, 1000)
+
+
+@pytest.fixture
+def server(tmp_path):
+    with socket.socket() as probe:   # a free port for this test's server
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = audio_server.AudioServer(host="127.0.0.1", port=port, folder=str(tmp_path), public_url="")
+    assert server.serving
+    yield server
+    server.close()
+
+
+def get(server, path, **headers):
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    try:
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+def test_server_sends_clip_with_validators(server):
+    data = clip(7)
+    path = f"/audio/{audio_server.publish(data, server.folder, max_bytes=0)}.mp3"
+    status, headers, body = get(server, path)
+    assert status == 200 and body == data
+    assert headers["ETag"] == f'"{path[7:-4]}"'
+    assert "immutable" in headers["Cache-Control"]
+    assert headers["Accept-Ranges"] == "bytes"
+
+
+def test_server_answers_ranges_and_revalidation(server):
+    data = bytes(range(256)) * 4
+    digest = audio_server.publish(data, server.folder, max_bytes=0)
+    path, etag = f"/audio/{digest}.mp3", f'"{digest}"'
+
+    status, headers, body = get(server, path, Range="bytes=10-19")
+    assert (status, headers["Content-Range"], body) == (206, "bytes 10-19/1024", data[10:20])
+
+    status, headers, body = get(server, path, Range="bytes=2000-")
+    assert (status, headers["Content-Range"], body) == (416, "bytes */1024", b"")
+
+    status, _, body = get(server, path, Range="bytes=10-19", **{"If-Range": '"something-else"'})
+    assert (status, body) == (200, data)   # the clip changed as far as the client knows: send all of it
+
+    status, _, body = get(server, path, Range="bytes=10-19", **{"If-Range": etag})
+    assert (status, body) == (206, data[10:20])
+
+    for tag in (etag, "*", f'"other", {etag}'):
+        status, headers, body = get(server, path, **{"If-None-Match": tag})
+        assert (status, body) == (304, b"")
+        assert headers["ETag"] == etag
+    assert get(server, path, **{"If-None-Match": '"other"'})[0] == 200
+
+
+def test_server_rejects_unknown_paths(server):
+    assert get(server, f"/audio/{'0' * 64}.mp3")[0] == 404
+    assert get(server, "/audio/../secrets.mp3")[0] == 404
+    status, headers, _ = get(server, audio_server.PING_PATH)
+    assert status == 200 and headers[audio_server.FOLDER_HEADER] == server.folder_id
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from cefr.cloze import BLANK, add_cloze_columns, inflections, mask_sentence
+
+
+@pytest.mark.parametrize("headword, forms", [
+    ("absorb", {"absorb", "absorbs", "absorbed", "absorbing"}),
+    ("plan", {"plans", "planned", "planning"}),
+    ("study", {"studies", "studied", "studying"}),
+    ("seek", {"seeks", "sought"}),
+    ("harbor", {"harbour", "harbours"}),
+    ("bass1", {"bass", "basses"}),   # the sense number is not part of the word
+])
+def test_inflections(headword, forms):
+    assert forms <= inflections(headword)
+
+
+def test_inflections_are_lowercase():
+    assert inflections(" Absorb ") == inflections("absorb")
+
+
+def test_mask_sentence_blanks_an_inflected_form():
+    assert mask_sentence("The sponge absorbs water.", "absorb") == (f"The sponge {BLANK} water.", 11)
+
+
+def test_mask_sentence_blanks_every_form():
+    masked, position = mask_sentence("He planned and plans a plan.", "plan")
+    assert masked == f"He {BLANK} and {BLANK} a {BLANK}."
+    assert position == 3   # the first blank
+
+
+def test_mask_sentence_blanks_the_headword_inside_a_compound():
+    assert mask_sentence("A long-term view of the term.", "term") == (f"A long-{BLANK} view of the {BLANK}.", 7)
+
+
+def test_mask_sentence_without_the_headword_is_unchanged():
+    assert mask_sentence("Nothing here.", "absorb") == ("Nothing here.", -1)
+    assert mask_sentence("The absorbent cloth.", "absorb") == ("The absorbent cloth.", -1)   # whole tokens only
+
+
+def test_add_cloze_columns():
+    df = pd.DataFrame({"WORD": ["absorb", "plan"], "Context": ["It absorbed it.", "No match."]})
+    result = add_cloze_columns(df)
+    assert list(result["Masked"]) == [f"It {BLANK} it.", "No match."]
+    assert list(result["BlankPos"]) == [3, -1]
+    assert result["BlankPos"].dtype == "int32"
+    assert "Masked" not in df   # the input frame is left alone
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+from cefr.columnar import Table, write_table
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        "SID": pd.array([3, -1, 2_000_000_000], dtype="int32"),
+        "POS": pd.Categorical(["verb", "noun", "verb"]),
+        "WORD": ["absorb", "naïve", ""],
+        "Context": ["The sponge absorbs water.", "Ça va — “quoted”.", "x" * 10_000],
+    })
+
+
+@pytest.mark.parametrize("shared", [True, False])
+def test_round_trip(tmp_path, frame, shared):
+    path = tmp_path / "table.col"
+    write_table(path, frame, source_sha256="abc")
+    table = Table(path)
+    assert table.rows == 3 and table.header["source_sha256"] == "abc"
+    assert "cloze_sha256" not in table.header
+
+    result = table.to_frame(shared=shared)
+    assert list(result.columns) == list(frame.columns)
+    assert result["SID"].dtype == "int32"
+    assert isinstance(result["POS"].dtype, pd.CategoricalDtype)
+    assert list(result["POS"].cat.categories) == ["noun", "verb"]
+    for name in frame.columns:
+        assert list(result[name]) == list(frame[name])
+
+
+def test_shared_strings_are_arrow_backed(tmp_path, frame):
+    path = tmp_path / "table.col"
+    write_table(path, frame)
+    assert isinstance(Table(path).to_frame(shared=True)["WORD"].dtype, pd.ArrowDtype)
+
+
+def test_cells_and_missing_strings(tmp_path):
+    path = tmp_path / "table.col"
+    write_table(path, pd.DataFrame({"WORD": ["a", None, "ü"]}), cloze_sha256="def")
+    table = Table(path)
+    assert table.header["cloze_sha256"] == "def"
+    assert [table.string("WORD", row) for row in range(3)] == ["a", "", "ü"]
+
+
+def test_empty_table(tmp_path):
+    path = tmp_path / "table.col"
+    write_table(path, pd.DataFrame({"SID": pd.array([], dtype="int32"), "WORD": pd.Series([], dtype=str)}))
+    for shared in (True, False):
+        assert len(Table(path).to_frame(shared=shared)) == 0
+
+
+def test_not_a_table(tmp_path):
+    path = tmp_path / "table.col"
+    path.write_bytes(b"something else entirely")
+    with pytest.raises(ValueError):
+        Table(path)
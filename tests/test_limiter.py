@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from cefr.limiter import FairLimiter, RateLimited
+
+
+class FakeClock:
+    """Monotonic time that only moves when the test says so."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_tokens_go_round_robin_across_sessions():
+    clock = FakeClock()
+    limiter = FairLimiter(rate=8, burst=1, queue_timeout=1000, clock=clock)
+    limiter.acquire("warm-up")   # the bucket is empty from here on
+
+    granted, lock = [], threading.Lock()
+
+    def request(session):
+        limiter.acquire(session)
+        with lock:
+            granted.append(session)
+
+    threads = []
+    for session in ["a", "a", "a", "a", "b", "c"]:   # a queues four requests before b and c ask for one
+        threads.append(threading.Thread(target=request, args=(session,), daemon=True))
+        threads[-1].start()
+        wait_for(lambda: limiter.snapshot()["waiting"] == len(threads))
+
+    for count in range(1, len(threads) + 1):
+        clock.now += 0.125   # one token (exact in binary, so no token is a hair short)
+        wait_for(lambda: len(granted) == count)
+    for thread in threads:
+        thread.join(1)
+
+    assert granted == ["a", "b", "c", "a", "a", "a"]
+    assert limiter.snapshot()["waiting"] == 0
+
+
+def test_wait_over_queue_timeout_raises_and_leaves_the_queue():
+    clock = FakeClock()
+    limiter = FairLimiter(rate=0.1, burst=1, queue_timeout=0.5, clock=clock)   # a token every 10 s
+    limiter.acquire("a")
+
+    errors = []
+
+    def request():
+        try:
+            limiter.acquire("b")
+        except RateLimited as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=request, daemon=True)
+    thread.start()
+    wait_for(lambda: limiter.snapshot()["waiting"] == 1)
+    clock.now += 1   # past the deadline, a tenth of a token later
+    thread.join(5)
+    assert len(errors) == 1
+    assert limiter.snapshot()["waiting"] == 0
+    assert limiter.stats["timeouts"] == 1
+
+
+@pytest.mark.parametrize("rate", [0, -1])
+def test_no_rate_means_no_wait(rate):
+    limiter = FairLimiter(rate=rate, burst=1)
+    assert [limiter.acquire("a") for _ in range(100)] == [0.0] * 100
@@ -0,0 +1,73 @@
+import pytest
+
+from cefr.mp3 import (FrameHeader, Playlist, silence_frames, silent_frame, split_frames, split_on_silence,
+                      trim_silence)
+
+# MPEG-2, Layer III, 32 kbit/s, 24 kHz, mono (gTTS): 24 ms frames
+HEADER = FrameHeader(0xFFE00000 | 2 << 19 | 1 << 17 | 1 << 16 | 4 << 12 | 1 << 10 | 3 << 6)
+QUIET = silent_frame(HEADER)
+# Same format with big_values > 0 and no bit reservoir: a sounding frame
+LOUD = QUIET[:4] + ((300 << 51) | (100 << 42)).to_bytes(9, "big") + b"\x55" * (len(QUIET) - 13)
+ID3 = b"ID3\x03\x00\x00\x00\x00\x00\x04" + b"\0" * 4
+
+
+def frames(data):
+    return [frame for _, frame in split_frames(data)]
+
+
+def test_split_frames_skips_tags():
+    assert frames(ID3 + QUIET + LOUD) == [QUIET, LOUD]
+
+
+def test_trim_silence_keeps_pad_at_both_ends():
+    data = QUIET * 20 + LOUD * 3 + QUIET * 20
+    assert frames(trim_silence(data, pad=0.048)) == [QUIET] * 2 + [LOUD] * 3 + [QUIET] * 2
+    assert frames(trim_silence(data, pad=0)) == [LOUD] * 3
+
+
+def test_trim_silence_leaves_all_silent_or_untrimmable_clips_alone():
+    assert trim_silence(QUIET * 10) == QUIET * 10
+    assert trim_silence(LOUD * 3) == LOUD * 3
+
+
+def test_split_on_silence_cuts_at_long_pauses():
+    short, long = QUIET * 5, QUIET * 25   # 0.12 s and 0.6 s
+    data = LOUD * 2 + long + LOUD + short + LOUD + long + LOUD * 3
+    clips = split_on_silence(data, 3, min_silence=0.5)
+    assert [frames(trim_silence(clip, pad=0)) for clip in clips] == \
+        [[LOUD] * 2, [LOUD] + [QUIET] * 5 + [LOUD], [LOUD] * 3]
+
+
+@pytest.mark.parametrize("count", [2, 4])
+def test_split_on_silence_needs_exactly_count_minus_one_pauses(count):
+    data = LOUD + QUIET * 25 + LOUD + QUIET * 25 + LOUD
+    assert split_on_silence(data, count, min_silence=0.5) is None
+
+
+def test_split_on_silence_of_silence():
+    assert split_on_silence(QUIET * 50, 2, min_silence=0.5) is None
+
+
+def test_silence_frames_are_generated_without_a_silence_file(tmp_path):
+    assert silence_frames(0.24, HEADER, tmp_path / "missing.mp3") == [QUIET] * 10
+    assert silence_frames(0, HEADER, tmp_path / "missing.mp3") == []
+
+
+def test_silence_frames_reuse_a_silence_file_in_the_same_format(tmp_path):
+    path = tmp_path / "silence.mp3"
+    path.write_bytes(ID3 + LOUD + QUIET)   # not really silent: tells its frames from generated ones
+    assert silence_frames(0.12, HEADER, path) == [LOUD, QUIET, LOUD, QUIET, LOUD]
+
+    mpeg1 = silent_frame(FrameHeader(0xFFE00000 | 3 << 19 | 1 << 17 | 1 << 16 | 9 << 12 | 3 << 6))
+    path.write_bytes(mpeg1 * 4)   # another format: not usable
+    assert silence_frames(0.12, HEADER, path) == [QUIET] * 5
+
+
+def test_playlist_from_an_item_on():
+    playlist = Playlist(gap=0.048)
+    for label in "abc":
+        playlist.add(label, ID3 + LOUD * 2)
+    assert [start for _, start, _ in playlist.items] == pytest.approx([0, 0.096, 0.192])
+    assert frames(playlist.getvalue()) == [LOUD] * 2 + ([QUIET] * 2 + [LOUD] * 2) * 2
+    assert frames(playlist.getvalue(1)) == [LOUD] * 2 + [QUIET] * 2 + [LOUD] * 2
+    assert playlist.getvalue(3) == b""
@@ -0,0 +1,73 @@
+import random
+
+import numpy as np
+import pytest
+
+from cefr.scheduler import BASE_SECONDS, ReviewScheduler
+
+
+class Index:
+    """The part of ``WordlistIndex`` the scheduler uses, over SIDs 1..n."""
+
+    def __init__(self, n):
+        self.sids = np.arange(1, n + 1)
+
+    def bounds(self, start_sid, end_sid):
+        lo = int(self.sids.searchsorted(start_sid, side="left"))
+        return lo, max(lo, int(self.sids.searchsorted(end_sid, side="right")))
+
+
+INDEX = Index(500)
+
+
+def sids(positions):
+    return [int(INDEX.sids[position]) for position in positions]
+
+
+def test_due_items_come_first():
+    scheduler = ReviewScheduler([(sid, sid % 5 != 0, 0.0) for sid in range(1, 401)])   # every fifth missed
+    drawn = sids(scheduler.draw(INDEX, 1, 500, 10, now=1.0, rng=random.Random(1)))
+    assert len(set(drawn)) == 10 and all(sid % 5 == 0 for sid in drawn)
+
+
+def test_due_items_are_weighted_by_errors():
+    rng = random.Random(2)
+    scheduler = ReviewScheduler([(1, False, 0.0)] * 9 + [(sid, False, 0.0) for sid in range(2, 51)])
+    hits = sum(1 in sids(scheduler.draw(INDEX, 1, 50, 1, now=1.0, rng=rng)) for _ in range(2000))
+    assert 0.07 < hits / 2000 < 0.12   # weight 10 out of 10 + 49 * 2: 0.093
+
+
+def test_draw_leaves_undrawn_items_and_other_ranges_alone():
+    scheduler = ReviewScheduler([(sid, False, 0.0) for sid in range(1, 101)])
+    drawn = sids(scheduler.draw(INDEX, 41, 60, 30, now=1.0, rng=random.Random(3)))
+    assert sorted(sid for sid in drawn if sid <= 60) == list(range(41, 61))
+    assert all(sid > 100 for sid in drawn if sid > 60)   # then new items
+    again = sids(scheduler.draw(INDEX, 1, 100, 100, now=1.0, rng=random.Random(4)))
+    assert sorted(again) == list(range(1, 101))   # still due: nothing was answered
+
+
+def test_new_items_when_nothing_is_due():
+    scheduler = ReviewScheduler([(sid, True, 0.0) for sid in range(1, 491)])
+    drawn = sids(scheduler.draw(INDEX, 1, 500, 15, now=1.0, rng=random.Random(5)))
+    assert sorted(sid for sid in drawn if sid > 490) == list(range(491, 501))
+    assert len(set(drawn)) == 15   # then the items due soonest
+
+
+@pytest.mark.parametrize("answered", [0, 250, 490])
+def test_new_positions(answered):
+    scheduler = ReviewScheduler([(sid, True, 0.0) for sid in range(1, answered + 1)])
+    exclude = [answered + 1, answered + 2, 1000]
+    new = sids(scheduler.new_positions(INDEX, 1, 500, 20, exclude=exclude, rng=random.Random(6)))
+    assert len(set(new)) == min(20, 500 - answered - 2)
+    assert all(answered + 2 < sid <= 500 for sid in new)
+
+
+def test_answers_reschedule_items():
+    scheduler = ReviewScheduler()
+    scheduler.record([(7, False)], ts=0.0)
+    assert sids(scheduler.draw(INDEX, 7, 7, 1, now=0.0)) == [7]
+    scheduler.record([(7, True)], ts=0.0)
+    scheduler.record([(7, True)], ts=0.0)   # streak 2: due again after two base waits
+    assert len(scheduler) == 1
+    assert 7 not in sids(scheduler.draw(INDEX, 1, 10, 9, now=2 * BASE_SECONDS - 1, rng=random.Random(7)))
+    assert sids(scheduler.draw(INDEX, 1, 10, 1, now=2 * BASE_SECONDS)) == [7]
@@ -0,0 +1,105 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from cefr import metrics, tts
+from cefr.backends import Backend
+from cefr.mp3 import FrameHeader, silent_frame
+
+CLIP = silent_frame(FrameHeader(0xFFE00000 | 2 << 19 | 1 << 17 | 1 << 16 | 4 << 12 | 1 << 10 | 3 << 6)) * 20
+
+
+class GateBackend(Backend):
+    """Local backend whose calls block until the test opens the gate, then return ``CLIP`` or raise."""
+
+    name = tts.ENGINE
+
+    def __init__(self, error=None):
+        self.error = error
+        self.gate = threading.Event()
+        self.calls = []   # texts, in call order
+        self._lock = threading.Lock()
+
+    def synthesize(self, text, lang="en", timeout=None):
+        with self._lock:
+            self.calls.append(text)
+        assert self.gate.wait(5), "gate never opened"
+        if self.error is not None:
+            raise self.error
+        return CLIP
+
+
+@pytest.fixture
+def backend():
+    previous = tts.get_router()
+    gate = GateBackend()
+    tts.use_backends([gate])
+    yield gate
+    gate.gate.set()
+    tts._router = previous
+
+
+def unique_text():
+    return f"flight test {uuid.uuid4().hex}"   # never cached by an earlier test
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def coalesced(path):
+    return metrics.COALESCED.series().get((path,), 0)
+
+
+def test_waiters_share_one_synthesis(backend):
+    text = unique_text()
+    before = coalesced("single")
+    with ThreadPoolExecutor(3) as pool:
+        leader = pool.submit(tts.generate_audio, text)
+        wait_for(lambda: len(backend.calls) == 1)
+        waiters = [pool.submit(tts.generate_audio, text) for _ in range(2)]
+        wait_for(lambda: coalesced("single") == before + 2)
+        backend.gate.set()
+        results = [leader.result(5)] + [waiter.result(5) for waiter in waiters]
+    assert backend.calls == [text]
+    assert all(result == results[0] for result in results)
+
+
+def test_failed_flight_wakes_its_waiters_with_the_error(backend):
+    backend.error = RuntimeError("engine down")
+    text = unique_text()
+    before = coalesced("single")
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(tts.generate_audio, text)
+        wait_for(lambda: len(backend.calls) == 1)
+        waiter = pool.submit(tts.generate_audio, text)
+        wait_for(lambda: coalesced("single") == before + 1)
+        backend.gate.set()
+        with pytest.raises(RuntimeError, match="engine down"):
+            leader.result(5)
+        with pytest.raises(RuntimeError, match="engine down"):
+            waiter.result(5)   # woken with the error, not left waiting or retrying on its own
+    assert backend.calls == [text]
+    assert not tts._flights
+
+
+def test_flights_with_and_without_fallback_do_not_serve_each_other(backend):
+    text = unique_text()
+    before = coalesced("single")
+    with ThreadPoolExecutor(2) as pool:
+        strict = pool.submit(tts._get_or_synthesize, text, fallback=False)
+        wait_for(lambda: len(backend.calls) == 1)
+        # Same text while the primary-only flight is still out: this caller may use a fallback
+        # engine, so it must make its own flight rather than wait on the other one
+        lenient = pool.submit(tts._get_or_synthesize, text, fallback=True)
+        wait_for(lambda: len(backend.calls) == 2)
+        backend.gate.set()
+        assert strict.result(5) and lenient.result(5)
+    assert coalesced("single") == before
+    assert backend.calls == [text, text]